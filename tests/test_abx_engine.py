@@ -0,0 +1,85 @@
+""" Tests of the numpy ABX engine against a naive (libri-light) DTW """
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from zerospeech.tasks.abx import engine
+
+
+def naive_dtw(dist: np.ndarray) -> float:
+    """ DTW cost normalized by the length of the backtracked path (libri-light implementation) """
+    n, m = dist.shape
+    cost = np.zeros((n, m))
+    cost[0, 0] = dist[0, 0]
+    for i in range(1, n):
+        cost[i, 0] = dist[i, 0] + cost[i - 1, 0]
+    for j in range(1, m):
+        cost[0, j] = dist[0, j] + cost[0, j - 1]
+    for i in range(1, n):
+        for j in range(1, m):
+            cost[i, j] = dist[i, j] + min(cost[i - 1, j], cost[i, j - 1], cost[i - 1, j - 1])
+
+    path_len, i, j = 1, n - 1, m - 1
+    while i > 0 and j > 0:
+        c_up, c_left, c_diag = cost[i - 1, j], cost[i, j - 1], cost[i - 1, j - 1]
+        if c_diag <= c_left and c_diag <= c_up:
+            i, j = i - 1, j - 1
+        elif c_left <= c_up:
+            j -= 1
+        else:
+            i -= 1
+        path_len += 1
+    path_len += i + j
+    return cost[n - 1, m - 1] / path_len
+
+
+def naive_dtw_batch(dist, len1, len2):
+    return np.array([naive_dtw(d[:l1, :l2]) for d, l1, l2 in zip(dist, len1, len2)])
+
+
+@pytest.fixture
+def item_features(tmp_path: Path):
+    """ Synthetic .item file: 3 phones (noisy one-hot frames) of varying lengths, 3 speakers """
+    rng = np.random.default_rng(0)
+    lines = ['#file onset offset #phone prev-phone next-phone speaker']
+    features = {}
+    for u in range(6):
+        frames, t = [], 0
+        for k in range(9):
+            n = int(rng.integers(2, 9))
+            frames.append(np.eye(6)[k % 3] + rng.normal(size=(n, 6)))
+            lines.append(f'u{u} {t * 0.01:.2f} {(t + n) * 0.01:.2f} {"abc"[k % 3]} x y s{u % 3}')
+            t += n
+        features[f'u{u}'] = np.concatenate(frames).astype(np.float32)
+    item_file = tmp_path / 'test.item'
+    item_file.write_text('\n'.join(lines) + '\n')
+    return item_file, features
+
+
+@pytest.mark.parametrize('distance', ['cosine', 'euclidian', 'kl', 'kl_symmetric'])
+def test_dtw_batch(distance):
+    rng = np.random.default_rng(1)
+    x, y = rng.random((4, 7, 5)), rng.random((3, 6, 5))
+    len1, len2 = np.array([7, 3, 5, 1]), np.array([6, 2, 4])
+    dist = engine.frame_distances(x, y, distance).reshape(12, 7, 6)
+    expected = naive_dtw_batch(dist, np.repeat(len1, 3), np.tile(len2, 4))
+    np.testing.assert_allclose(engine.dtw_batch(dist, np.repeat(len1, 3), np.tile(len2, 4)), expected)
+
+
+def test_abx_errors_naive_dtw(item_features, monkeypatch):
+    item_file, features = item_features
+    scores = engine.abx_errors(item_file, features.__getitem__, feature_size=0.01, seed=1)
+    monkeypatch.setattr(engine, 'dtw_batch', naive_dtw_batch)
+    expected = engine.abx_errors(item_file, features.__getitem__, feature_size=0.01, seed=1)
+    assert scores.keys() == expected.keys()
+    for mode in expected:
+        assert scores[mode] == pytest.approx(expected[mode])
+
+
+def test_abx_errors_reference(item_features):
+    item_file, features = item_features
+    scores = engine.abx_errors(item_file, features.__getitem__, feature_size=0.01, seed=1)
+    # recorded scores of the path-normalized DTW
+    assert scores['within'] == pytest.approx(0.325, abs=1e-6)
+    assert scores['across'] == pytest.approx(0.3132716, abs=1e-6)
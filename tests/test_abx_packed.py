@@ -0,0 +1,57 @@
+""" Tests of the packed features of abxLS submissions """
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from zerospeech.data_loaders import load_packed_features
+from zerospeech.generics import FileItem
+from zerospeech.submissions.abxLS import AbxLSSubmission
+from zerospeech.tasks.abx.abxLS_phoneme import ABX2Parameters
+from zerospeech.tasks.abx.feature_store import FeatureStore
+
+
+def _write_features(location: Path, ext: str):
+    """ Write the feature files of the dev-clean & test-clean subsets of a submission """
+    features = {}
+    for i, subset in enumerate(('dev-clean', 'test-clean')):
+        (location / subset).mkdir(parents=True)
+        rng = np.random.default_rng(i)
+        for name in ('u1', 'u2', 'u3'):
+            array = rng.random((int(rng.integers(1, 8)), 5))
+            if ext == '.npy':
+                array = array.astype(np.float32)
+                np.save(location / subset / f'{name}.npy', array)
+            else:
+                np.savetxt(location / subset / f'{name}.txt', array)
+            features[(subset, name)] = array
+    ABX2Parameters(score_file_type=ext).export(location / 'params.yaml')
+    return features
+
+
+@pytest.mark.parametrize('ext', ['.npy', '.txt'])
+def test_pack_reload(tmp_path: Path, ext):
+    location = tmp_path / 'submission'
+    features = _write_features(location, ext)
+
+    submission = AbxLSSubmission.load(location, tasks=('clean',))
+    packed = submission.pack(clean=True)
+    assert sorted(f.name for f in packed) == ['dev-clean.npy', 'test-clean.npy']
+    assert not (location / 'dev-clean').exists()
+
+    # packed matrices replace the feature directories
+    submission = AbxLSSubmission.load(location, tasks=('clean',))
+    for name, subset in (('dev_clean', 'dev-clean'), ('test_clean', 'test-clean')):
+        item = submission.items.get(name)
+        assert isinstance(item, FileItem)
+
+        index, matrix = load_packed_features(item)
+        assert matrix.dtype == (np.float32 if ext == '.npy' else np.float64)
+        assert index['filename'].tolist() == ['u1', 'u2', 'u3']
+        for filename, offset, n_frames in zip(index['filename'], index['offset'], index['n_frames']):
+            np.testing.assert_array_equal(matrix[offset:offset + n_frames], features[(subset, filename)])
+
+        store = FeatureStore.from_packed(item)
+        assert len(store) == 3 and store.dim == 5
+        for filename in ('u1', 'u2', 'u3'):
+            np.testing.assert_array_equal(store.features(filename), features[(subset, filename)])
@@ -0,0 +1,33 @@
+""" Tests of the evaluation of ABX sets in worker processes """
+import io
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from zerospeech.data_loaders import load_numpy_array
+from zerospeech.generics import archives
+from zerospeech.generics.cache import file_fingerprint
+from zerospeech.tasks.abx.parallel import run_sets
+
+
+def test_run_sets_archive_members(tmp_path: Path):
+    """ Members of the archives mounted by the parent are readable by the workers """
+    features = {f'u{i}': np.random.default_rng(i).random((5 + i, 3)) for i in range(4)}
+    location = tmp_path / 'submission.zip'
+    with zipfile.ZipFile(location, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for name, array in features.items():
+            buffer = io.BytesIO()
+            np.save(buffer, array)
+            zf.writestr(f'{name}.npy', buffer.getvalue())
+
+    archives.mount(location)
+    files = {name: location / f'{name}.npy' for name in features}
+    arrays = run_sets(load_numpy_array, [
+        (name, dict(file_item=f, mmap_mode='r')) for name, f in files.items()
+    ], n_jobs=2)
+    fingerprints = run_sets(file_fingerprint, [(name, dict(path=f)) for name, f in files.items()], n_jobs=2)
+
+    for name, array in features.items():
+        np.testing.assert_array_equal(arrays[name], array)
+        assert fingerprints[name] == file_fingerprint(files[name])
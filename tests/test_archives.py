@@ -0,0 +1,134 @@
+""" Tests of the read-only access to the members of submission archives """
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from zerospeech.data_loaders import load_numpy_array
+from zerospeech.generics import archives
+
+ARRAY = np.arange(24, dtype=np.float32).reshape(6, 4)
+FORTRAN_ARRAY = np.asfortranarray(np.arange(12, dtype=np.float64).reshape(3, 4))
+
+
+def _npy(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+MEMBERS = {
+    'meta.yaml': b'author: test\n',
+    'lexical/dev.txt': b'a 1.0\nb 2.0\n',
+    'semantic/dev/librispeech/x.npy': _npy(ARRAY),
+    'semantic/dev/librispeech/y.npy': _npy(FORTRAN_ARRAY),
+}
+
+
+def _write(location: Path, kind: str, root: str = 'submission/') -> Path:
+    """ Write the members (inside a root directory) into a zip (stored or deflated) or tar archive """
+    if kind == 'tar':
+        with tarfile.open(location, 'w:') as tar:
+            for name, data in MEMBERS.items():
+                info = tarfile.TarInfo(f'{root}{name}')
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    else:
+        compression = zipfile.ZIP_STORED if kind == 'stored' else zipfile.ZIP_DEFLATED
+        with zipfile.ZipFile(location, 'w', compression=compression) as zf:
+            for name, data in MEMBERS.items():
+                zf.writestr(f'{root}{name}', data)
+    return location
+
+
+@pytest.fixture(autouse=True)
+def _mounted(monkeypatch):
+    """ Each test mounts its own archives """
+    monkeypatch.setattr(archives, '_MOUNTED', {})
+
+
+@pytest.mark.parametrize('kind, suffix', [('stored', '.zip'), ('deflated', '.zip'), ('tar', '.tar')])
+def test_index(tmp_path: Path, kind, suffix):
+    location = _write(tmp_path / f'submission{suffix}', kind)
+    assert archives.is_archive(location)
+    archive = archives.mount(location)
+
+    # the single top level directory is the root of the submission
+    assert set(archive.members) == set(MEMBERS)
+    assert archives.is_file(location / 'meta.yaml')
+    assert archives.is_dir(location / 'semantic' / 'dev')
+    assert not archives.is_file(location / 'submission' / 'meta.yaml')
+    assert sorted(p.name for p in archive.glob(location / 'semantic', '.npy')) == ['x.npy', 'y.npy']
+    for name, data in MEMBERS.items():
+        assert archives.read_bytes(location / name) == data
+    with pytest.raises(FileNotFoundError):
+        archives.read_bytes(location / 'missing.txt')
+
+
+def test_root_kept(tmp_path: Path):
+    """ Archives with several top level entries are used as is """
+    location = _write(tmp_path / 'submission.zip', 'stored', root='')
+    with zipfile.ZipFile(location, 'a') as zf:
+        zf.writestr('other/readme.txt', b'')
+    archive = archives.mount(location)
+    assert set(archive.members) == {*MEMBERS, 'other/readme.txt'}
+
+
+@pytest.mark.parametrize('kind, suffix', [('stored', '.zip'), ('tar', '.tar')])
+def test_memmap_npy(tmp_path: Path, kind, suffix):
+    location = _write(tmp_path / f'submission{suffix}', kind)
+    archive = archives.mount(location)
+
+    for name, expected in [('x.npy', ARRAY), ('y.npy', FORTRAN_ARRAY)]:
+        path = location / 'semantic' / 'dev' / 'librispeech' / name
+        # data of the member starts at its offset
+        member = archive.member(path)
+        with location.open('rb') as fp:
+            fp.seek(member.offset)
+            assert fp.read(member.size) == MEMBERS[f'semantic/dev/librispeech/{name}']
+
+        array = archive.memmap_npy(path)
+        assert isinstance(array, np.memmap)
+        np.testing.assert_array_equal(array, expected)
+        assert array.flags.f_contiguous == expected.flags.f_contiguous
+
+
+def test_memmap_npy_deflated(tmp_path: Path):
+    """ Compressed members cannot be memory-mapped, they are read & decompressed """
+    location = _write(tmp_path / 'submission.zip', 'deflated')
+    archive = archives.mount(location)
+    path = location / 'semantic' / 'dev' / 'librispeech' / 'x.npy'
+
+    assert archive.member(path).offset is None
+    assert archive.memmap_npy(path) is None
+    np.testing.assert_array_equal(np.load(archives.source(path)), ARRAY)
+
+
+def test_fingerprint(tmp_path: Path):
+    location = _write(tmp_path / 'submission.zip', 'stored')
+    archive = archives.mount(location)
+    path_x = location / 'semantic' / 'dev' / 'librispeech' / 'x.npy'
+    path_y = location / 'semantic' / 'dev' / 'librispeech' / 'y.npy'
+
+    fingerprint = archive.fingerprint(path_x)
+    assert fingerprint == archive.fingerprint(path_x)
+    assert fingerprint != archive.fingerprint(path_y)
+
+    # fingerprints change when the archive is modified
+    stat = location.stat()
+    os.utime(location, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert fingerprint != archive.fingerprint(path_x)
+
+
+@pytest.mark.parametrize('kind, memmapped', [('stored', True), ('deflated', False)])
+def test_load_numpy_array(tmp_path: Path, kind, memmapped):
+    location = _write(tmp_path / 'submission.zip', kind)
+    archives.mount(location)
+
+    array = load_numpy_array(location / 'semantic' / 'dev' / 'librispeech' / 'x.npy', mmap_mode='r')
+    assert isinstance(array, np.memmap) == memmapped
+    np.testing.assert_array_equal(array, ARRAY)
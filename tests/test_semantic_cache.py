@@ -0,0 +1,77 @@
+""" Tests of the persistent cache of pooled embeddings of the semantic task """
+import os
+from pathlib import Path
+
+import numpy as np
+
+from zerospeech.tasks.lm.semantic_cache import PooledEmbeddingCache
+
+
+def _subset(location: Path, n_files: int = 3, dim: int = 4):
+    """ Write embedding files & return their index and their (mean pooled) vectors """
+    location.mkdir(parents=True)
+    files, vectors = {}, {}
+    for i in range(n_files):
+        files[f'f{i}'] = location / f'f{i}.npy'
+        data = np.random.default_rng(i).random((5, dim))
+        np.save(files[f'f{i}'], data)
+        vectors[f'f{i}'] = data.mean(axis=0)
+    return files, vectors
+
+
+def test_lookup_hit(tmp_path: Path):
+    cache = PooledEmbeddingCache(location=tmp_path / 'cache', max_size=1024 ** 2)
+    cache.location.mkdir()
+    files, vectors = _subset(tmp_path / 'subset')
+
+    assert cache.lookup(files, 'mean') == {}
+    cache.store(files, 'mean', vectors)
+    cached = cache.lookup(files, 'mean')
+    assert cached.keys() == vectors.keys()
+    for f, v in vectors.items():
+        np.testing.assert_array_equal(cached[f], v)
+
+    # entries depend on the pooling method & mode
+    assert cache.lookup(files, 'max') == {}
+    assert cache.lookup(files, 'mean', streaming=True) == {}
+    assert [e.name for e in cache.location.iterdir()] == [cache.entry_file(files, 'mean').name]
+
+
+def test_lookup_invalidation(tmp_path: Path):
+    cache = PooledEmbeddingCache(location=tmp_path / 'cache', max_size=1024 ** 2)
+    cache.location.mkdir()
+    files, vectors = _subset(tmp_path / 'subset')
+    cache.store(files, 'mean', vectors)
+
+    # modified & deleted files are not looked up
+    np.save(files['f0'], np.zeros((6, 4)))
+    os.utime(files['f0'], ns=(0, 0))
+    files['f1'].unlink()
+    assert cache.lookup(files, 'mean').keys() == {'f2'}
+
+    # stored vectors are merged into the entry
+    cache.store(files, 'mean', {'f0': np.zeros(4)})
+    cached = cache.lookup(files, 'mean')
+    assert cached.keys() == {'f0', 'f2'}
+    np.testing.assert_array_equal(cached['f0'], np.zeros(4))
+
+
+def test_eviction(tmp_path: Path):
+    cache = PooledEmbeddingCache(location=tmp_path / 'cache', max_size=1024 ** 2)
+    cache.location.mkdir()
+    subsets = [_subset(tmp_path / f'subset{i}', n_files=20, dim=256) for i in range(3)]
+    for files, vectors in subsets:
+        cache.store(files, 'mean', vectors)
+    entries = [cache.entry_file(files, 'mean') for files, _ in subsets]
+    os.utime(entries[0], ns=(0, 0))
+    os.utime(entries[1], ns=(10 ** 9, 10 ** 9))
+
+    # the least recently used entries are deleted when the cache exceeds max_size
+    cache.max_size = 2 * entries[0].stat().st_size
+    cache.lookup(subsets[0][0], 'mean')
+    cache.evict()
+    assert [e.is_file() for e in entries] == [True, False, True]
+    assert cache.size <= cache.max_size
+
+    # no temporary files are left
+    assert sorted(cache.location.iterdir()) == sorted(e for e in entries if e.is_file())
@@ -0,0 +1,117 @@
+""" Tests of the vectorized distance engine of the semantic task """
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.spatial
+import scipy.stats
+
+from zerospeech.tasks.lm.semantic import SemanticTask
+from zerospeech.tasks.lm.semantic_engine import PAIRED_METRICS, PooledEmbeddings, SemanticDistanceEngine
+
+
+def _subset(seed: int = 0):
+    """ Random embeddings, gold & pairs (with swapped & duplicated pairs) of a semantic subset """
+    rng = np.random.default_rng(seed)
+    gold = []
+    for w in range(6):
+        for t in range(1 + w % 3):
+            gold.append(('librispeech', f'w{w}', f'w{w}_{t}', None))
+    for w in range(4):
+        # voice v2 is missing for some words
+        for v in range(2 + w % 2):
+            gold.append(('synthetic', f's{w}', f's{w}_v{v}', f'v{v}'))
+    gold_df = pd.DataFrame(gold, columns=['type', 'word', 'filename', 'voice'])
+
+    pairs = [
+        ('librispeech', 'w0', 'w1'), ('librispeech', 'w1', 'w0'), ('librispeech', 'w2', 'w5'),
+        ('librispeech', 'w3', 'w4'), ('librispeech', 'w2', 'w5'), ('librispeech', 'w1', 'w3'),
+        ('librispeech', 'w5', 'w0'), ('librispeech', 'w4', 'w2'),
+        ('synthetic', 's0', 's1'), ('synthetic', 's1', 's0'), ('synthetic', 's1', 's3'),
+        ('synthetic', 's2', 's0'), ('synthetic', 's3', 's2'), ('synthetic', 's3', 's1'),
+    ]
+    pairs_df = pd.DataFrame(pairs, columns=['type', 'word_1', 'word_2'])
+    pairs_df['dataset'] = np.where(np.arange(len(pairs_df)) % 2 == 0, 'a', 'b')
+    pairs_df['relatedness'] = rng.random(len(pairs_df))
+    pairs_df['similarity'] = np.nan
+
+    embeddings = PooledEmbeddings.from_vectors((f, rng.normal(size=8)) for f in gold_df['filename'])
+    return embeddings, gold_df, pairs_df
+
+
+def _baseline_scores(embeddings: PooledEmbeddings, gold_df: pd.DataFrame, pairs_df: pd.DataFrame,
+                     metric: str) -> np.ndarray:
+    """ Per-pair scores computed as the original (non-vectorized) implementation """
+    def vector(filename):
+        return embeddings.matrix[embeddings.index[filename]]
+
+    scores = []
+    for _, row in pairs_df.iterrows():
+        gold = gold_df[gold_df['type'] == row['type']]
+        if row['type'] == 'librispeech':
+            x = np.asarray([vector(f) for f in gold['filename'][gold['word'] == row['word_1']]])
+            y = np.asarray([vector(f) for f in gold['filename'][gold['word'] == row['word_2']]])
+            scores.append(scipy.spatial.distance.cdist(x, y, metric=metric).mean())
+        else:
+            tokens_1 = gold[['filename', 'voice']][gold['word'] == row['word_1']]
+            tokens_2 = gold[['filename', 'voice']][gold['word'] == row['word_2']]
+            tokens = tokens_1.merge(tokens_2, on='voice').drop(['voice'], axis=1)
+            dist = 0
+            for _, (filename_x, filename_y) in tokens.iterrows():
+                dist += scipy.spatial.distance.cdist(
+                    np.atleast_2d(vector(filename_x)), np.atleast_2d(vector(filename_y)), metric=metric)[0][0]
+            scores.append(dist / len(tokens))
+    return np.asarray(scores)
+
+
+@pytest.mark.parametrize('metric', [*PAIRED_METRICS.keys(), 'jensenshannon', 'hamming'])
+def test_distances_match_cdist(metric):
+    rng = np.random.default_rng(1)
+    matrix = rng.random((20, 6))
+    # zeros exercise the 0/0 terms of canberra
+    matrix[:3, :2] = 0
+    embeddings = PooledEmbeddings([f'f{i}' for i in range(20)], matrix)
+    rows_1, rows_2 = rng.integers(0, 20, size=50), rng.integers(0, 20, size=50)
+
+    dist = SemanticDistanceEngine(embeddings, metric=metric).distances(rows_1, rows_2)
+    expected = scipy.spatial.distance.cdist(matrix, matrix, metric=metric)[rows_1, rows_2]
+    np.testing.assert_allclose(dist, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_synthetic_pairs_within_voice():
+    embeddings, gold_df, pairs_df = _subset()
+    engine = SemanticDistanceEngine(embeddings, metric='euclidean')
+    positions, rows_1, rows_2 = engine.token_pairs(pairs_df, gold_df, 'synthetic')
+
+    voices = dict(zip(gold_df['filename'], gold_df['voice']))
+    filenames = np.asarray(embeddings.filenames)
+    assert all(voices[f1] == voices[f2] for f1, f2 in zip(filenames[rows_1], filenames[rows_2]))
+    # s1 & s3 share 3 voices, all the other pairs share 2 voices
+    counts = np.bincount(positions, minlength=len(pairs_df))[pairs_df['type'] == 'synthetic']
+    np.testing.assert_array_equal(counts, [2, 2, 3, 2, 2, 3])
+
+
+@pytest.mark.parametrize('metric', ['euclidean', 'cosine', 'jensenshannon'])
+def test_scores_match_baseline(metric):
+    embeddings, gold_df, pairs_df = _subset()
+    if metric == 'jensenshannon':
+        embeddings = PooledEmbeddings(embeddings.filenames, np.abs(embeddings.matrix))
+    scores = SemanticDistanceEngine(embeddings, metric=metric).compute(pairs_df, gold_df)
+    expected = _baseline_scores(embeddings, gold_df, pairs_df, metric)
+    np.testing.assert_allclose(scores, expected, rtol=1e-12)
+
+    # swapped & duplicated pairs get the exact same score
+    assert scores[0] == scores[1] and scores[8] == scores[9] and scores[10] == scores[13]
+    assert scores[2] == scores[4]
+
+
+def test_correlations_match_baseline():
+    embeddings, gold_df, pairs_df = _subset()
+    pairs_df['score'] = SemanticDistanceEngine(embeddings, metric='cosine').compute(pairs_df, gold_df)
+    correlation = SemanticTask(correlations=True, bootstrap=0).compute_correlation(pairs_df)
+
+    # baseline scores up to float noise (ties between swapped pairs are kept)
+    baseline = pairs_df.assign(score=np.round(_baseline_scores(embeddings, gold_df, pairs_df, 'cosine'), 12))
+    for _, row in correlation.iterrows():
+        group = baseline[(baseline['type'] == row['type']) & (baseline['dataset'] == row['dataset'])]
+        expected = 100 * scipy.stats.spearmanr(-group['relatedness'].to_numpy(), group['score'].to_numpy())[0]
+        assert row['correlation'] == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,43 @@
+""" Tests of the evaluation of unpooled embeddings of the semantic task """
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from zerospeech.tasks.lm.params import SemanticParams, SemanticPooling, SLM21BenchmarkParameters
+from zerospeech.tasks.lm.semantic import SemanticTask
+
+
+@pytest.mark.parametrize('n_jobs, memory_map', [(1, False), (2, True)])
+def test_pool_frames(tmp_path: Path, n_jobs, memory_map):
+    rng = np.random.default_rng(0)
+    frames = {f'f{i}': rng.random((3 + i, 4)) for i in range(10)}
+    file_index = {'librispeech': {}, 'synthetic': {}}
+    for i, (filename, data) in enumerate(frames.items()):
+        if i % 3 == 0:
+            # in-memory frames (fused validation)
+            file_index['synthetic'][filename] = data
+        else:
+            np.save(tmp_path / f'{filename}.npy', data)
+            file_index['librispeech'][filename] = tmp_path / f'{filename}.npy'
+    gold_df = pd.DataFrame({
+        'type': [*['synthetic' if i % 3 == 0 else 'librispeech' for i in range(10)], 'librispeech'],
+        'filename': [*frames.keys(), 'missing'],
+    })
+
+    task = SemanticTask(pooling=SemanticPooling.off, n_jobs=n_jobs, memory_map=memory_map)
+    res = task.pool_frames(file_index, gold_df)
+
+    assert [(f, t) for f, t, _ in res] == list(zip(gold_df['filename'], gold_df['type']))
+    assert res[-1][2] is None
+    for filename, _, data in res[:-1]:
+        np.testing.assert_array_equal(data, frames[filename])
+
+
+def test_meta_dtw_band():
+    """ The DTW band is only part of the meta when embeddings are not pooled """
+    params = SLM21BenchmarkParameters()
+    assert 'dtw_band' not in params.to_meta()['semantic']
+    params = SLM21BenchmarkParameters(semantic=SemanticParams(pooling=SemanticPooling.off))
+    assert 'dtw_band' in params.to_meta()['semantic']
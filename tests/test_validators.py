@@ -0,0 +1,23 @@
+""" Tests of the validation of numpy arrays """
+import functools
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import zerospeech.validators as validators
+
+
+@pytest.mark.parametrize('mmap_mode', [None, 'r'])
+def test_numpy_array_check_mmap(tmp_path: Path, mmap_mode):
+    np.save(tmp_path / 'x.npy', np.ones((4, 3)))
+    loaded = {}
+    results = validators.numpy_array_check(
+        tmp_path / 'x.npy',
+        additional_checks=[functools.partial(validators.numpy_dimensions_check, ndim=2)],
+        mmap_mode=mmap_mode, on_load=lambda f, a: loaded.update({f.stem: a})
+    )
+
+    assert all(r.ok() for r in results)
+    assert isinstance(loaded['x'], np.memmap) == (mmap_mode is not None)
+    np.testing.assert_array_equal(loaded['x'], np.ones((4, 3)))
@@ -1,15 +1,20 @@
 import abc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import TYPE_CHECKING, ClassVar, Type
+from typing import TYPE_CHECKING, ClassVar, Dict, List, Sequence, Tuple, Type
 
+import pandas as pd
 from pydantic import BaseModel
 from pydantic import root_validator
 
+from zerospeech.generics import archives
 from zerospeech.out import console as out_console, void_console
 
 if TYPE_CHECKING:
     from zerospeech.submissions import Submission
     from zerospeech.datasets import Dataset
+    from zerospeech.tasks import Task
 
 
 class NoSubmissionTypeError(Exception):
@@ -17,6 +22,45 @@ class NoSubmissionTypeError(Exception):
     pass
 
 
+def run_concurrently(units: List[Tuple["Task", bool]], submission: "Submission", dataset: "Dataset",
+                     max_workers: int):
+    """ Evaluate independent task units concurrently
+
+    Each unit is a (task, in_process) tuple: pandas bound tasks run in a pool of
+    threads, in_process tasks (cpu bound) run in a pool of processes. Errors of
+    any unit are raised once all the units have completed.
+    """
+    thread_units = [t for t, in_process in units if not in_process]
+    process_units = [t for t, in_process in units if in_process]
+
+    # spawn: forking a process that runs threads is unsafe (mounted archives are re-mounted in workers)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(thread_units)))) as threads, \
+            ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(process_units))),
+                                mp_context=multiprocessing.get_context('spawn'),
+                                initializer=archives.mount_all, initargs=(archives.mounted(),)) as processes:
+        futures = [
+            *[processes.submit(task.eval, submission, dataset) for task in process_units],
+            *[threads.submit(task.eval, submission, dataset) for task in thread_units]
+        ]
+        for future in futures:
+            future.result()
+
+
+def summarize_scores(score_dir: Path) -> Dict[str, float]:
+    """ Summarize a score directory: mean 'score' (or 'correlation') of each score file """
+    summary = {}
+    for score_file in sorted(score_dir.glob('*.csv')):
+        try:
+            df = pd.read_csv(score_file)
+        except (ValueError, OSError):
+            continue
+        for column in ('score', 'correlation'):
+            if column in df.columns and pd.api.types.is_numeric_dtype(df[column]):
+                summary[score_file.stem] = df[column].mean()
+                break
+    return summary
+
+
 class Benchmark(BaseModel, abc.ABC):
     """ A Generic benchmark class """
     _name: ClassVar[str] = ...
@@ -54,8 +98,10 @@ class Benchmark(BaseModel, abc.ABC):
         return values
 
     def load_submission(self, location: Path, **kwargs) -> "Submission":
-        """ Load a submission using specified submission type """
+        """ Load a submission using specified submission type (directory, zip or tar archive) """
         if hasattr(self, '__submission_cls__'):
+            if archives.is_archive(location):
+                archives.mount(location)
             return self.__submission_cls__.load(location, **kwargs)
         raise NoSubmissionTypeError(f'No submission type in benchmark  {self._name}')
 
@@ -68,3 +114,41 @@ class Benchmark(BaseModel, abc.ABC):
     def run(self, submission: "Submission"):
         """ Run the benchmark """
         pass
+
+    def run_one(self, location: Path, skip_validation: bool = False, **load_args) -> Dict[str, float]:
+        """ Load, validate & evaluate a submission quietly, returns the summary of its scores """
+        submission = self.load_submission(location=location, **load_args)
+        if not skip_validation and not submission.valid:
+            raise ValueError(f"submission {location} is not valid")
+
+        submission.params_obj = submission.load_parameters()
+        submission.params.quiet = True
+        self.run(submission)
+        return summarize_scores(submission.score_dir)
+
+    def run_many(self, locations: Sequence[Path], n_workers: int = 1, skip_validation: bool = False,
+                 **load_args) -> pd.DataFrame:
+        """ Evaluate many submissions using this (already loaded) benchmark & dataset
+
+        Submissions are evaluated in a pool of threads sharing the dataset & the compiled
+        gold artifacts, each submission writes its scores into its own score directory.
+        A failing submission does not stop the others.
+
+        Returns:
+            a summary table with one line per submission (its status & mean scores)
+        """
+        # per-submission output is disabled as submissions run concurrently
+        runner = self.copy(update=dict(quiet=True))
+
+        def _run(location: Path) -> Dict:
+            try:
+                scores = runner.run_one(location, skip_validation=skip_validation, **load_args)
+                status = 'ok'
+            except Exception as e:  # noqa: report error & continue with other submissions
+                scores, status = {}, f"error: {e}"
+            self.console.print(f"{':heavy_check_mark:' if status == 'ok' else ':x:'} {location}")
+            return dict(submission=str(location), status=status, **scores)
+
+        with ThreadPoolExecutor(max_workers=max(1, n_workers)) as executor:
+            rows = list(executor.map(_run, locations))
+        return pd.DataFrame(rows)
@@ -6,7 +6,7 @@ from zerospeech.datasets import ProsAuditLMDataset
 from zerospeech.submissions import Submission
 from zerospeech.submissions.prosAudit import ProsodySubmission
 from zerospeech.tasks.lm import ProsodicTask
-from ._model import Benchmark
+from ._model import Benchmark, run_concurrently
 
 
 class SLMProsodyBenchmark(Benchmark):
@@ -26,8 +26,16 @@ class SLMProsodyBenchmark(Benchmark):
 
         # create output dir
         submission.score_dir.mkdir(exist_ok=True, parents=True)
-        task = ProsodicTask(**params.dict())
-        task.eval(submission, self.dataset)
+        if params.max_workers > 1:
+            # one evaluation per (set, language) running in a pool of threads
+            units = [
+                (ProsodicTask(**params.dict(), only_sets=(s,), only_languages=(lang,), concurrent=True), False)
+                for s in submission.sets for lang in submission.tasks
+            ]
+            run_concurrently(units, submission, self.dataset, max_workers=params.max_workers)
+        else:
+            task = ProsodicTask(**params.dict())
+            task.eval(submission, self.dataset)
 
         self.console.print('[green]:heavy_check_mark:[/green]Evaluation of benchmark completed successfully ')
         self.console.print(f"Scores can be found @ {submission.score_dir}")
@@ -7,7 +7,7 @@ from zerospeech.datasets import SLM21Dataset
 from zerospeech.tasks.lm import LexicalTask, SyntacticTask, SemanticTask
 from zerospeech.submissions import Submission
 from zerospeech.submissions.sLM21 import SLM21Submission
-from ._model import Benchmark
+from ._model import Benchmark, run_concurrently
 
 
 class SLM21Benchmark(Benchmark):
@@ -33,6 +33,17 @@ class SLM21Benchmark(Benchmark):
 
         # create output dir
         submission.score_dir.mkdir(exist_ok=True, parents=True)
+        if params.max_workers > 1:
+            self.concurrent_run(submission)
+        else:
+            self.sequential_run(submission)
+
+        self.console.print('[green]:heavy_check_mark:[/green]Evaluation of benchmark completed successfully ')
+        self.console.print(f"Scores can be found @ {submission.score_dir}")
+
+    def sequential_run(self, submission: "SLM21Submission"):
+        """ Run each task one after the other """
+        params = submission.params
         if 'lexical' in submission.tasks:
             task1 = LexicalTask(**params.get_lexical())
             task1.eval(submission, self.dataset)
@@ -45,5 +56,20 @@ class SLM21Benchmark(Benchmark):
             task3 = SyntacticTask(**params.get_syntactic())
             task3.eval(submission, self.dataset)
 
-        self.console.print('[green]:heavy_check_mark:[/green]Evaluation of benchmark completed successfully ')
-        self.console.print(f"Scores can be found @ {submission.score_dir}")
+    def concurrent_run(self, submission: "SLM21Submission"):
+        """ Run each (task, set) evaluation concurrently
+
+        lexical & syntactic evaluations (pandas) run in threads, semantic
+        evaluations (cpu bound distance computations) run in processes.
+        """
+        params = submission.params
+        units = []
+        for s in submission.sets:
+            if 'lexical' in submission.tasks:
+                units.append((LexicalTask(**params.get_lexical(), only_sets=(s,), concurrent=True), False))
+            if 'semantic' in submission.tasks:
+                units.append((SemanticTask(**params.get_semantic(), only_sets=(s,), concurrent=True), True))
+            if 'syntactic' in submission.tasks:
+                units.append((SyntacticTask(**params.get_syntactic(), only_sets=(s,), concurrent=True), False))
+
+        run_concurrently(units, submission, self.dataset, max_workers=params.max_workers)
@@ -8,3 +8,4 @@ import zerospeech.cmd.samples
 import zerospeech.cmd.submission
 import zerospeech.cmd.user
 import zerospeech.cmd.submit
+import zerospeech.cmd.extract
@@ -3,8 +3,10 @@ import sys
 from pathlib import Path
 
 from rich.markdown import Markdown
+from rich.table import Table
 
 from zerospeech.benchmarks import BenchmarkList
+from zerospeech.generics import archives
 from zerospeech.out import error_console, warning_console
 from zerospeech.submissions import show_errors
 from .cli_lib import CMD
@@ -35,7 +37,7 @@ class BenchmarkRunCMD(CMD):
 
     def init_parser(self, parser: argparse.ArgumentParser):
         parser.add_argument("name")
-        parser.add_argument("submission_dir")
+        parser.add_argument("submission_dir", help="submission directory (or .zip/.tar archive)")
         parser.add_argument('--skip-validation', action="store_true", help="Skip the validation of submission")
         parser.add_argument("-s", "--sets", nargs='*', action='store', default=('all',),
                             help="Limit the sets the benchmark is run on")
@@ -43,6 +45,9 @@ class BenchmarkRunCMD(CMD):
                             help="Limit the tasks the benchmark runs")
         parser.add_argument('-q', '--quiet', action='store_true', default=False,
                             help="Do not print information to stdout")
+        parser.add_argument('--quick', type=float, default=None, metavar='FRACTION',
+                            help="Evaluate a stratified sample of this fraction of the pairs "
+                                 "(implies --skip-validation)")
 
     def run(self, argv: argparse.Namespace):
         try:
@@ -59,7 +64,7 @@ class BenchmarkRunCMD(CMD):
         spinner.start()
 
         sub_dir = Path(argv.submission_dir)
-        if not sub_dir.is_dir():
+        if not sub_dir.is_dir() and not archives.is_archive(sub_dir):
             error_console.log("Submission directory given does not exist !!!")
             sys.exit(1)
 
@@ -74,6 +79,10 @@ class BenchmarkRunCMD(CMD):
         spinner.stop()
         self.console.print(":heavy_check_mark: Submission loaded successfully", style="bold green")
 
+        if argv.quick is not None:
+            # submission may only contain the sampled files
+            argv.skip_validation = True
+
         if not argv.skip_validation:
             with self.console.status("Validating submission... ", spinner="aesthetic"):
                 if not submission.valid:
@@ -88,10 +97,82 @@ class BenchmarkRunCMD(CMD):
         submission.params_obj = submission.load_parameters()
         # update values from args
         submission.params.quiet = argv.quiet
+        if argv.quick is not None:
+            if 'quick' not in submission.params.__fields__:
+                error_console.log(f"Benchmark {benchmark.name} does not have a quick mode")
+                sys.exit(1)
+            submission.params.quick = argv.quick
         # run benchmark
         benchmark.run(submission)
 
 
+class BenchmarkRunManyCMD(CMD):
+    """ Run a benchmark on many submissions """
+    COMMAND = "run-many"
+    NAMESPACE = "benchmarks"
+
+    def init_parser(self, parser: argparse.ArgumentParser):
+        parser.add_argument("name")
+        parser.add_argument("submission_dirs", nargs='+', help="submission directories (or .zip/.tar archives)")
+        parser.add_argument('--skip-validation', action="store_true", help="Skip the validation of submissions")
+        parser.add_argument("-s", "--sets", nargs='*', action='store', default=('all',),
+                            help="Limit the sets the benchmark is run on")
+        parser.add_argument("-t", "--tasks", nargs='*', action='store', default=('all',),
+                            help="Limit the tasks the benchmark runs")
+        parser.add_argument("-j", "--workers", type=int, default=1,
+                            help="Number of submissions evaluated concurrently")
+        parser.add_argument("-o", "--output", type=Path, default=None,
+                            help="Write the summary table to this csv file")
+
+    def run(self, argv: argparse.Namespace):
+        """ Evaluate many submissions of the same benchmark (benchmark & dataset are loaded once)
+
+        Scores of each submission are written into its score directory & a summary table
+        (mean score of each score file) of all the submissions is printed.
+        """
+        try:
+            benchmark_type = BenchmarkList(argv.name)
+        except ValueError:
+            error_console.log(f"Specified benchmark ({argv.name}) does not exist !!!!")
+            warning_console.log(f"Use one of the following : {','.join(b for b in BenchmarkList)}")
+            sys.exit(1)
+
+        sub_dirs = [Path(d) for d in argv.submission_dirs]
+        missing = [d for d in sub_dirs if not d.is_dir() and not archives.is_archive(d)]
+        if len(missing) > 0:
+            error_console.log(f"Submission directories given do not exist: {', '.join(str(d) for d in missing)}")
+            sys.exit(1)
+
+        load_args = {}
+        if 'all' not in argv.sets and len(argv.sets) > 0:
+            load_args['sets'] = argv.sets
+
+        if 'all' not in argv.tasks and len(argv.tasks) > 0:
+            load_args['tasks'] = argv.tasks
+
+        # Load benchmark (and its dataset) once for all submissions
+        with self.console.status("Loading benchmark..."):
+            benchmark = benchmark_type.benchmark()
+
+        summary = benchmark.run_many(
+            sub_dirs, n_workers=argv.workers, skip_validation=argv.skip_validation, **load_args
+        )
+
+        table = Table(show_header=True, header_style="bold magenta")
+        for column in summary.columns:
+            table.add_column(column)
+        for _, row in summary.iterrows():
+            table.add_row(*[f"{v:.4f}" if isinstance(v, float) else f"{v}" for v in row])
+        self.console.print(table)
+
+        if argv.output is not None:
+            summary.to_csv(argv.output, index=False, float_format='%.4f')
+            self.console.print(f":pencil: writing {argv.output}", style="underline yellow4")
+
+        if (summary['status'] != 'ok').any():
+            sys.exit(1)
+
+
 class BenchmarksInfoCMD(CMD):
     """ List information on a benchmark """
     COMMAND = "info"
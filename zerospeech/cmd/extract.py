@@ -0,0 +1,65 @@
+import argparse
+import sys
+from pathlib import Path
+
+from zerospeech import extraction
+from zerospeech.out import error_console
+from .cli_lib import CMD
+
+
+class ExtractCMD(CMD):
+    """ Extract features of a benchmark dataset into a submission """
+    COMMAND = "extract"
+    NAMESPACE = ""
+
+    def init_parser(self, parser: argparse.ArgumentParser):
+        parser.add_argument("name", help="benchmark (abxLS, sLM21 or prosAudit)")
+        parser.add_argument("model", help="model callable as module:callable (receives a list of waveforms, "
+                                          "returns one output per waveform)")
+        parser.add_argument("location", help="submission directory to write (or .zip file with --packed)")
+        parser.add_argument("-s", "--sets", nargs='*', action='store', default=('all',),
+                            help="Limit the sets extracted")
+        parser.add_argument("-t", "--tasks", nargs='*', action='store', default=('all',),
+                            help="Limit the tasks extracted")
+        parser.add_argument("-b", "--batch-size", type=int, default=16,
+                            help="Number of utterances (of similar length) per call of the model")
+        parser.add_argument("-j", "--decoders", type=int, default=4,
+                            help="Number of processes decoding audio")
+        parser.add_argument("--prefetch", type=int, default=8,
+                            help="Number of batches decoded ahead of the model")
+        parser.add_argument("--packed", action="store_true",
+                            help="Write the submission as a single uncompressed zip archive")
+        parser.add_argument("--file-type", choices=('npy', 'txt'), default='npy',
+                            help="Format of the feature files")
+        parser.add_argument('-q', '--quiet', action='store_true', default=False,
+                            help="Do not print information to stdout")
+
+    def run(self, argv: argparse.Namespace):
+        """ Run a model on the audio files of a benchmark & write the outputs in its submission layout
+
+        Audio is decoded by a pool of processes ahead of the model & utterances are batched by length.
+        """
+        location = Path(argv.location)
+        if argv.packed and location.suffix != '.zip':
+            error_console.log("Packed submissions must be written to a .zip file !!!")
+            sys.exit(1)
+
+        # allow models defined in the current directory
+        sys.path.insert(0, str(Path.cwd()))
+        try:
+            model = extraction.load_model(argv.model)
+        except (ImportError, AttributeError, ValueError) as e:
+            error_console.log(f"Cannot load model {argv.model}: {e}")
+            sys.exit(1)
+
+        sets = None if 'all' in argv.sets or len(argv.sets) == 0 else argv.sets
+        tasks = None if 'all' in argv.tasks or len(argv.tasks) == 0 else argv.tasks
+        try:
+            extraction.extract(
+                argv.name, model, location, tasks=tasks, sets=sets, batch_size=argv.batch_size,
+                n_decoders=argv.decoders, prefetch=argv.prefetch, packed=argv.packed,
+                file_type=argv.file_type, quiet=argv.quiet
+            )
+        except ValueError as e:
+            error_console.log(str(e))
+            sys.exit(1)
@@ -139,3 +139,56 @@ class SubmissionVerify(CMD):
                               style='bold green')
         else:
             show_errors(submission.validation_output)
+
+
+class SubmissionPack(CMD):
+    """ Convert the feature directories of a submission into packed features """
+    COMMAND = "pack"
+    NAMESPACE = "submission"
+
+    def init_parser(self, parser: argparse.ArgumentParser):
+        parser.add_argument("location")
+        parser.add_argument("--clean", action="store_true",
+                            help="Delete the directories of feature files once packed")
+
+    def run(self, argv: argparse.Namespace):
+        """ Pack each directory of feature files into one matrix of contiguous frames & its index
+
+        Packed features (ex: dev-clean.npy & dev-clean.index.csv) replace the directories of
+        per-file features for loading, validation, evaluation & upload (abxLS & abx17 submissions).
+        """
+        location = Path(argv.location)
+        if not location.is_dir():
+            error_console.log("Location specified does not exist !!!")
+            sys.exit(2)
+
+        benchmark_name = None
+        try:
+            benchmark_name = MetaFile.benchmark_from_submission(location)
+            if benchmark_name is None:
+                raise TypeError("benchmark not found")
+
+            benchmark_type = BenchmarkList(benchmark_name)
+        except TypeError:
+            error_console.log(f"Specified submission does not have a valid {MetaFile.file_stem}"
+                              f"\nCannot find benchmark type")
+            sys.exit(1)
+        except ValueError:
+            error_console.log(f"Specified benchmark ({benchmark_name}) does not exist !!!!")
+            warning_console.log(f"Use one of the following : {','.join(b for b in BenchmarkList)}")
+            sys.exit(1)
+
+        # Load benchmark
+        benchmark = benchmark_type.benchmark(quiet=self.quiet)
+        submission = benchmark.load_submission(location)
+        if not hasattr(submission, 'pack'):
+            error_console.log(f"Submissions of {benchmark_name} do not have a packed format (abxLS & abx17 only)")
+            sys.exit(1)
+
+        with std_console.status(f"Packing features of submission @ {location}"):
+            packed = submission.pack(clean=argv.clean)
+
+        for matrix_file in packed:
+            std_console.print(f":pencil: wrote {matrix_file.relative_to(location)}", style="underline yellow4")
+        std_console.print(f"Packed {len(packed)} subsets of submission @ {location} :heavy_check_mark:",
+                          style='bold green')
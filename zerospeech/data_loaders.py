@@ -1,12 +1,26 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 from pathlib import Path
-from typing import Callable, Any, Union, Protocol, Tuple, List
+from typing import Callable, Any, Union, Protocol, Tuple, List, Optional
 from zipfile import ZipFile
 
 import numpy
 import numpy as np
 import pandas as pd
 
-from .generics import FileItem, FileTypes
+from .generics import FileItem, FileTypes, archives
+from .generics.cache import evict_lru, file_fingerprint, mark_used
+from .settings import get_settings
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 FileLoaderType = Callable[[FileItem], Any]
 
@@ -20,27 +34,322 @@ def load_dataframe(file_item: Union[FileItem, Path], **extras) -> pd.DataFrame:
     if isinstance(file_item, Path):
         file_item = FileItem.from_file(file_item)
 
-    if not file_item.file.is_file():
+    if not archives.is_file(file_item.file):
         raise FileNotFoundError(f'File :{file_item.file} does not exist')
 
     if file_item.file_type not in FileTypes.dataframe_types():
         raise FileError(f"current type {file_item.file_type} cannot be converted to Dataframe")
 
     # open as dataframe
-    return pd.read_csv(file_item.file, **extras)
+    return pd.read_csv(archives.source(file_item.file), **extras)
+
+
+def score_sidecar_dir(file: Path) -> Path:
+    """ Location of the binary sidecar of a score file (keyed by the fingerprint of the file) """
+    key = hashlib.sha1(file_fingerprint(file).encode()).hexdigest()
+    return get_settings().cache_path / "scores" / key
+
+
+def _score_dataframe(filenames: numpy.ndarray, codes: numpy.ndarray, scores: numpy.ndarray) -> pd.DataFrame:
+    """ Build a score dataframe (indexed by filename) from categorical filename codes """
+    index = pd.Index(np.asarray(filenames)[codes].astype(object), name='filename')
+    return pd.DataFrame({'score': np.array(scores, dtype=np.float64)}, index=index)
+
+
+def _write_score_sidecar(location: Path, filenames: numpy.ndarray, codes: numpy.ndarray, scores: numpy.ndarray):
+    """ Write a sidecar directory atomically (a failure only disables the sidecar)
+
+    The least recently used sidecars are deleted when the total size exceeds settings.scores_cache_max_size.
+    """
+    try:
+        location.parent.mkdir(exist_ok=True, parents=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=location.parent))
+        np.save(str(tmp_dir / 'filenames.npy'), filenames)
+        np.save(str(tmp_dir / 'codes.npy'), codes)
+        np.save(str(tmp_dir / 'scores.npy'), scores)
+        try:
+            os.rename(tmp_dir, location)
+        except OSError:
+            # sidecar written concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        evict_lru(location.parent, get_settings().scores_cache_max_size, keep=[location])
+    except OSError:
+        pass
+
+
+def score_file_location(directory: Path, stem: str) -> Path:
+    """ Location of a score file: a parquet or arrow IPC file if present, the text file otherwise """
+    for file_type in (FileTypes.parquet, FileTypes.arrow):
+        location = directory / f"{stem}{file_type.ext}"
+        if archives.is_file(location):
+            return location
+    return directory / f"{stem}{FileTypes.txt.ext}"
+
+
+def _require_pyarrow(file: Path):
+    if pyarrow is None:
+        raise FileError(f"reading {file.name} requires pyarrow (pip install zerospeech-benchmarks[arrow])")
+
+
+def _arrow_source(file: Path):
+    """ Memory-mapped arrow source of a file (members of archives are mapped if stored uncompressed) """
+    archive = archives.archive_of(file)
+    if archive is None:
+        return pyarrow.memory_map(str(file), 'r')
+
+    member = archive.member(file.absolute())
+    if member.offset is None:
+        return pyarrow.BufferReader(pyarrow.py_buffer(archive.read_bytes(file.absolute())))
+    with pyarrow.memory_map(str(archive.location), 'r') as mapped:
+        return pyarrow.BufferReader(mapped.read_at(member.size, member.offset))
+
+
+def score_table_schema(file_item: FileItem) -> "pyarrow.Schema":
+    """ Read the schema of a parquet or arrow IPC score file (only the metadata is read) """
+    _require_pyarrow(file_item.file)
+    source = _arrow_source(file_item.file)
+    if file_item.file_type == FileTypes.parquet:
+        return pyarrow.parquet.read_schema(source)
+    return pyarrow.ipc.open_file(source).schema
+
 
+def load_score_table(file_item: FileItem, columns: Tuple[str, ...] = ('filename', 'score')) -> "pyarrow.Table":
+    """ Read columns of a parquet or arrow IPC score file
 
-def load_numpy_array(file_item: Union[FileItem, Path]) -> numpy.ndarray:
+    Files are memory-mapped, columns of arrow IPC files are not copied.
+    """
+    _require_pyarrow(file_item.file)
+    try:
+        source = _arrow_source(file_item.file)
+        if file_item.file_type == FileTypes.parquet:
+            return pyarrow.parquet.read_table(source, columns=list(columns))
+        return pyarrow.ipc.open_file(source).read_all().select(list(columns))
+    except (pyarrow.ArrowException, KeyError) as e:
+        raise FileError(f"File {file_item.file} is not a valid 'filename score' table: {e}")
+
+
+def _load_score_table_frame(file_item: FileItem) -> pd.DataFrame:
+    """ Load a parquet or arrow IPC score file as a score dataframe """
+    table = load_score_table(file_item)
+    if table.column('filename').null_count > 0:
+        raise FileError(f"File {file_item.file} has lines without filename")
+
+    encoded = table.column('filename').combine_chunks().dictionary_encode()
+    filenames = encoded.dictionary.to_numpy(zero_copy_only=False).astype(str)
+    codes = encoded.indices.to_numpy(zero_copy_only=False)
+    # single chunk float64 columns without nulls are not copied
+    scores = table.column('score').cast(pyarrow.float64()).to_numpy()
+    return _score_dataframe(filenames, codes, scores)
+
+
+def load_score_file(file_item: Union[FileItem, Path], use_sidecar: bool = True) -> pd.DataFrame:
+    """ Load a space separated 'filename score' file as a dataframe indexed by filename
+
+    The file is parsed in one pass with explicit dtypes (categorical filenames & float64 scores).
+    A binary sidecar (filename categories, codes & scores as .npy files) is written in the cache
+    keyed by the fingerprint of the file, later loads memory-map it instead of parsing the text
+    (the cache is capped by settings.scores_cache_max_size, least recently used sidecars are deleted).
+
+    Parquet & arrow IPC files with 'filename' & 'score' columns are loaded directly (no sidecar).
+    """
+    if isinstance(file_item, Path):
+        file_item = FileItem.from_file(file_item)
+
+    if not archives.is_file(file_item.file):
+        raise FileNotFoundError(f'File :{file_item.file} does not exist')
+
+    if file_item.file_type in FileTypes.arrow_types():
+        return _load_score_table_frame(file_item)
+
+    if file_item.file_type not in FileTypes.dataframe_types():
+        raise FileError(f"current type {file_item.file_type} cannot be converted to Dataframe")
+
+    sidecar = score_sidecar_dir(file_item.file)
+    if use_sidecar and sidecar.is_dir():
+        mark_used(sidecar)
+        try:
+            return _score_dataframe(
+                np.load(str(sidecar / 'filenames.npy'), mmap_mode='r'),
+                np.load(str(sidecar / 'codes.npy'), mmap_mode='r'),
+                np.load(str(sidecar / 'scores.npy'), mmap_mode='r')
+            )
+        except (OSError, ValueError):
+            # incomplete or corrupted sidecar: parse the text file
+            pass
+
+    try:
+        df = pd.read_csv(archives.source(file_item.file), sep=' ', header=None, names=['filename', 'score'],
+                         dtype={'filename': 'category', 'score': np.float64})
+    except ValueError as e:
+        raise FileError(f"File {file_item.file} is not a valid 'filename score' file: {e}")
+
+    filenames = df['filename'].cat.categories.to_numpy(dtype=str)
+    codes = df['filename'].cat.codes.to_numpy()
+    scores = df['score'].to_numpy(dtype=np.float64)
+    if (codes < 0).any():
+        raise FileError(f"File {file_item.file} has lines without filename")
+
+    if use_sidecar:
+        _write_score_sidecar(sidecar, filenames, codes, scores)
+    return _score_dataframe(filenames, codes, scores)
+
+
+def load_numpy_array(file_item: Union[FileItem, Path], mmap_mode: Optional[str] = None) -> numpy.ndarray:
+    """ Load a numpy array from a file
+
+    mmap_mode: if set (ex: 'r') .npy files are memory-mapped instead of being read into memory,
+    this argument is ignored for text files that need to be parsed.
+    """
     if isinstance(file_item, Path):
         file_item = FileItem.from_file(file_item)
 
     if file_item.file_type not in FileTypes.numpy_types():
         raise FileError(f"current type {file_item.file_type} cannot be converted to a numpy array")
 
+    archive = archives.archive_of(file_item.file)
+    if archive is not None:
+        # member of a mounted archive: memory-mapped if stored uncompressed
+        if file_item.file_type == FileTypes.npy and mmap_mode is not None:
+            array = archive.memmap_npy(file_item.file.absolute(), mode=mmap_mode)
+            if array is not None:
+                return array
+        data = io.BytesIO(archive.read_bytes(file_item.file.absolute()))
+        if file_item.file_type == FileTypes.txt:
+            return np.loadtxt(data)
+        return np.load(data)
+
     if file_item.file_type == FileTypes.txt:
         return np.loadtxt(file_item.file)
     elif file_item.file_type == FileTypes.npy:
-        return np.load(str(file_item.file))
+        return np.load(str(file_item.file), mmap_mode=mmap_mode)
+
+
+def pooled_index_file(matrix_file: Path) -> Path:
+    """ Location of the filename index of a pooled embedding matrix """
+    return matrix_file.with_suffix('.index.txt')
+
+
+def load_pooled_matrix(
+        file_item: Union[FileItem, Path], mmap_mode: Optional[str] = None
+) -> Tuple[List[str], numpy.ndarray]:
+    """ Load a matrix of pooled embeddings (one row per file) and its filename index
+
+    The index is a text file next to the matrix (ex: synthetic.npy -> synthetic.index.txt)
+    containing the filename (without extension) of each row, one per line.
+    """
+    if isinstance(file_item, Path):
+        file_item = FileItem.from_file(file_item)
+
+    index_file = pooled_index_file(file_item.file)
+    if not archives.is_file(index_file):
+        raise FileError(f"index file {index_file} of pooled matrix does not exist")
+
+    text = archives.read_bytes(index_file).decode()
+    filenames = [line.strip() for line in text.splitlines() if line.strip()]
+    matrix = load_numpy_array(file_item, mmap_mode=mmap_mode)
+
+    if matrix.ndim != 2 or matrix.shape[0] != len(filenames):
+        raise FileError(f"pooled matrix of shape {matrix.shape} does not match "
+                        f"the {len(filenames)} filenames of its index")
+    return filenames, matrix
+
+
+def packed_index_file(matrix_file: Path) -> Path:
+    """ Location of the index of a packed feature matrix """
+    return matrix_file.with_suffix('.index.csv')
+
+
+PACKED_INDEX_COLUMNS = ('filename', 'offset', 'n_frames', 'dim')
+
+
+def load_packed_features(
+        file_item: Union[FileItem, Path], mmap_mode: Optional[str] = 'r'
+) -> Tuple[pd.DataFrame, numpy.ndarray]:
+    """ Load packed features: a matrix of contiguous frames & its index
+
+    The index is a csv file next to the matrix (ex: dev-clean.npy -> dev-clean.index.csv) with
+    the columns filename, offset, n_frames & dim: the features of a file are the n_frames rows
+    of the matrix starting at offset.
+    """
+    if isinstance(file_item, Path):
+        file_item = FileItem.from_file(file_item)
+
+    index_file = packed_index_file(file_item.file)
+    if not archives.is_file(index_file):
+        raise FileError(f"index file {index_file} of packed features does not exist")
+
+    index = pd.read_csv(archives.source(index_file), dtype={'filename': str})
+    if list(index.columns) != list(PACKED_INDEX_COLUMNS):
+        raise FileError(f"columns of {index_file.name} are not expected: {list(PACKED_INDEX_COLUMNS)}, "
+                        f"found: {list(index.columns)}")
+
+    matrix = load_numpy_array(file_item, mmap_mode=mmap_mode)
+    if matrix.ndim != 2:
+        raise FileError(f"packed features must be a 2D matrix, got shape {matrix.shape}")
+    if len(index) > 0 and (
+            (index['offset'] < 0).any() or (index['offset'] + index['n_frames']).max() > matrix.shape[0]
+    ):
+        raise FileError(f"index {index_file.name} refers to frames outside of the matrix of shape {matrix.shape}")
+    if (index['dim'] != matrix.shape[1]).any():
+        raise FileError(f"index {index_file.name} does not match the dimension ({matrix.shape[1]}) of the matrix")
+    return index, matrix
+
+
+def _text_shape(file: Path) -> Tuple[int, int]:
+    """ Shape of a text feature file (lines & columns are counted, values are not parsed) """
+    n_rows, n_cols = 0, 0
+    source = archives.source(file)
+    with (source.open('rb') if isinstance(source, Path) else source) as fp:
+        for line in fp:
+            line = line.split(b'#', 1)[0].strip()
+            if line:
+                if n_rows == 0:
+                    n_cols = len(line.split())
+                n_rows += 1
+    return n_rows, n_cols
+
+
+def write_packed_features(files: List[Path], matrix_file: Path):
+    """ Pack a list of feature files into a matrix of contiguous frames & its index
+
+    Shapes are read from the headers of .npy files & by counting the lines of text files,
+    each file is then written into the memory-mapped matrix as soon as it is loaded.
+    """
+    shapes, dtypes = [], []
+    for f in files:
+        if f.suffix == FileTypes.npy.ext:
+            array = load_numpy_array(f, mmap_mode='r')
+            shape, dtype = array.shape, array.dtype
+        else:
+            shape, dtype = _text_shape(f), numpy.dtype(numpy.float64)
+        if len(shape) != 2:
+            raise FileError(f"{f.name}: features must be a 2D array, got shape {shape}")
+        shapes.append(shape)
+        dtypes.append(dtype)
+
+    dims = {s[1] for s in shapes}
+    if len(dims) > 1:
+        raise FileError(f"features do not have the same dimension: {sorted(dims)}")
+
+    n_frames = numpy.array([s[0] for s in shapes], dtype=numpy.int64)
+    offsets = numpy.concatenate([[0], numpy.cumsum(n_frames)[:-1]]).astype(numpy.int64)
+    dim = dims.pop() if dims else 0
+
+    matrix = numpy.lib.format.open_memmap(
+        matrix_file, mode='w+', dtype=numpy.result_type(*dtypes) if dtypes else numpy.float64,
+        shape=(int(n_frames.sum()), dim)
+    )
+    for f, offset, n in zip(files, offsets, n_frames):
+        array = load_numpy_array(f, mmap_mode='r')
+        if array.size != n * dim:
+            raise FileError(f"{f.name}: expected {n} frames of dimension {dim}, got {array.size} values")
+        matrix[offset:offset + n] = array.reshape(n, dim)
+    matrix.flush()
+    del matrix
+
+    pd.DataFrame({
+        'filename': [f.stem for f in files], 'offset': offsets, 'n_frames': n_frames, 'dim': dim
+    }).to_csv(packed_index_file(matrix_file), index=False)
 
 
 class Zippable(Protocol):
@@ -0,0 +1,153 @@
+""" In-memory evaluation API
+
+Evaluates language model outputs without a submission directory: scores & embeddings
+are given as in-memory objects and results are returned as dataframes. Nothing is written
+to disk (apart from the compiled gold artifacts) & nothing is printed to the console,
+which makes it cheap enough to run during training (ex: at each checkpoint).
+
+    >>> from zerospeech import evaluate
+    >>> results = evaluate.lexical({'aAAfmkmQ': -1.2, ...}, set='dev')
+    >>> results['by_frequency']
+"""
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from zerospeech.datasets import ProsAuditLMDataset, SLM21Dataset
+from zerospeech.generics import FileItem
+from zerospeech.tasks.lm import LexicalTask, ProsodicTask, SemanticTask, SyntacticTask
+from zerospeech.tasks.lm.gold_pairs import GoldKind, GoldPairs
+from zerospeech.tasks.lm.semantic_engine import PooledEmbeddings
+
+# pseudo-probability of each file: a filename -> score mapping (or series), or an array
+# of scores in the order of the gold filenames (see gold_filenames)
+Scores = Union[Mapping[str, float], pd.Series, np.ndarray, Sequence[float]]
+# embeddings of each type ('librispeech' & 'synthetic'): filename -> frames (n_frames, dim)
+# mapping or pre-pooled embeddings
+Embeddings = Mapping[str, Union[Mapping[str, np.ndarray], PooledEmbeddings]]
+
+
+def _gold(dataset: Union[SLM21Dataset, ProsAuditLMDataset], subset: str) -> FileItem:
+    return getattr(dataset.index.subsets, subset).items.gold
+
+
+def _gold_pairs(task: str, set: str, language: str) -> GoldPairs:
+    """ Compiled gold pairs of a pair task ('lexical', 'syntactic' or 'prosaudit') """
+    if task == 'prosaudit':
+        gold, kind = _gold(ProsAuditLMDataset.load(), f"{language}_{set}"), 'sentence'
+    elif task in ('lexical', 'syntactic'):
+        gold, kind = _gold(SLM21Dataset.load(), f"{task}_{set}"), 'lexical' if task == 'lexical' else 'sentence'
+    else:
+        raise ValueError(f'task {task} is not a pair task')
+    return GoldPairs.load(gold, kind=kind)
+
+
+def gold_filenames(task: str, set: str = 'dev', language: str = 'english') -> np.ndarray:
+    """ Filenames of the gold of a task ('lexical', 'syntactic' or 'prosaudit')
+
+    Scores given as an array must follow this order.
+    """
+    return _gold_pairs(task, set, language).filenames
+
+
+def quick_filenames(task: str, fraction: float, set: str = 'dev', language: str = 'english') -> np.ndarray:
+    """ Filenames of the stratified sample evaluated in quick mode
+
+    Only these files need to be scored (or embedded for 'semantic') to evaluate with quick=fraction.
+    """
+    if task == 'semantic':
+        subset = getattr(SLM21Dataset.load().index.subsets, f"semantic_{set}")
+        gold_df, _ = SemanticTask(quick=fraction, quiet=True).load_gold(subset.items.gold, subset.items.pairs)
+        return gold_df['filename'].unique().astype(str)
+
+    gold_pairs = _gold_pairs(task, set, language)
+    task_cls = {'lexical': LexicalTask, 'syntactic': SyntacticTask, 'prosaudit': ProsodicTask}[task]
+    sample = gold_pairs.subset(task_cls.quick_sample(gold_pairs, fraction).mask)
+    return np.unique(gold_pairs.filenames[np.concatenate([sample.correct, sample.incorrect])])
+
+
+def score_frame(scores: Scores, gold: FileItem, kind: GoldKind) -> pd.DataFrame:
+    """ Convert in-memory scores into a score dataframe (indexed by filename) """
+    if isinstance(scores, pd.Series):
+        filenames, values = scores.index.to_numpy(dtype=str), scores.to_numpy(dtype=np.float64)
+    elif isinstance(scores, Mapping):
+        filenames = np.array(list(scores.keys()), dtype=str)
+        values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+    else:
+        filenames = GoldPairs.load(gold, kind=kind).filenames
+        values = np.asarray(scores, dtype=np.float64)
+        if values.shape != filenames.shape:
+            raise ValueError(f'expected one score per gold file ({len(filenames)}), got an array '
+                             f'of shape {values.shape}')
+
+    return pd.DataFrame({'score': values}, index=pd.Index(filenames.astype(object), name='filename'))
+
+
+def lexical(scores: Scores, set: str = 'dev', **params: Any) -> Dict[str, Optional[pd.DataFrame]]:
+    """ Evaluate lexical scores of a set
+
+    Parameters are the ones of the lexical task (by_pair, by_length, by_frequency, quick).
+
+    Returns:
+        a dict with the 'by_pair', 'by_frequency' & 'by_length' dataframes (None if disabled)
+        and the 'quick' estimate (None if quick mode is disabled)
+    """
+    task = LexicalTask(**params, quiet=True)
+    gold = _gold(SLM21Dataset.load(), f"lexical_{set}")
+    by_pair, by_frequency, by_length, estimate = task.run_lexical_eval(score_frame(scores, gold, 'lexical'), gold)
+    return dict(by_pair=by_pair, by_frequency=by_frequency, by_length=by_length, quick=estimate)
+
+
+def syntactic(scores: Scores, set: str = 'dev', quick: Optional[float] = None) -> Dict[str, Optional[pd.DataFrame]]:
+    """ Evaluate syntactic scores of a set
+
+    Returns:
+        a dict with the 'by_pair' & 'by_type' dataframes and the 'quick' estimate (None if quick is not set)
+    """
+    task = SyntacticTask(quiet=True, quick=quick)
+    gold = _gold(SLM21Dataset.load(), f"syntactic_{set}")
+    by_pair, by_type, estimate = task.run_syntactic_comparison(gold, score_frame(scores, gold, 'sentence'))
+    return dict(by_pair=by_pair, by_type=by_type, quick=estimate)
+
+
+def prosody(scores: Scores, set: str = 'dev', language: str = 'english',
+            quick: Optional[float] = None) -> Dict[str, Optional[pd.DataFrame]]:
+    """ Evaluate prosAudit scores of a set
+
+    Returns:
+        a dict with the 'by_pair' & 'by_type' dataframes and the 'quick' estimate (None if quick is not set)
+    """
+    task = ProsodicTask(quiet=True, quick=quick)
+    gold = _gold(ProsAuditLMDataset.load(), f"{language}_{set}")
+    by_pair, by_type, estimate = task.run_prosodic_comparison(gold, score_frame(scores, gold, 'sentence'))
+    return dict(by_pair=by_pair, by_type=by_type, quick=estimate)
+
+
+def semantic(embeddings: Embeddings, set: str = 'dev', **params: Any) -> Dict[str, Optional[pd.DataFrame]]:
+    """ Evaluate semantic embeddings of a set
+
+    Parameters are the ones of the semantic task (metric, pooling, correlations, bootstrap, quick, ...),
+    the types missing from embeddings are not evaluated.
+
+    Returns:
+        a dict with the 'pairs' & 'correlations' dataframes (correlations is None if disabled)
+    """
+    params = dict(
+        params, quiet=True, cache=False, incremental=False,
+        synthetic=params.get('synthetic', True) and 'synthetic' in embeddings,
+        librispeech=params.get('librispeech', True) and 'librispeech' in embeddings
+    )
+    task = SemanticTask(**params)
+    if task.sweep:
+        raise ValueError('sweep mode is not available for in-memory evaluation')
+
+    subset = getattr(SLM21Dataset.load().index.subsets, f"semantic_{set}")
+    arrays = {t: e for t, e in embeddings.items() if not isinstance(e, PooledEmbeddings)}
+    file_index = task.array_index(arrays)
+    file_index.update({
+        t: e for t, e in embeddings.items() if isinstance(e, PooledEmbeddings) and t in file_index
+    })
+
+    pairs, correlations = task.semantic_eval(file_index, subset.items.gold, subset.items.pairs)
+    return dict(pairs=pairs, correlations=correlations)
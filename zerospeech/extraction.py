@@ -0,0 +1,282 @@
+""" Feature extraction pipeline writing submission layouts
+
+Audio files of a benchmark dataset are decoded by a pool of processes (ahead of the model),
+grouped in batches of utterances of similar length & given to a model callable. Outputs are
+written in the layout of the submission directory of the benchmark:
+
+    >>> from zerospeech.extraction import extract
+    >>> extract('abxLS', model, Path('my_submission'), batch_size=32, n_decoders=8)
+
+The model receives a list of waveforms (float32, 16kHz mono) and returns one output per waveform:
+a (n_frames, dim) array of features, or a float pseudo-probability for score files (lexical,
+syntactic & prosAudit tasks).
+"""
+import collections
+import importlib
+import multiprocessing
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Literal, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from zerospeech.benchmarks import BenchmarkList
+from zerospeech.datasets import AbxLSDataset, ProsAuditLMDataset, SLM21Dataset
+from zerospeech.out import console as out_console, void_console, with_progress
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+# model callable: a batch of waveforms -> one output (features or score) per waveform
+ModelFn = Callable[[List[np.ndarray]], Sequence[Union[np.ndarray, float]]]
+
+
+class ExtractionTarget(NamedTuple):
+    """ A list of audio files & where their outputs are written in the submission """
+    name: str
+    files: List[Path]
+    # location in the submission: a directory of features or a score file
+    output: str
+    kind: Literal['features', 'scores']
+
+
+def extraction_targets(benchmark: str, tasks: Optional[Sequence[str]] = None,
+                       sets: Optional[Sequence[str]] = None) -> List[ExtractionTarget]:
+    """ Targets of a benchmark (optionally filtered by tasks & sets) """
+    sets = sets or ('dev', 'test')
+    targets = []
+    if benchmark == 'abxLS':
+        dataset = AbxLSDataset.load()
+        for s in sets:
+            for t in (tasks or ('clean', 'other')):
+                subset = getattr(dataset.index.subsets, f"{s}_{t}")
+                targets.append(ExtractionTarget(
+                    name=f"{s}-{t}", files=subset.items.wav_list.files_list, output=f"{s}-{t}", kind='features'
+                ))
+    elif benchmark == 'sLM21':
+        dataset = SLM21Dataset.load()
+        tasks = tasks or ('lexical', 'syntactic', 'semantic')
+        for s in sets:
+            for t in ('lexical', 'syntactic'):
+                if t in tasks:
+                    subset = getattr(dataset.index.subsets, f"{t}_{s}")
+                    targets.append(ExtractionTarget(
+                        name=f"{t}_{s}", files=subset.items.wav_list.files_list, output=f"{t}/{s}.txt",
+                        kind='scores'
+                    ))
+            if 'semantic' in tasks:
+                subset = getattr(dataset.index.subsets, f"semantic_{s}")
+                for t in ('synthetic', 'librispeech'):
+                    targets.append(ExtractionTarget(
+                        name=f"semantic_{s}_{t}", files=getattr(subset.items, f"{t}_wav_list").files_list,
+                        output=f"semantic/{s}/{t}", kind='features'
+                    ))
+    elif benchmark == 'prosAudit':
+        dataset = ProsAuditLMDataset.load()
+        for s in sets:
+            for t in (tasks or ('english',)):
+                subset = getattr(dataset.index.subsets, f"{t}_{s}")
+                targets.append(ExtractionTarget(
+                    name=f"{t}_{s}", files=subset.items.wav_list.files_list, output=f"{t}_{s}.txt", kind='scores'
+                ))
+    else:
+        raise ValueError(f'extraction is not available for benchmark {benchmark} '
+                         f'(available: abxLS, sLM21, prosAudit)')
+    return targets
+
+
+def load_model(spec: str) -> ModelFn:
+    """ Import a model callable from a 'package.module:callable' specification """
+    module_name, sep, attr = spec.partition(':')
+    if not sep or not attr:
+        raise ValueError(f'model must be given as module:callable, got {spec}')
+    obj = importlib.import_module(module_name)
+    for part in attr.split('.'):
+        obj = getattr(obj, part)
+    if not callable(obj):
+        raise ValueError(f'{spec} is not callable')
+    return obj
+
+
+def load_audio(file: Path) -> np.ndarray:
+    """ Decode an audio file into a float32 mono waveform """
+    if soundfile is not None:
+        data, _ = soundfile.read(str(file), dtype='float32', always_2d=True)
+        return data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+
+    if file.suffix != '.wav':
+        raise ValueError(f'decoding {file.name} requires soundfile (pip install soundfile)')
+    from scipy.io import wavfile
+
+    _, data = wavfile.read(file)
+    if np.issubdtype(data.dtype, np.integer):
+        data = data.astype(np.float32) / np.iinfo(data.dtype).max
+    data = data.astype(np.float32, copy=False)
+    return data.mean(axis=1) if data.ndim > 1 else data
+
+
+def _decode_batch(files: List[Path]) -> List[np.ndarray]:
+    return [load_audio(f) for f in files]
+
+
+def length_buckets(files: Sequence[Path], batch_size: int) -> List[List[Path]]:
+    """ Group files into batches of similar length (file size is used as a proxy of the duration)
+
+    Padding inside a batch is minimal & the longest batches come first (errors of the model
+    due to memory appear early).
+    """
+    ordered = sorted(files, key=lambda f: f.stat().st_size, reverse=True)
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+def prefetched(batches: List[List[Path]], decoders: ProcessPoolExecutor,
+               prefetch: int) -> Iterator[Tuple[List[Path], List[np.ndarray]]]:
+    """ Decode batches in the pool, keeping up to prefetch batches decoded ahead of the consumer """
+    queue: Deque[Tuple[List[Path], Future]] = collections.deque()
+    pending = iter(batches)
+    for batch in pending:
+        queue.append((batch, decoders.submit(_decode_batch, batch)))
+        if len(queue) >= prefetch:
+            break
+
+    while queue:
+        batch, future = queue.popleft()
+        waveforms = future.result()
+        nxt = next(pending, None)
+        if nxt is not None:
+            queue.append((nxt, decoders.submit(_decode_batch, nxt)))
+        yield batch, waveforms
+
+
+class SubmissionWriter:
+    """ Writes outputs in a submission directory or in a packed (single file) archive
+
+    Packed submissions are uncompressed zip archives: they can be evaluated without extraction
+    & their .npy features are memory-mapped from the archive.
+    """
+
+    def __init__(self, location: Path, packed: bool = False, file_type: Literal['npy', 'txt'] = 'npy'):
+        self.location = location
+        self.file_type = file_type
+        self._zip: Optional[zipfile.ZipFile] = None
+        if packed:
+            self._zip = zipfile.ZipFile(location, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def add_tree(self, root: Path):
+        """ Add the files of a directory (ex: a submission skeleton) """
+        for file in sorted(root.rglob('*')):
+            if file.is_file():
+                self.write_bytes(file.relative_to(root).as_posix(), file.read_bytes())
+
+    def write_bytes(self, name: str, data: bytes):
+        if self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            (self.location / name).parent.mkdir(exist_ok=True, parents=True)
+            (self.location / name).write_bytes(data)
+
+    def write_features(self, directory: str, file: Path, features: np.ndarray):
+        features = np.asarray(features)
+        if features.ndim != 2:
+            raise ValueError(f'features of {file.name} must be a (n_frames, dim) array, got shape {features.shape}')
+
+        if self._zip is not None:
+            name = f"{directory}/{file.stem}.{self.file_type}"
+            with self._zip.open(name, 'w', force_zip64=True) as fp:
+                if self.file_type == 'npy':
+                    np.save(fp, features)
+                else:
+                    np.savetxt(fp, features)
+            return
+
+        target = self.location / directory / f"{file.stem}.{self.file_type}"
+        if self.file_type == 'npy':
+            np.save(target, features)
+        else:
+            np.savetxt(target, features)
+
+    def write_scores(self, name: str, scores: Dict[str, float]):
+        text = "".join(f"{stem} {score}\n" for stem, score in scores.items())
+        self.write_bytes(name, text.encode())
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def extract(benchmark: str, model: ModelFn, location: Path, *,
+            tasks: Optional[Sequence[str]] = None, sets: Optional[Sequence[str]] = None,
+            batch_size: int = 16, n_decoders: int = 4, prefetch: int = 8,
+            packed: bool = False, file_type: Literal['npy', 'txt'] = 'npy', quiet: bool = False):
+    """ Run a model on the audio of a benchmark & write a submission
+
+    Arguments:
+        benchmark: name of the benchmark (abxLS, sLM21 or prosAudit)
+        model: callable taking a list of waveforms & returning one output per waveform
+        location: submission directory (or .zip file if packed)
+        batch_size: number of utterances given to each call of the model
+        n_decoders: number of processes decoding audio
+        prefetch: number of batches decoded ahead of the model
+        packed: write a single uncompressed zip archive instead of a directory
+        file_type: format of the feature files (npy or txt)
+    """
+    con = void_console if quiet else out_console
+    targets = extraction_targets(benchmark, tasks=tasks, sets=sets)
+
+    # skeleton of the submission (meta.yaml, params.yaml, directories)
+    skeleton = Path(tempfile.mkdtemp()) / 'submission'
+    BenchmarkList(benchmark).benchmark(quiet=True).init_submission_dir(skeleton)
+    if packed:
+        writer = SubmissionWriter(location, packed=True, file_type=file_type)
+        writer.add_tree(skeleton)
+    else:
+        if not location.is_dir():
+            shutil.copytree(skeleton, location)
+        writer = SubmissionWriter(location, file_type=file_type)
+    shutil.rmtree(skeleton.parent, ignore_errors=True)
+
+    # spawn: decoders do not inherit the model (or its threads) from this process
+    # the writer thread writes the outputs of a batch while the model processes the next ones
+    with ProcessPoolExecutor(max_workers=n_decoders, mp_context=multiprocessing.get_context('spawn')) as decoders, \
+            ThreadPoolExecutor(max_workers=1) as write_pool, with_progress(show=not quiet) as progress:
+        for target in targets:
+            if target.kind == 'features' and not packed:
+                (location / target.output).mkdir(exist_ok=True, parents=True)
+
+            batches = length_buckets(target.files, batch_size)
+            progress_task = progress.add_task(f"extracting {target.name}", total=len(target.files))
+            scores: Dict[str, float] = {}
+            writes: Deque[Future] = collections.deque()
+
+            for batch, waveforms in prefetched(batches, decoders, prefetch=max(1, prefetch)):
+                outputs = model(waveforms)
+                if len(outputs) != len(batch):
+                    raise ValueError(f'model returned {len(outputs)} outputs for a batch of {len(batch)} files')
+
+                if target.kind == 'scores':
+                    scores.update({f.stem: float(np.asarray(o).reshape(-1)[0]) for f, o in zip(batch, outputs)})
+                else:
+                    writes.append(write_pool.submit(
+                        lambda b=batch, o=outputs, t=target: [
+                            writer.write_features(t.output, f, feat) for f, feat in zip(b, o)
+                        ]
+                    ))
+                    # bound the outputs waiting to be written
+                    while len(writes) > prefetch:
+                        writes.popleft().result()
+                progress.update(progress_task, advance=len(batch))
+
+            for w in writes:
+                w.result()
+            if target.kind == 'scores':
+                writer.write_scores(target.output, scores)
+            progress.remove_task(progress_task)
+            con.print(f":pencil: wrote {target.name} ({len(target.files)} files)", style="underline yellow4")
+
+    writer.close()
+    con.print(f":heavy_check_mark: Submission written @ {location}", style="bold green")
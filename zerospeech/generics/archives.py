@@ -0,0 +1,227 @@
+""" Read-only access to the members of zip & tar submission archives (without extraction)
+
+A mounted archive is addressed as a directory: the member 'lexical/dev.txt' of the
+archive /path/submission.zip has the path /path/submission.zip/lexical/dev.txt.
+Members are located using the central directory (zip) or the member headers (tar),
+members stored without compression are read (or memory-mapped) directly from the archive.
+"""
+import io
+import struct
+import tarfile
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Set, Union
+
+import numpy as np
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar')
+
+# size of the fixed part of a zip local file header
+_ZIP_LOCAL_HEADER_SIZE = 30
+
+
+class ArchiveMember(NamedTuple):
+    """ A file of an archive """
+    name: str
+    size: int
+    # position of the data in the archive if stored without compression (None otherwise)
+    offset: Optional[int]
+
+
+class SubmissionArchive:
+    """ Index of the members of a zip or uncompressed tar archive
+
+    If all the members are inside a single top level directory, this directory is
+    used as the root of the submission.
+    """
+
+    def __init__(self, location: Path):
+        self.location = location
+        self.members: Dict[str, ArchiveMember] = {}
+        self.directories: Set[str] = {''}
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._lock = threading.Lock()
+
+        if zipfile.is_zipfile(location):
+            self._index_zip()
+        elif tarfile.is_tarfile(location):
+            self._index_tar()
+        else:
+            raise ValueError(f'{location} is not a zip or tar archive')
+        self._strip_root()
+
+    def _index_zip(self):
+        self._zip = zipfile.ZipFile(self.location, 'r')
+        with self.location.open('rb') as fp:
+            for info in self._zip.infolist():
+                if info.is_dir():
+                    continue
+                offset = None
+                if info.compress_type == zipfile.ZIP_STORED:
+                    # data follows the local header (its name & extra field may differ from the central directory)
+                    fp.seek(info.header_offset + 26)
+                    name_len, extra_len = struct.unpack('<HH', fp.read(4))
+                    offset = info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_len + extra_len
+                self._add(ArchiveMember(name=info.filename, size=info.file_size, offset=offset))
+
+    def _index_tar(self):
+        try:
+            tar = tarfile.open(self.location, 'r:')
+        except tarfile.ReadError:
+            raise ValueError(f'{self.location}: only uncompressed tar archives can be read without extraction')
+        with tar:
+            for info in tar:
+                if info.isfile():
+                    self._add(ArchiveMember(name=info.name, size=info.size, offset=info.offset_data))
+
+    def _add(self, member: ArchiveMember):
+        name = str(PurePosixPath(member.name))
+        self.members[name] = member._replace(name=name)
+        self.directories.update(str(p) for p in PurePosixPath(name).parents if str(p) != '.')
+
+    def _strip_root(self):
+        roots = {name.split('/', 1)[0] for name in self.members}
+        if len(roots) != 1:
+            return
+        root = roots.pop()
+        if root in self.members:
+            return
+        prefix = f"{root}/"
+        self.members = {
+            name[len(prefix):]: member for name, member in self.members.items()
+        }
+        self.directories = {'', *(d[len(prefix):] for d in self.directories if d.startswith(prefix))}
+
+    def member_name(self, path: Path) -> str:
+        """ Name of a member from its path """
+        relative = path.relative_to(self.location).as_posix()
+        return '' if relative == '.' else relative
+
+    def is_file(self, path: Path) -> bool:
+        return self.member_name(path) in self.members
+
+    def is_dir(self, path: Path) -> bool:
+        return self.member_name(path) in self.directories
+
+    def glob(self, path: Path, suffix: str) -> List[Path]:
+        """ List the files of a directory (recursively) having the given suffix """
+        prefix = self.member_name(path)
+        prefix = f"{prefix}/" if prefix else ''
+        return [
+            self.location / name for name in self.members
+            if name.startswith(prefix) and name.endswith(suffix)
+        ]
+
+    def member(self, path: Path) -> ArchiveMember:
+        name = self.member_name(path)
+        if name not in self.members:
+            raise FileNotFoundError(f'File :{path} does not exist')
+        return self.members[name]
+
+    def read_bytes(self, path: Path) -> bytes:
+        """ Read the content of a member """
+        member = self.member(path)
+        if member.offset is not None:
+            with self.location.open('rb') as fp:
+                fp.seek(member.offset)
+                return fp.read(member.size)
+        with self._lock:
+            return self._zip.read(member.name)
+
+    def memmap_npy(self, path: Path, mode: str = 'r') -> Optional[np.ndarray]:
+        """ Memory-map a .npy member (None if the member is compressed) """
+        member = self.member(path)
+        if member.offset is None:
+            return None
+
+        with self.location.open('rb') as fp:
+            fp.seek(member.offset)
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+            elif version == (2, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+            else:
+                return None
+            offset = fp.tell()
+        if dtype.hasobject:
+            return None
+        return np.memmap(self.location, dtype=dtype, mode=mode, offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    def fingerprint(self, path: Path) -> str:
+        """ Fingerprint of a member (changes when the archive is modified) """
+        stat = self.location.stat()
+        return f"{self.location.resolve()}!{self.member_name(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# archives mounted in this process
+_MOUNTED: Dict[Path, SubmissionArchive] = {}
+
+
+def is_archive(location: Path) -> bool:
+    """ True if the location is an archive file that can be mounted """
+    return location.suffix in ARCHIVE_SUFFIXES and location.is_file()
+
+
+def mount(location: Path) -> SubmissionArchive:
+    """ Index an archive (once) so that its members can be accessed using their path """
+    location = location.absolute()
+    if location not in _MOUNTED:
+        _MOUNTED[location] = SubmissionArchive(location)
+    return _MOUNTED[location]
+
+
+def mounted() -> List[Path]:
+    """ Locations of the archives mounted in this process """
+    return list(_MOUNTED.keys())
+
+
+def mount_all(locations: List[Path]):
+    """ Mount a list of archives (used to share mounts with worker processes) """
+    for location in locations:
+        mount(location)
+
+
+def archive_of(path: Path) -> Optional[SubmissionArchive]:
+    """ Mounted archive containing a path (None if the path is not inside a mounted archive) """
+    if not _MOUNTED:
+        return None
+    path = path.absolute()
+    for parent in (path, *path.parents):
+        if parent in _MOUNTED:
+            return _MOUNTED[parent]
+    return None
+
+
+def is_file(path: Path) -> bool:
+    """ Path.is_file including members of mounted archives """
+    archive = archive_of(path)
+    if archive is None:
+        return path.is_file()
+    return archive.is_file(path.absolute())
+
+
+def is_dir(path: Path) -> bool:
+    """ Path.is_dir including directories of mounted archives """
+    archive = archive_of(path)
+    if archive is None:
+        return path.is_dir()
+    return archive.is_dir(path.absolute())
+
+
+def read_bytes(path: Path) -> bytes:
+    """ Path.read_bytes including members of mounted archives """
+    archive = archive_of(path)
+    if archive is None:
+        return path.read_bytes()
+    return archive.read_bytes(path.absolute())
+
+
+def source(path: Path) -> Union[Path, BinaryIO]:
+    """ The path itself, or a file object if the path is a member of a mounted archive """
+    archive = archive_of(path)
+    if archive is None:
+        return path
+    return io.BytesIO(archive.read_bytes(path.absolute()))
@@ -0,0 +1,57 @@
+""" Fingerprints of source files & size-capped cache directories """
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable
+
+from . import archives
+
+
+def file_fingerprint(path: Path) -> str:
+    """ Fingerprint of a file built from its location, size & modification time """
+    archive = archives.archive_of(path)
+    if archive is not None:
+        return archive.fingerprint(path.absolute())
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def entry_size(entry: Path) -> int:
+    """ Size of a cache entry (a file or a directory) in bytes """
+    if entry.is_dir():
+        return sum(f.stat().st_size for f in entry.rglob('*') if f.is_file())
+    return entry.stat().st_size
+
+
+def mark_used(entry: Path):
+    """ Mark a cache entry as recently used """
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+
+
+def evict_lru(location: Path, max_size: int, pattern: str = '*', keep: Iterable[Path] = ()):
+    """ Delete the least recently used entries of a cache directory until it fits in max_size
+
+    Entries are the files or directories of location matching pattern, entries in keep are never deleted.
+    """
+    keep = {Path(k).absolute() for k in keep}
+    try:
+        entries = sorted(location.glob(pattern), key=lambda e: e.stat().st_mtime)
+        sizes = {e: entry_size(e) for e in entries}
+    except OSError:
+        # entries deleted concurrently
+        return
+
+    total = sum(sizes.values())
+    for entry in entries:
+        if total <= max_size:
+            break
+        if entry.absolute() in keep:
+            continue
+        total -= sizes[entry]
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink(missing_ok=True)
@@ -4,6 +4,8 @@ from typing import List, Callable, Iterator
 
 from pydantic import BaseModel, validator
 
+from . import archives
+
 
 class FileTypes(str, Enum):
     txt = "txt"
@@ -18,6 +20,8 @@ class FileTypes(str, Enum):
     phn = "phn"  # phone alignment file
     wrd = "wrd"  # words alignment file
     vad = "vad.csv"  # vad segmentation file in csv format
+    parquet = "parquet"
+    arrow = "arrow"  # arrow IPC (feather v2) file
 
     @property
     def ext(self) -> str:
@@ -29,6 +33,12 @@ class FileTypes(str, Enum):
             cls.csv, cls.txt, cls.tsv, cls.item, cls.vad, cls.wrd, cls.phn
         }
 
+    @classmethod
+    def arrow_types(cls):
+        return {
+            cls.parquet, cls.arrow
+        }
+
     @classmethod
     def audio_types(cls):
         return {
@@ -79,10 +89,14 @@ class FileListItem(Item):
     def from_dir(cls, path: Path, f_type: FileTypes):
         """ Build a FileListItem from a directory"""
 
-        temp = path
-        rgexp = f"*{f_type.ext}"
-        thing = temp.rglob(rgexp)
-        file_list = list(thing)
+        archive = archives.archive_of(path)
+        if archive is not None:
+            file_list = archive.glob(path.absolute(), f_type.ext)
+        else:
+            temp = path
+            rgexp = f"*{f_type.ext}"
+            thing = temp.rglob(rgexp)
+            file_list = list(thing)
 
         return cls(
             file_type=f_type,
@@ -132,7 +146,7 @@ class FileItem(Item):
 
     def valid(self, validate: FileValidator) -> bool:
         # todo rethink a bit this validation pattern
-        return self.file.resolve().is_file() and validate(self)
+        return archives.is_file(self.file) and validate(self)
 
     def relative_to(self, path: Path):
         """ Convert all paths to relative if they are absolute """
@@ -130,17 +130,21 @@ class SizeUnit(BaseModel):
 
 def load_obj(location: Path) -> Union[Dict, List]:
     """ Loads an object from standard formats (.json, yaml, ...) to a standard structure (Dict, List)"""
-    with location.open() as fp, location.open('rb') as bfp:
-        if location.suffix == '.json':
-            return json.load(fp)
-        elif yaml and location.suffix in ('.yaml', '.yml'):
-            return yaml.load(fp, Loader=yaml.FullLoader)
-        elif tomli and location.suffix in ('.toml', '.tml'):
-            return tomli.load(bfp)
-        elif location.suffix in ('.txt', '.list'):
-            return fp.readlines()
-        else:
-            raise ValueError('File of unknown format !!')
+    # imported here as generics depends on this module
+    from .generics import archives
+
+    # read through the archives module to allow files inside mounted submission archives
+    data = archives.read_bytes(location)
+    if location.suffix == '.json':
+        return json.loads(data)
+    elif yaml and location.suffix in ('.yaml', '.yml'):
+        return yaml.load(data.decode(), Loader=yaml.FullLoader)
+    elif tomli and location.suffix in ('.toml', '.tml'):
+        return tomli.loads(data.decode())
+    elif location.suffix in ('.txt', '.list'):
+        return data.decode().splitlines(keepends=True)
+    else:
+        raise ValueError('File of unknown format !!')
 
 
 def md5sum(file_path: Path, chunk_size: int = 8192):
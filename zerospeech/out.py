@@ -1,5 +1,6 @@
 """ File containing rich printing utilities """
 import contextlib
+import threading
 from types import TracebackType
 from typing import IO, Type, AnyStr, Iterator, Iterable, Union, Optional, List, Generator
 
@@ -98,6 +99,37 @@ error_console = Console(stderr=True, style="bold red", log_time_format="[error]"
 void_console = Console(file=DevNull())
 
 
+class SerializedConsole:
+    """ Console proxy shared by concurrent workers
+
+    Prints are serialized using a lock, and status spinners (rich allows only one live
+    display at a time) are replaced by a message printed when the status starts.
+    """
+
+    def __init__(self, con: Console):
+        self._console = con
+        self._lock = threading.RLock()
+
+    def print(self, *args, **kwargs):
+        with self._lock:
+            self._console.print(*args, **kwargs)
+
+    def log(self, *args, **kwargs):
+        with self._lock:
+            self._console.log(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def status(self, status, **_):
+        self.print(f":hourglass: {status}")
+        yield
+
+    def __getattr__(self, item):
+        return getattr(self._console, item)
+
+
+serialized_console = SerializedConsole(console)
+
+
 @contextlib.contextmanager
 def with_progress(show: bool = True, file_transfer: bool = False, spinner: bool = False) -> Generator[
     Progress, None, None]:
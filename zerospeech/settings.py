@@ -92,6 +92,12 @@ class ZerospeechBenchmarkSettings(BaseSettings):
     )
     admin_email: EmailStr = parse_obj_as(EmailStr, "nicolas.hamilakis@ens.psl.eu")
     api: ZerospeechAPI = ZerospeechAPI()
+    # max size (in bytes) of the pooled embeddings cache of the semantic task
+    semantic_cache_max_size: int = 2 * 1024 ** 3
+    # max size (in bytes) of the feature stores of the abx tasks
+    abx_cache_max_size: int = 20 * 1024 ** 3
+    # max size (in bytes) of the binary sidecars of score files
+    scores_cache_max_size: int = 512 * 1024 ** 2
 
     @validator("repo_origin", pre=True)
     def cast_url(cls, v):
@@ -115,6 +121,11 @@ class ZerospeechBenchmarkSettings(BaseSettings):
         """ Path to checkpoint folder """
         return self.APP_DIR / "checkpoints"
 
+    @property
+    def cache_path(self) -> Path:
+        """ Path to evaluation cache folder """
+        return self.APP_DIR / "cache"
+
     @property
     def repository_index(self) -> Path:
         """ Path to local repository index """
@@ -6,6 +6,7 @@ from typing import Optional, Union, Dict, ClassVar, Literal
 import yaml
 from pydantic import BaseModel, AnyUrl, ValidationError
 
+from zerospeech.generics import archives
 from zerospeech.misc import load_obj
 from zerospeech.leaderboards import PublicationEntry
 from .validation_context import ValidationContext
@@ -145,7 +146,7 @@ class MetaFile(BaseModel):
     @classmethod
     def from_file(cls, file: Path, enforce: bool = False):
         """ Load meta from object file (YAML, JSON, etc) """
-        if not file.is_file() and not enforce:
+        if not archives.is_file(file) and not enforce:
             return None
         return cls.parse_obj(load_obj(file))
 
@@ -245,11 +246,10 @@ class MetaFile(BaseModel):
     def benchmark_from_submission(cls, location: Path) -> Optional[BenchmarkList]:
         """ Extract the benchmark name from a given submission """
         meta_file = location / cls.file_stem
-        if not meta_file.is_file():
+        if not archives.is_file(meta_file):
             return None
 
-        with meta_file.open() as fp:
-            meta_obj = yaml.load(fp, Loader=yaml.FullLoader)
+        meta_obj = yaml.load(archives.read_bytes(meta_file).decode(), Loader=yaml.FullLoader)
         try:
             meta = cls.parse_obj(meta_obj)
             return meta.benchmark_name
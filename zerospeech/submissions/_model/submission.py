@@ -7,7 +7,7 @@ from typing import Optional, ClassVar
 from pydantic import BaseModel
 from pydantic import Field
 
-from zerospeech.generics import Item, Namespace
+from zerospeech.generics import Item, Namespace, archives
 from zerospeech.out import error_console, warning_console
 from zerospeech.tasks import BenchmarkParameters
 from .meta_file import MetaFile
@@ -140,6 +140,9 @@ class Submission(BaseModel, abc.ABC):
     def score_dir(self) -> Path:
         """ Get scores location """
         if self.__score_dir__ is None:
+            if archives.is_archive(self.location):
+                # archives are read-only: scores are written next to the archive
+                return self.location.parent / f"{self.location.stem}_scores"
             return self.location / 'scores'
         return self.__score_dir__
 
@@ -3,17 +3,17 @@ import functools
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional, Union
 
 import numpy as np
 import pandas as pd
 from pydantic import Field
 
 from zerospeech import validators
-from zerospeech.data_loaders import load_dataframe
+from zerospeech.data_loaders import load_dataframe, packed_index_file, write_packed_features
 from zerospeech.datasets import ZRC2017Dataset
 from zerospeech.generics import (
-    FileTypes, FileListItem, Namespace, Item, FileItem
+    FileTypes, FileListItem, Namespace, Item, FileItem, archives
 )
 from zerospeech.leaderboards import EntryDetails, LeaderboardBenchmarkName, LeaderboardEntry
 from zerospeech.leaderboards.abx17 import ABX17LeaderboardEntry, ABX17LeaderboardScores
@@ -27,7 +27,7 @@ class ABX17SubmissionValidator(SubmissionValidation):
     dataset: ZRC2017Dataset = Field(default_factory=lambda: ZRC2017Dataset.load())
 
     @staticmethod
-    def basic_abx_checks(item_list: FileListItem, abx_item: FileItem, tag: str):
+    def basic_abx_checks(item_list: Union[FileListItem, FileItem], abx_item: FileItem, tag: str):
         # wav_list are compared to items inside item file
         df = pd.read_csv(abx_item.file, sep=' ')
 
@@ -52,9 +52,15 @@ class ABX17SubmissionValidator(SubmissionValidation):
             # Verify that files have the same dimensions
             validators.numpy_col_comparison(1)
         ]
-        results = validators.numpy_array_list_check(
-            item_list, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(item_list, FileItem):
+            # Check packed features & their index
+            results = validators.packed_features_check(
+                item_list, expected=[str(f) for f in df['#file'].unique()], additional_checks=additional_checks
+            )
+        else:
+            results = validators.numpy_array_list_check(
+                item_list, f_list_checks=f_list_checks, additional_checks=additional_checks
+            )
         # add item tag
         add_item(tag, results)
         return results
@@ -255,45 +261,34 @@ class ABX17Submission(Submission):
         file_ext = FileTypes(file_ext)
         items = dict()
 
+        def _features_item(root: Path, name: str) -> Item:
+            # packed features (ex: english/1s.npy & its index) replace the directory of feature files
+            matrix_file = root / f"{name}.npy"
+            if archives.is_file(matrix_file):
+                return FileItem.from_file(matrix_file)
+            return FileListItem.from_dir(root / name, f_type=file_ext)
+
         if 'english' in tasks:
             if '1s' in sets:
-                items['english_1s'] = FileListItem.from_dir(
-                    path / 'english/1s', f_type=file_ext
-                )
+                items['english_1s'] = _features_item(path, 'english/1s')
             if '10s' in sets:
-                items['english_10s'] = FileListItem.from_dir(
-                    path / 'english/10s', f_type=file_ext
-                )
+                items['english_10s'] = _features_item(path, 'english/10s')
             if '120s' in sets:
-                items['english_120s'] = FileListItem.from_dir(
-                    path / 'english/120s', f_type=file_ext
-                )
+                items['english_120s'] = _features_item(path, 'english/120s')
         if 'french' in tasks:
             if '1s' in sets:
-                items['french_1s'] = FileListItem.from_dir(
-                    path / 'french/1s', f_type=file_ext
-                )
+                items['french_1s'] = _features_item(path, 'french/1s')
             if '10s' in sets:
-                items['french_10s'] = FileListItem.from_dir(
-                    path / 'french/10s', f_type=file_ext
-                )
+                items['french_10s'] = _features_item(path, 'french/10s')
             if '120s' in sets:
-                items['french_120s'] = FileListItem.from_dir(
-                    path / 'french/120s', f_type=file_ext
-                )
+                items['french_120s'] = _features_item(path, 'french/120s')
         if 'mandarin' in tasks:
             if '1s' in sets:
-                items['mandarin_1s'] = FileListItem.from_dir(
-                    path / 'mandarin/1s', f_type=file_ext
-                )
+                items['mandarin_1s'] = _features_item(path, 'mandarin/1s')
             if '10s' in sets:
-                items['mandarin_10s'] = FileListItem.from_dir(
-                    path / 'mandarin/10s', f_type=file_ext
-                )
+                items['mandarin_10s'] = _features_item(path, 'mandarin/10s')
             if '120s' in sets:
-                items['mandarin_120s'] = FileListItem.from_dir(
-                    path / 'mandarin/120s', f_type=file_ext
-                )
+                items['mandarin_120s'] = _features_item(path, 'mandarin/120s')
         if 'german' in tasks:
             # retro-compatibility with old format
             gloc = path / 'LANG1'
@@ -301,17 +296,11 @@ class ABX17Submission(Submission):
                 gloc = path / 'german'
 
             if '1s' in sets:
-                items['german_1s'] = FileListItem.from_dir(
-                    gloc / '1s', f_type=file_ext
-                )
+                items['german_1s'] = _features_item(gloc, '1s')
             if '10s' in sets:
-                items['german_10s'] = FileListItem.from_dir(
-                    gloc / '10s', f_type=file_ext
-                )
+                items['german_10s'] = _features_item(gloc, '10s')
             if '120s' in sets:
-                items['german_120s'] = FileListItem.from_dir(
-                    gloc / '120s', f_type=file_ext
-                )
+                items['german_120s'] = _features_item(gloc, '120s')
         if 'wolof' in tasks:
             # retro-compatibility with old format
             gloc = path / 'LANG2'
@@ -319,17 +308,11 @@ class ABX17Submission(Submission):
                 gloc = path / 'wolof'
 
             if '1s' in sets:
-                items['wolof_1s'] = FileListItem.from_dir(
-                    gloc / '1s', f_type=file_ext
-                )
+                items['wolof_1s'] = _features_item(gloc, '1s')
             if '10s' in sets:
-                items['wolof_10s'] = FileListItem.from_dir(
-                    gloc / '10s', f_type=file_ext
-                )
+                items['wolof_10s'] = _features_item(gloc, '10s')
             if '120s' in sets:
-                items['wolof_120s'] = FileListItem.from_dir(
-                    gloc / '120s', f_type=file_ext
-                )
+                items['wolof_120s'] = _features_item(gloc, '120s')
 
         submission.items = Namespace[Item](store=items)
         return submission
@@ -352,25 +335,55 @@ class ABX17Submission(Submission):
             params=self.params
         )
 
+    @staticmethod
+    def _features_zippable(dir_name: str, item: Union[FileListItem, FileItem]) -> List[Tuple[str, Path]]:
+        """ List files of a subset (feature files or packed features & their index) """
+        if isinstance(item, FileItem):
+            parent = str(Path(dir_name).parent)
+            return [(f"{parent}/", item.file), (f"{parent}/", packed_index_file(item.file))]
+        return [(dir_name, f) for f in item.files_list]
+
+    def pack(self, clean: bool = False) -> List[Path]:
+        """ Convert the directories of feature files into packed features (one matrix & its index per subset)
+
+        clean: delete the directories once packed
+        Returns:
+            the packed matrix files
+        """
+        packed = []
+        for name, item in self.items:
+            if not isinstance(item, FileListItem) or len(item.files_list) == 0:
+                continue
+            language, duration = name.split('_')
+            language_dir = self.location / {'german': 'LANG1', 'wolof': 'LANG2'}.get(language, language)
+            if not language_dir.is_dir():
+                language_dir = self.location / language
+            matrix_file = language_dir / f"{duration}.npy"
+            write_packed_features(sorted(item.files_list), matrix_file)
+            if clean:
+                shutil.rmtree(language_dir / duration)
+            packed.append(matrix_file)
+        return packed
+
     def __zippable__(self):
         return [
             ("", self.meta_file),
             ("", self.params_file),
-            *[("english/1s/", f) for f in self.items.english_1s],
-            *[("english/10s/", f) for f in self.items.english_10s],
-            *[("english/120s/", f) for f in self.items.english_120s],
-            *[("french/1s/", f) for f in self.items.french_1s],
-            *[("french/10s/", f) for f in self.items.french_10s],
-            *[("french/120s/", f) for f in self.items.french_120s],
-            *[("mandarin/1s/", f) for f in self.items.mandarin_1s],
-            *[("mandarin/10s/", f) for f in self.items.mandarin_10s],
-            *[("mandarin/120s/", f) for f in self.items.mandarin_120s],
-            *[("german/1s/", f) for f in self.items.german_1s],
-            *[("german/10s/", f) for f in self.items.german_10s],
-            *[("german/120s/", f) for f in self.items.german_120s],
-            *[("wolof/1s/", f) for f in self.items.wolof_1s],
-            *[("wolof/10s/", f) for f in self.items.wolof_10s],
-            *[("wolof/120s/", f) for f in self.items.wolof_120s],
+            *self._features_zippable("english/1s/", self.items.english_1s),
+            *self._features_zippable("english/10s/", self.items.english_10s),
+            *self._features_zippable("english/120s/", self.items.english_120s),
+            *self._features_zippable("french/1s/", self.items.french_1s),
+            *self._features_zippable("french/10s/", self.items.french_10s),
+            *self._features_zippable("french/120s/", self.items.french_120s),
+            *self._features_zippable("mandarin/1s/", self.items.mandarin_1s),
+            *self._features_zippable("mandarin/10s/", self.items.mandarin_10s),
+            *self._features_zippable("mandarin/120s/", self.items.mandarin_120s),
+            *self._features_zippable("german/1s/", self.items.german_1s),
+            *self._features_zippable("german/10s/", self.items.german_10s),
+            *self._features_zippable("german/120s/", self.items.german_120s),
+            *self._features_zippable("wolof/1s/", self.items.wolof_1s),
+            *self._features_zippable("wolof/10s/", self.items.wolof_10s),
+            *self._features_zippable("wolof/120s/", self.items.wolof_120s),
             *[("scores/", f) for f in self.score_dir.iterdir()]
         ]
 
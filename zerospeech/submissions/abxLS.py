@@ -2,16 +2,16 @@ import functools
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Optional, List
+from typing import Tuple, Optional, List, Union
 
 import numpy as np
 from pydantic import Field
 
 import zerospeech.validators as validators
-from zerospeech.data_loaders import load_dataframe
+from zerospeech.data_loaders import load_dataframe, packed_index_file, write_packed_features
 from zerospeech.datasets import AbxLSDataset
 from zerospeech.generics import (
-    FileListItem, Namespace, Item, FileTypes
+    FileListItem, FileItem, Namespace, Item, FileTypes, archives
 )
 from zerospeech.leaderboards import EntryDetails, LeaderboardBenchmarkName, LeaderboardEntry
 from zerospeech.leaderboards.abxLS import (
@@ -30,7 +30,7 @@ class AbxLSSubmissionValidator(SubmissionValidation):
     dataset: AbxLSDataset = Field(default_factory=lambda: AbxLSDataset.load())
 
     @validation_fn(target='dev_clean')
-    def validate_dev_clean(self, dev_clean: FileListItem):
+    def validate_dev_clean(self, dev_clean: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -52,16 +52,24 @@ class AbxLSSubmissionValidator(SubmissionValidation):
             # Verify that files have the same dimensions
             validators.numpy_col_comparison(1)
         ]
-        # Check file list
-        results = validators.numpy_array_list_check(
-            dev_clean, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(dev_clean, FileItem):
+            # Check packed features & their index
+            results = validators.packed_features_check(
+                dev_clean,
+                expected=[f.stem for f in self.dataset.index.subsets.dev_clean.items.wav_list.files_list],
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                dev_clean, f_list_checks=f_list_checks, additional_checks=additional_checks
+            )
         # add item tag
         add_item('dev_clean', results)
         return results
 
     @validation_fn(target='dev_other')
-    def validate_dev_other(self, dev_other: FileListItem):
+    def validate_dev_other(self, dev_other: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -83,16 +91,24 @@ class AbxLSSubmissionValidator(SubmissionValidation):
             # Verify that files have the same dimensions
             validators.numpy_col_comparison(1)
         ]
-        # Check file list
-        results = validators.numpy_array_list_check(
-            dev_other, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(dev_other, FileItem):
+            # Check packed features & their index
+            results = validators.packed_features_check(
+                dev_other,
+                expected=[f.stem for f in self.dataset.index.subsets.dev_other.items.wav_list.files_list],
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                dev_other, f_list_checks=f_list_checks, additional_checks=additional_checks
+            )
         # add item tag
         add_item('dev_other', results)
         return results
 
     @validation_fn(target='test_clean')
-    def validate_test_clean(self, test_clean: FileListItem):
+    def validate_test_clean(self, test_clean: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -114,16 +130,24 @@ class AbxLSSubmissionValidator(SubmissionValidation):
             # Verify that files have the same dimensions
             validators.numpy_col_comparison(1)
         ]
-        # Check file list
-        results = validators.numpy_array_list_check(
-            test_clean, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(test_clean, FileItem):
+            # Check packed features & their index
+            results = validators.packed_features_check(
+                test_clean,
+                expected=[f.stem for f in self.dataset.index.subsets.test_clean.items.wav_list.files_list],
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                test_clean, f_list_checks=f_list_checks, additional_checks=additional_checks
+            )
         # add item tag
         add_item('test_clean', results)
         return results
 
     @validation_fn(target='test_other')
-    def validate_test_other(self, test_other: FileListItem):
+    def validate_test_other(self, test_other: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -145,10 +169,18 @@ class AbxLSSubmissionValidator(SubmissionValidation):
             # Verify that files have the same dimensions
             validators.numpy_col_comparison(1)
         ]
-        # Check file list
-        results = validators.numpy_array_list_check(
-            test_other, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(test_other, FileItem):
+            # Check packed features & their index
+            results = validators.packed_features_check(
+                test_other,
+                expected=[f.stem for f in self.dataset.index.subsets.test_other.items.wav_list.files_list],
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                test_other, f_list_checks=f_list_checks, additional_checks=additional_checks
+            )
         # add item tag
         add_item('test_other', results)
         return results
@@ -268,25 +300,25 @@ class AbxLSSubmission(Submission):
         file_ext = submission.params.score_file_type.replace('.', '')
         file_ext = FileTypes(file_ext)
         items = dict()
+
+        def _features_item(name: str) -> Item:
+            # packed features (ex: dev-clean.npy & its index) replace the directory of feature files
+            matrix_file = path / f"{name}.npy"
+            if archives.is_file(matrix_file):
+                return FileItem.from_file(matrix_file)
+            return FileListItem.from_dir(path / name, f_type=file_ext)
+
         if 'clean' in tasks:
             if 'dev' in sets:
-                items['dev_clean'] = FileListItem.from_dir(
-                    path / 'dev-clean', f_type=file_ext
-                )
+                items['dev_clean'] = _features_item('dev-clean')
             if 'test' in sets:
-                items['test_clean'] = FileListItem.from_dir(
-                    path / 'test-clean', f_type=file_ext
-                )
+                items['test_clean'] = _features_item('test-clean')
 
         if 'other' in tasks:
             if 'dev' in sets:
-                items['dev_other'] = FileListItem.from_dir(
-                    path / 'dev-other', f_type=file_ext
-                )
+                items['dev_other'] = _features_item('dev-other')
             if 'test' in sets:
-                items['test_other'] = FileListItem.from_dir(
-                    path / 'test-other', f_type=file_ext
-                )
+                items['test_other'] = _features_item('test-other')
 
         submission.items = Namespace[Item](store=items)
         return submission
@@ -328,17 +360,43 @@ class AbxLSSubmission(Submission):
         if instruction_file.is_file():
             shutil.copy(instruction_file, location / 'help.md')
 
+    @staticmethod
+    def _features_zippable(dir_name: str, item: Union[FileListItem, FileItem]) -> List[Tuple[str, Path]]:
+        """ List files of a subset (feature files or packed features & their index) """
+        if isinstance(item, FileItem):
+            return [("", item.file), ("", packed_index_file(item.file))]
+        return [(dir_name, f) for f in item.files_list]
+
     def __zippable__(self):
         return [
             ("", self.meta_file),
             ("", self.params_file),
-            *[("dev-clean/", f) for f in self.items.dev_clean.files_list],
-            *[("dev-other/", f) for f in self.items.dev_other.files_list],
-            *[("test-clean/", f) for f in self.items.test_clean.files_list],
-            *[("test-other/", f) for f in self.items.test_other.files_list],
+            *self._features_zippable("dev-clean/", self.items.dev_clean),
+            *self._features_zippable("dev-other/", self.items.dev_other),
+            *self._features_zippable("test-clean/", self.items.test_clean),
+            *self._features_zippable("test-other/", self.items.test_other),
             *[("scores/", f) for f in self.score_dir.iterdir()]
         ]
 
+    def pack(self, clean: bool = False) -> List[Path]:
+        """ Convert the directories of feature files into packed features (one matrix & its index per subset)
+
+        clean: delete the directories once packed
+        Returns:
+            the packed matrix files
+        """
+        packed = []
+        for name, item in self.items:
+            if not isinstance(item, FileListItem) or len(item.files_list) == 0:
+                continue
+            subset_dir = self.location / name.replace('_', '-')
+            matrix_file = self.location / f"{subset_dir.name}.npy"
+            write_packed_features(sorted(item.files_list), matrix_file)
+            if clean:
+                shutil.rmtree(subset_dir)
+            packed.append(matrix_file)
+        return packed
+
     def get_scores(self):
         """ Load score Dir"""
         return ABXLSScoreDir(
@@ -10,7 +10,7 @@ from pydantic import Field
 from zerospeech import validators, data_loaders
 from zerospeech.datasets import ProsAuditLMDataset
 from zerospeech.generics import (
-    FileItem, Item, Namespace
+    FileItem, FileTypes, Item, Namespace, archives
 )
 from zerospeech.leaderboards import LeaderboardEntry
 from zerospeech.leaderboards.prosaudit import ProsAuditLeaderboardEntry, ProsAuditEntryScores
@@ -25,6 +25,7 @@ class ProsodySubmissionValidation(SubmissionValidation):
 
     @validation_fn(target="english_dev")
     def validation_english_dev(self, english_dev: FileItem):
+        expected = [f.stem for f in self.dataset.index.subsets.english_dev.items.wav_list.files_list]
         additional_df_checks = [
             # Verify that result df has expected columns
             functools.partial(
@@ -32,7 +33,7 @@ class ProsodySubmissionValidation(SubmissionValidation):
             # Verify that result df has all filenames in set
             functools.partial(
                 validators.dataframe_index_check,
-                expected=[f.stem for f in self.dataset.index.subsets.english_dev.items.wav_list.files_list]
+                expected=expected
             ),
             # Verify that scores are in float
             functools.partial(
@@ -42,9 +43,12 @@ class ProsodySubmissionValidation(SubmissionValidation):
             )
         ]
 
-        # check dataframe
-        results = validators.dataframe_check(english_dev, additional_df_checks, sep=' ', header=None,
-                                             names=['filename', 'score'], index_col='filename')
+        if english_dev.file_type in FileTypes.arrow_types():
+            # check table (schema & filename column only)
+            results = validators.score_table_check(english_dev, expected=expected)
+        else:
+            # check dataframe
+            results = validators.score_file_check(english_dev, additional_df_checks)
 
         # add item tag
         add_item('english_dev', results)
@@ -52,6 +56,7 @@ class ProsodySubmissionValidation(SubmissionValidation):
 
     @validation_fn(target="english_test")
     def validation_english_dev(self, english_test: FileItem):
+        expected = [f.stem for f in self.dataset.index.subsets.english_test.items.wav_list.files_list]
         additional_df_checks = [
             # Verify that result df has expected columns
             functools.partial(
@@ -59,7 +64,7 @@ class ProsodySubmissionValidation(SubmissionValidation):
             # Verify that result df has all filenames in set
             functools.partial(
                 validators.dataframe_index_check,
-                expected=[f.stem for f in self.dataset.index.subsets.english_test.items.wav_list.files_list]
+                expected=expected
             ),
             # Verify that scores are in float
             functools.partial(
@@ -69,9 +74,12 @@ class ProsodySubmissionValidation(SubmissionValidation):
             )
         ]
 
-        # check dataframe
-        results = validators.dataframe_check(english_test, additional_df_checks, sep=' ', header=None,
-                                             names=['filename', 'score'], index_col='filename')
+        if english_test.file_type in FileTypes.arrow_types():
+            # check table (schema & filename column only)
+            results = validators.score_table_check(english_test, expected=expected)
+        else:
+            # check dataframe
+            results = validators.score_file_check(english_test, additional_df_checks)
 
         # add item tag
         add_item('english_test', results)
@@ -204,15 +212,16 @@ class ProsodySubmission(Submission):
             location=path
         )
 
-        if not submission.params_file.is_file():
+        # if params not set export defaults (archives are read-only)
+        if not archives.is_file(submission.params_file) and archives.archive_of(path) is None:
             ProsodyLMParameters().export(submission.params_file)
 
         items = dict()
         if 'english' in tasks:
             if 'dev' in sets:
-                items['english_dev'] = FileItem.from_file(path / 'english_dev.txt')
+                items['english_dev'] = FileItem.from_file(data_loaders.score_file_location(path, 'english_dev'))
             if 'test' in sets:
-                items['english_test'] = FileItem.from_file(path / 'english_test.txt')
+                items['english_test'] = FileItem.from_file(data_loaders.score_file_location(path, 'english_test'))
 
         submission.items = Namespace[Item](store=items)
         return submission
@@ -252,7 +261,7 @@ class ProsodySubmission(Submission):
             shutil.copy(instruction_file, location / 'help.md')
 
     def load_parameters(self) -> ProsodyLMParameters:
-        if self.params_file.is_file():
+        if archives.is_file(self.params_file):
             obj = load_obj(self.params_file)
             return ProsodyLMParameters.parse_obj(obj)
         return ProsodyLMParameters()
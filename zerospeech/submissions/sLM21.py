@@ -3,17 +3,17 @@ import shutil
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple, List, Optional, Dict
+from typing import Any, Callable, Tuple, List, Optional, Dict, Union
 
 import numpy as np
 import pandas as pd
 from pydantic import Extra, Field
 
 import zerospeech.validators as validators
-from zerospeech.data_loaders import load_dataframe
+from zerospeech.data_loaders import load_dataframe, pooled_index_file, score_file_location
 from zerospeech.datasets import SLM21Dataset
 from zerospeech.generics import (
-    FileItem, Namespace, Item, FileListItem, FileTypes
+    FileItem, Namespace, Item, FileListItem, FileTypes, archives
 )
 from zerospeech.leaderboards import EntryDetails, LeaderboardBenchmarkName
 from zerospeech.leaderboards.sLM21 import (
@@ -24,15 +24,39 @@ from zerospeech.leaderboards.sLM21 import (
 )
 from zerospeech.misc import load_obj
 from zerospeech.tasks.lm import SLM21BenchmarkParameters
+from zerospeech.tasks.lm.params import SEMANTIC_MANIFEST_FILENAME, SemanticPooling
+from zerospeech.tasks.lm.semantic_engine import PooledEmbeddings
 from ._model import MetaFile, ScoreDir, SubmissionValidation, validation_fn, add_item, Submission
 
 
 class SLM21SubmissionValidator(SubmissionValidation):
     """ Class that contains all functions to validate a sLM21 submission """
     dataset: SLM21Dataset = Field(default_factory=lambda: SLM21Dataset.load())
+    # fused mode: semantic embeddings are pooled while they are loaded for validation
+    fused_pooling: Optional[SemanticPooling] = None
+    pooled: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    # semantic embeddings are memory-mapped while they are validated (ex: 'r')
+    mmap_mode: Optional[str] = None
+
+    def pooling_collector(self, item_name: str) -> Optional[Callable[[Path, np.ndarray], None]]:
+        """ Function retaining the pooled vector of each validated array of an item (None if not fused) """
+        if self.fused_pooling is None:
+            return None
+
+        vectors = self.pooled.setdefault(item_name, {})
+        pooling_fn = self.fused_pooling.fn
+        if self.mmap_mode is not None:
+            pooling_fn = self.fused_pooling.streaming_fn()
+
+        def _collect(file: Path, array: np.ndarray):
+            # copied: pooled vectors must not be views of memory-mapped files
+            vectors[file.stem] = np.array(np.ravel(pooling_fn(array)))
+
+        return _collect
 
     @validation_fn(target='lexical_dev')
     def validating_lexical_dev(self, lexical_dev: FileItem):
+        expected = [f.stem for f in self.dataset.index.subsets.lexical_dev.items.wav_list.files_list]
         additional_df_checks = [
             # Verify that result df has expected columns
             functools.partial(
@@ -40,7 +64,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
             # Verify that result df has all filenames in set
             functools.partial(
                 validators.dataframe_index_check,
-                expected=[f.stem for f in self.dataset.index.subsets.lexical_dev.items.wav_list.files_list]
+                expected=expected
             ),
             # Verify that scores are in float
             functools.partial(
@@ -50,9 +74,12 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # check dataframe
-        results = validators.dataframe_check(lexical_dev, additional_df_checks, sep=' ', header=None,
-                                             names=['filename', 'score'], index_col='filename')
+        if lexical_dev.file_type in FileTypes.arrow_types():
+            # check table (schema & filename column only)
+            results = validators.score_table_check(lexical_dev, expected=expected)
+        else:
+            # check dataframe
+            results = validators.score_file_check(lexical_dev, additional_df_checks)
 
         # add item tag
         add_item('lexical_dev', results)
@@ -60,6 +87,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
 
     @validation_fn(target='lexical_test')
     def validating_lexical_test(self, lexical_test: FileItem):
+        expected = [f.stem for f in self.dataset.index.subsets.lexical_test.items.wav_list.files_list]
         # check that file is a correct space separated list with two columns
         additional_df_checks = [
             # Verify that result df has expected columns
@@ -68,7 +96,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
             # Verify that result df has all filenames in set
             functools.partial(
                 validators.dataframe_index_check,
-                expected=[f.stem for f in self.dataset.index.subsets.lexical_test.items.wav_list.files_list]
+                expected=expected
             ),
             # Verify that scores are in float
             functools.partial(
@@ -78,16 +106,19 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # check dataframe
-        results = validators.dataframe_check(lexical_test, additional_df_checks, sep=' ', header=None,
-                                             names=['filename', 'score'], index_col='filename')
+        if lexical_test.file_type in FileTypes.arrow_types():
+            # check table (schema & filename column only)
+            results = validators.score_table_check(lexical_test, expected=expected)
+        else:
+            # check dataframe
+            results = validators.score_file_check(lexical_test, additional_df_checks)
 
         # add item tag
         add_item('lexical_test', results)
         return results
 
     @validation_fn(target='semantic_dev_synthetic')
-    def validating_semantic_dev_synthetic(self, semantic_dev_synthetic: FileListItem):
+    def validating_semantic_dev_synthetic(self, semantic_dev_synthetic: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -108,17 +139,26 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # Check file list
-        results = validators.numpy_array_list_check(
-            semantic_dev_synthetic, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(semantic_dev_synthetic, FileItem):
+            # Check pre-pooled matrix & its filename index
+            results = validators.pooled_matrix_check(
+                semantic_dev_synthetic,
+                expected=self.dataset.index.subsets.semantic_dev.items.synthetic_wav_list.files_list,
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                semantic_dev_synthetic, f_list_checks=f_list_checks, additional_checks=additional_checks,
+                mmap_mode=self.mmap_mode, on_load=self.pooling_collector('semantic_dev_synthetic')
+            )
 
         # add item tag
         add_item('semantic_dev_synthetic', results)
         return results
 
     @validation_fn(target='semantic_dev_librispeech')
-    def validating_semantic_dev_librispeech(self, semantic_dev_librispeech: FileListItem):
+    def validating_semantic_dev_librispeech(self, semantic_dev_librispeech: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -139,17 +179,26 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # Check file list
-        results = validators.numpy_array_list_check(
-            semantic_dev_librispeech, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(semantic_dev_librispeech, FileItem):
+            # Check pre-pooled matrix & its filename index
+            results = validators.pooled_matrix_check(
+                semantic_dev_librispeech,
+                expected=self.dataset.index.subsets.semantic_dev.items.librispeech_wav_list.files_list,
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                semantic_dev_librispeech, f_list_checks=f_list_checks, additional_checks=additional_checks,
+                mmap_mode=self.mmap_mode, on_load=self.pooling_collector('semantic_dev_librispeech')
+            )
 
         # add item tag
         add_item('semantic_dev_librispeech', results)
         return results
 
     @validation_fn(target='semantic_test_synthetic')
-    def validating_semantic_test_synthetic(self, semantic_test_synthetic: FileListItem):
+    def validating_semantic_test_synthetic(self, semantic_test_synthetic: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -170,17 +219,26 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # Check file list
-        results = validators.numpy_array_list_check(
-            semantic_test_synthetic, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(semantic_test_synthetic, FileItem):
+            # Check pre-pooled matrix & its filename index
+            results = validators.pooled_matrix_check(
+                semantic_test_synthetic,
+                expected=self.dataset.index.subsets.semantic_test.items.synthetic_wav_list.files_list,
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                semantic_test_synthetic, f_list_checks=f_list_checks, additional_checks=additional_checks,
+                mmap_mode=self.mmap_mode, on_load=self.pooling_collector('semantic_test_synthetic')
+            )
 
         # add item tag
         add_item('semantic_test_synthetic', results)
         return results
 
     @validation_fn(target='semantic_test_librispeech')
-    def validating_semantic_test_librispeech(self, semantic_test_librispeech: FileListItem):
+    def validating_semantic_test_librispeech(self, semantic_test_librispeech: Union[FileListItem, FileItem]):
         f_list_checks = [
             # Verify that all necessary files are present
             functools.partial(
@@ -201,10 +259,19 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # Check file list
-        results = validators.numpy_array_list_check(
-            semantic_test_librispeech, f_list_checks=f_list_checks, additional_checks=additional_checks
-        )
+        if isinstance(semantic_test_librispeech, FileItem):
+            # Check pre-pooled matrix & its filename index
+            results = validators.pooled_matrix_check(
+                semantic_test_librispeech,
+                expected=self.dataset.index.subsets.semantic_test.items.librispeech_wav_list.files_list,
+                additional_checks=additional_checks
+            )
+        else:
+            # Check file list
+            results = validators.numpy_array_list_check(
+                semantic_test_librispeech, f_list_checks=f_list_checks, additional_checks=additional_checks,
+                mmap_mode=self.mmap_mode, on_load=self.pooling_collector('semantic_test_librispeech')
+            )
 
         # add item tag
         add_item('semantic_test_librispeech', results)
@@ -212,6 +279,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
 
     @validation_fn(target='syntactic_dev')
     def validating_syntactic_dev(self, syntactic_dev: FileItem):
+        expected = [f.stem for f in self.dataset.index.subsets.syntactic_dev.items.wav_list.files_list]
         additional_df_checks = [
             # Verify that result df has expected columns
             functools.partial(
@@ -219,7 +287,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
             # Verify that result df has all filenames in set
             functools.partial(
                 validators.dataframe_index_check,
-                expected=[f.stem for f in self.dataset.index.subsets.syntactic_dev.items.wav_list.files_list]
+                expected=expected
             ),
             # Verify that scores are in float
             functools.partial(
@@ -229,9 +297,12 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # check dataframe
-        results = validators.dataframe_check(syntactic_dev, additional_df_checks, sep=' ', header=None,
-                                             names=['filename', 'score'], index_col='filename')
+        if syntactic_dev.file_type in FileTypes.arrow_types():
+            # check table (schema & filename column only)
+            results = validators.score_table_check(syntactic_dev, expected=expected)
+        else:
+            # check dataframe
+            results = validators.score_file_check(syntactic_dev, additional_df_checks)
 
         # add item tag
         add_item('syntactic_dev', results)
@@ -239,6 +310,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
 
     @validation_fn(target='syntactic_test')
     def validating_syntactic_test(self, syntactic_test: FileItem):
+        expected = [f.stem for f in self.dataset.index.subsets.syntactic_test.items.wav_list.files_list]
         additional_df_checks = [
             # Verify that result df has expected columns
             functools.partial(
@@ -246,7 +318,7 @@ class SLM21SubmissionValidator(SubmissionValidation):
             # Verify that result df has all filenames in set
             functools.partial(
                 validators.dataframe_index_check,
-                expected=[f.stem for f in self.dataset.index.subsets.syntactic_test.items.wav_list.files_list]
+                expected=expected
             ),
             # Verify that scores are in float
             functools.partial(
@@ -256,9 +328,12 @@ class SLM21SubmissionValidator(SubmissionValidation):
             )
         ]
 
-        # check dataframe
-        results = validators.dataframe_check(syntactic_test, additional_df_checks, sep=' ', header=None,
-                                             names=['filename', 'score'], index_col='filename')
+        if syntactic_test.file_type in FileTypes.arrow_types():
+            # check table (schema & filename column only)
+            results = validators.score_table_check(syntactic_test, expected=expected)
+        else:
+            # check dataframe
+            results = validators.score_file_check(syntactic_test, additional_df_checks)
 
         # add item tag
         add_item('syntactic_test', results)
@@ -527,6 +602,9 @@ class SLM21Submission(Submission):
     """ Submission for SLM21 Benchmark """
     sets: Tuple = ('dev', 'test')
     tasks: Tuple = ('lexical', 'syntactic', 'semantic')
+    # semantic embeddings pooled during validation (fused mode)
+    fused_pooling: Optional[SemanticPooling] = None
+    fused_embeddings: Dict[str, PooledEmbeddings] = Field(default_factory=dict)
 
     @classmethod
     def load(cls, path: Path, *,
@@ -540,8 +618,8 @@ class SLM21Submission(Submission):
             location=path
         )
 
-        # if params not set export defaults
-        if not submission.params_file.is_file():
+        # if params not set export defaults (archives are read-only)
+        if not archives.is_file(submission.params_file) and archives.archive_of(path) is None:
             SLM21BenchmarkParameters().export(submission.params_file)
 
         # Load items
@@ -550,41 +628,58 @@ class SLM21Submission(Submission):
         if 'lexical' in tasks:
             lexical_dir = path / 'lexical'
             if 'dev' in sets:
-                items['lexical_dev'] = FileItem.from_file(lexical_dir / "dev.txt")
+                items['lexical_dev'] = FileItem.from_file(score_file_location(lexical_dir, "dev"))
             if 'test' in sets:
-                items['lexical_test'] = FileItem.from_file(lexical_dir / "test.txt")
+                items['lexical_test'] = FileItem.from_file(score_file_location(lexical_dir, "test"))
 
         # include syntactic for each set
         if 'syntactic' in tasks:
             syntactic_dir = path / 'syntactic'
             if 'dev' in sets:
-                items['syntactic_dev'] = FileItem.from_file(syntactic_dir / "dev.txt")
+                items['syntactic_dev'] = FileItem.from_file(score_file_location(syntactic_dir, "dev"))
             if 'test' in sets:
-                items['syntactic_test'] = FileItem.from_file(syntactic_dir / "test.txt")
+                items['syntactic_test'] = FileItem.from_file(score_file_location(syntactic_dir, "test"))
 
         # include semantic task for each set
         file_ext = submission.params.syntactic.score_files_type.replace('.', '')
         file_ext = FileTypes(file_ext)
         if 'semantic' in tasks:
             semantic_dir = path / 'semantic'
+
+            def _semantic_item(subset: str) -> Item:
+                # a pre-pooled matrix (ex: dev/synthetic.npy) replaces the directory of embeddings
+                matrix_file = semantic_dir / f"{subset}.npy"
+                if archives.is_file(matrix_file):
+                    return FileItem.from_file(matrix_file)
+                return FileListItem.from_dir(semantic_dir / subset, f_type=file_ext)
+
             if 'dev' in sets:
-                items['semantic_dev_synthetic'] = FileListItem.from_dir(
-                    semantic_dir / "dev/synthetic", f_type=file_ext
-                )
-                items['semantic_dev_librispeech'] = FileListItem.from_dir(
-                    semantic_dir / "dev/librispeech", f_type=file_ext
-                )
+                items['semantic_dev_synthetic'] = _semantic_item("dev/synthetic")
+                items['semantic_dev_librispeech'] = _semantic_item("dev/librispeech")
             if 'test' in sets:
-                items['semantic_test_synthetic'] = FileListItem.from_dir(
-                    semantic_dir / "test/synthetic", f_type=file_ext
-                )
-                items['semantic_test_librispeech'] = FileListItem.from_dir(
-                    semantic_dir / "test/librispeech", f_type=file_ext
-                )
+                items['semantic_test_synthetic'] = _semantic_item("test/synthetic")
+                items['semantic_test_librispeech'] = _semantic_item("test/librispeech")
 
         submission.items = Namespace[Item](store=items)
         return submission
 
+    @staticmethod
+    def _semantic_zippable(dir_name: str, item: Union[FileListItem, FileItem]) -> List[Tuple[str, Path]]:
+        """ List files of a semantic subset (embedding files or pre-pooled matrix & its index) """
+        if isinstance(item, FileItem):
+            parent = str(Path(dir_name).parent)
+            return [(f"{parent}/", item.file), (f"{parent}/", pooled_index_file(item.file))]
+        return [(dir_name, f) for f in item.files_list]
+
+    @staticmethod
+    def _is_manifest(file: Path) -> bool:
+        """ Semantic evaluation state (not part of the scores) """
+        return file.name in {SEMANTIC_MANIFEST_FILENAME.format(s) for s in ('dev', 'test')}
+
+    def has_scores(self) -> bool:
+        """ Check if score dir contains scores (evaluation state is ignored) """
+        return any(not self._is_manifest(f) for f in self.score_dir.rglob('*'))
+
     def __zippable__(self) -> List[Tuple[str, Path]]:
         return [
             ("", self.meta_file),
@@ -594,11 +689,11 @@ class SLM21Submission(Submission):
             ("lexical/", self.items.lexical_test.file),
             ("syntactic/", self.items.syntactic_dev.file),
             ("syntactic/", self.items.syntactic_test.file),
-            *[("semantic/dev/synthetic/", f) for f in self.items.semantic_dev_synthetic.files_list],
-            *[("semantic/dev/librispeech/", f) for f in self.items.semantic_dev_librispeech.files_list],
-            *[("semantic/test/synthetic/", f) for f in self.items.semantic_test_synthetic.files_list],
-            *[("semantic/test/librispeech/", f) for f in self.items.semantic_test_librispeech.files_list],
-            *[("scores/", f) for f in self.score_dir.iterdir()]
+            *self._semantic_zippable("semantic/dev/synthetic/", self.items.semantic_dev_synthetic),
+            *self._semantic_zippable("semantic/dev/librispeech/", self.items.semantic_dev_librispeech),
+            *self._semantic_zippable("semantic/test/synthetic/", self.items.semantic_test_synthetic),
+            *self._semantic_zippable("semantic/test/librispeech/", self.items.semantic_test_librispeech),
+            *[("scores/", f) for f in self.score_dir.iterdir() if not self._is_manifest(f)]
         ]
 
     @classmethod
@@ -630,14 +725,29 @@ class SLM21Submission(Submission):
             shutil.copy(instruction_file, location / 'help.md')
 
     def load_parameters(self) -> SLM21BenchmarkParameters:
-        if self.params_file.is_file():
+        if archives.is_file(self.params_file):
             obj = load_obj(self.params_file)
             return SLM21BenchmarkParameters.parse_obj(obj)
         return SLM21BenchmarkParameters()
 
     def __validate_submission__(self):
         """ Run validation on the submission data """
-        self.validation_output += SLM21SubmissionValidator().validate(self)
+        semantic = self.params.semantic
+        fused_pooling = None
+        if 'semantic' in self.tasks and semantic.fused_validation and semantic.pooling != SemanticPooling.off:
+            fused_pooling = semantic.pooling
+
+        validator = SLM21SubmissionValidator(
+            fused_pooling=fused_pooling, mmap_mode='r' if semantic.memory_map else None
+        )
+        self.validation_output += validator.validate(self)
+
+        # keep pooled vectors for the semantic task
+        self.fused_pooling = fused_pooling
+        self.fused_embeddings = {
+            name: PooledEmbeddings.from_vectors(vectors.items())
+            for name, vectors in validator.pooled.items()
+        }
 
     def get_scores(self):
         """ """
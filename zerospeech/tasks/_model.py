@@ -1,12 +1,12 @@
 import abc
 from pathlib import Path
-from typing import ClassVar, Dict, Any
+from typing import ClassVar, Dict, Any, Optional, Tuple
 from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 from pydantic import root_validator
 
-from zerospeech.out import console as out_console, void_console
+from zerospeech.out import console as out_console, void_console, serialized_console
 
 if TYPE_CHECKING:
     from zerospeech.submissions import Submission
@@ -32,6 +32,10 @@ class BenchmarkParameters(BaseModel, abc.ABC):
 class Task(BaseModel, abc.ABC):
     """ Abstract definition of a task """
     quiet: bool = False
+    # restrict evaluation to these sets (None: all the sets of the submission)
+    only_sets: Optional[Tuple[str, ...]] = None
+    # task runs alongside other tasks (console output is serialized)
+    concurrent: bool = False
 
     @property
     def name(self) -> str:
@@ -42,8 +46,16 @@ class Task(BaseModel, abc.ABC):
         """ Console to print output """
         if self.quiet:
             return void_console
+        if self.concurrent:
+            return serialized_console
         return out_console
 
+    def selected_sets(self, sets: Tuple[str, ...]) -> Tuple[str, ...]:
+        """ Filter the sets to evaluate """
+        if self.only_sets is None:
+            return tuple(sets)
+        return tuple(s for s in sets if s in self.only_sets)
+
     @root_validator(pre=True)
     def base_validation(cls, values):
         assert hasattr(cls, "_name"), f"A benchmark requires a name (add a _name attribute to the subclass {cls})"
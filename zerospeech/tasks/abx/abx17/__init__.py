@@ -1,2 +1,2 @@
 from .task import SimpleABXTask
-from .params import ABXMode, ABXDistanceMode, ABXParameters
+from .params import ABXMode, ABXDistanceMode, ABXParameters, ABXBackend
@@ -7,6 +7,9 @@ import yaml
 
 from zerospeech.tasks import BenchmarkParameters
 
+# seed of the zrc_abx2 backend, groups of the numpy backend are sampled with the same default
+SEED = 3459
+
 
 class ABXMode(str, Enum):
     """ ABX mode of computation """
@@ -29,6 +32,14 @@ class ABXDistanceMode(str, Enum):
     kl_symmetric = 'kl_symmetric'
 
 
+class ABXBackend(str, Enum):
+    """ Implementation computing the ABX scores """
+    # libriabx if installed, numpy otherwise
+    auto = "auto"
+    libriabx = "libriabx"
+    numpy = "numpy"
+
+
 FileNameType = Dict[str, Dict[str, str]]
 FileTypesTXT = Literal['.npy', '.txt']
 
@@ -49,17 +60,25 @@ class ABXParameters(BenchmarkParameters):
     # When computing the ABX across score, maximum
     # number of speaker X to sample per couple A,B.
     max_x_across: int = 5
+    # seed of the sampling of groups (numpy backend)
+    seed: int = SEED
     # location to output the results
     out: Optional[str] = None
     score_file_type: FileTypesTXT = '.npy'
     result_filename: str = "score_phonetic.csv"
+    # number of sets evaluated in parallel (each in its own process)
+    n_jobs: int = 1
+    # pack text features into a memory-mapped store (parsed once & reused by later evaluations)
+    feature_store: bool = True
+    # implementation computing the scores (numpy: built-in CPU engine, no torch required)
+    backend: ABXBackend = ABXBackend.auto
 
     def get_task(self):
         return self.dict()
 
     def to_meta(self) -> Dict[str, Any]:
         """ Convert into leaderboard meta entry """
-        excluded = {'path_checkpoint', 'out', 'result_filename'}
+        excluded = {'path_checkpoint', 'out', 'result_filename', 'n_jobs', 'feature_store'}
         return dict(self._iter(to_dict=True, exclude=excluded))
 
     def export(self, file: Path):
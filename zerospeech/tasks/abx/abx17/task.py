@@ -8,14 +8,17 @@ import pandas as pd
 try:
     import libriabx
 except ImportError:
-    libriabx = ...
+    libriabx = None
     warnings.warn("abx17 extension not installed")
 
-from .params import ABXParameters, ABXMode, ABXDistanceMode
+from .params import ABXParameters, ABXMode, ABXDistanceMode, ABXBackend
 from zerospeech.generics import FileListItem, FileItem
 from zerospeech.settings import get_settings
 from zerospeech.out import warning_console
 from zerospeech.tasks import Task
+from ..engine import abx_errors
+from ..feature_store import FeatureStorePool
+from ..parallel import run_sets, threads_per_worker
 
 if TYPE_CHECKING:
     from zerospeech.datasets import Dataset
@@ -45,13 +48,27 @@ class SimpleABXTask(Task, abc.ABC):
     # When computing the ABX across score, maximum
     # number of speaker X to sample per couple A,B.
     max_x_across: int = default_params.max_x_across
+    # seed of the sampling of groups (numpy backend)
+    seed: int = default_params.seed
     # location to output the results
     out: Optional[str] = default_params.out
+    # number of sets evaluated in parallel (each in its own process)
+    n_jobs: int = default_params.n_jobs
+    # pack text features into a memory-mapped store
+    feature_store: bool = default_params.feature_store
+    # implementation computing the scores
+    backend: ABXBackend = default_params.backend
 
     sets: Tuple = ('dev', 'test')
     tasks: Tuple = ('clean', 'other')
     result_filename = default_params.result_filename
 
+    def abx_backend(self) -> ABXBackend:
+        """ Backend used by the evaluation (auto: libriabx if installed, numpy otherwise) """
+        if self.backend == ABXBackend.auto:
+            return ABXBackend.libriabx if libriabx is not None else ABXBackend.numpy
+        return self.backend
+
     def abx_args(self, file_list: List[Path], file_ext, item_file):
         """ Build ABX arguments from class attributes """
         if libriabx:
@@ -65,7 +82,8 @@ class SimpleABXTask(Task, abc.ABC):
                 path_checkpoint=self.path_checkpoint,
                 mode=self.mode,
                 max_size_group=self.max_size_group,
-                max_x_across=self.max_x_across
+                max_x_across=self.max_x_across,
+                seed=self.seed
             )
             # bugfix: _is_mounted is not set by constructor should be fixed in v1.0.6
             abx_args._is_mounted = True
@@ -73,15 +91,30 @@ class SimpleABXTask(Task, abc.ABC):
         else:
             raise ValueError('No abx backend detected')
 
-    def get_abx(self, sub_files: FileListItem, item_file: FileItem) -> Dict[str, float]:
+    def get_abx(self, sub_files: FileListItem, item_file: FileItem,
+                stores: Optional[FeatureStorePool] = None) -> Dict[str, float]:
         """  Run abx evaluations on a fileList using a specific .item file
 
+        With the numpy backend features are read from their store in the given pool.
+
         Returns:
             scores<Dict[str, float]>: where keys represent abx mode (across, within) and float represents the score.
         """
         if None in (sub_files, item_file):
             return {f'{t.value}': '-' for t in self.mode.as_set()}
 
+        if self.abx_backend() == ABXBackend.numpy:
+            store = (stores or FeatureStorePool()).get(sub_files)
+            return abx_errors(
+                item_file.file, store.features,
+                feature_size=self.feature_size,
+                distance=self.distance_mode.value,
+                speaker_modes=[m.value for m in self.mode.as_set()],
+                max_size_group=self.max_size_group,
+                max_x_across=self.max_x_across,
+                seed=self.seed
+            )
+
         arg_obj = self.abx_args(sub_files.files_list, sub_files.file_type.ext, item_file.file)
         if libriabx:
             res = libriabx.abx_eval(arg_obj)
@@ -106,15 +139,46 @@ class SimpleABXTask(Task, abc.ABC):
         results = {}
         abx_sets = self.extract_sets(submission, dataset)
 
-        if self.cuda:
+        backend = self.abx_backend()
+        self.console.print(f'==> Using the {backend.value} abx backend')
+        if backend == ABXBackend.numpy and self.path_checkpoint is not None:
+            raise ValueError('path_checkpoint is not supported by the numpy abx backend, '
+                             'submit features or use the external backend')
+
+        # packed submissions are always converted as the backends read one file per utterance
+        stores = FeatureStorePool()
+        with self.console.status('Packing features', spinner="aesthetic"):
+            if backend == ABXBackend.numpy:
+                # the numpy engine reads the frames from the stores
+                for _, _, file_list in abx_sets:
+                    if file_list is not None:
+                        stores.get(file_list)
+            else:
+                abx_sets = [
+                    (label, item_file, stores.backend_files(file_list, pack_text=self.feature_store))
+                    for label, item_file, file_list in abx_sets
+                ]
+
+        if self.cuda and backend == ABXBackend.numpy:
+            warning_console.print("WARNING: gpu mode is set but ignored by the numpy backend (cpu only).")
+        elif self.cuda:
             warning_console.print("WARNING: gpu mode is set. You can disable this in the parameters.")
 
-        for label, item_file, file_list in abx_sets:
-            self.console.print(f'==> Calculating abx distances for {label}')
-            results[label] = self.get_abx(
-                sub_files=file_list,
-                item_file=item_file
-            )
+        if self.n_jobs > 1 and len(abx_sets) > 1:
+            self.console.print(f'==> Calculating abx distances for {len(abx_sets)} sets '
+                               f'({self.n_jobs} workers, {threads_per_worker(self.n_jobs)} threads each)')
+            results = run_sets(self.get_abx, [
+                (label, dict(sub_files=file_list, item_file=item_file, stores=stores))
+                for label, item_file, file_list in abx_sets
+            ], n_jobs=self.n_jobs)
+        else:
+            for label, item_file, file_list in abx_sets:
+                self.console.print(f'==> Calculating abx distances for {label}')
+                results[label] = self.get_abx(
+                    sub_files=file_list,
+                    item_file=item_file,
+                    stores=stores
+                )
 
         as_df = self.format_results(results)
 
@@ -1,2 +1,2 @@
-from .task import SimpleABXPhonemeTask
-from .params import ABXSpeakerMode, ABXDistanceMode, ContextMode, ABX2Parameters
+from .task import SimpleABXPhonemeTask, MountPool
+from .params import ABXSpeakerMode, ABXDistanceMode, ContextMode, ABX2Parameters, ABXBackend
@@ -69,6 +69,14 @@ class ABXDistanceMode(str, Enum):
     kl_symmetric = 'kl_symmetric'
 
 
+class ABXBackend(str, Enum):
+    """ Implementation computing the ABX scores """
+    # zrc_abx2 if installed, numpy otherwise
+    auto = "auto"
+    zrc_abx2 = "zrc_abx2"
+    numpy = "numpy"
+
+
 class PoolingMode(str, Enum):
     """ Pooling method """
     none = "none"
@@ -104,13 +112,19 @@ class ABX2Parameters(BenchmarkParameters):
     out: Optional[str] = None
     score_file_type: FileTypesTXT = '.npy'
     result_filename: str = "score_all_phonetic"
+    # number of sets evaluated in parallel (each in its own process)
+    n_jobs: int = 1
+    # pack text features into a memory-mapped store (parsed once & reused by later evaluations)
+    feature_store: bool = True
+    # implementation computing the scores (numpy: built-in CPU engine, no torch required)
+    backend: ABXBackend = ABXBackend.auto
 
     def get_task(self):
         return self.dict()
 
     def to_meta(self) -> Dict[str, Any]:
         """ Convert into leaderboard meta entry """
-        excluded = {'path_checkpoint', 'out', 'result_filename'}
+        excluded = {'path_checkpoint', 'out', 'result_filename', 'n_jobs', 'feature_store'}
         return dict(self._iter(to_dict=True, exclude=excluded))
 
     def export(self, file: Path):
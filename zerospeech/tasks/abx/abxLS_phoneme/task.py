@@ -10,15 +10,18 @@ try:
     import zrc_abx2
     from vdataset import mount, unmount
 except ImportError:
-    zrc_abx2 = ...
-    mount, unmount = ..., ...
+    zrc_abx2 = None
+    mount, unmount = None, None
     warnings.warn("abxLS extension not installed")
 
-from .params import ABX2Parameters, ABXSpeakerMode, ABXDistanceMode, ContextMode
+from .params import ABX2Parameters, ABXSpeakerMode, ABXDistanceMode, ContextMode, ABXBackend
 from zerospeech.generics import  FileItem, FileListItem
 from zerospeech.settings import get_settings
 from zerospeech.out import warning_console
 from zerospeech.tasks import Task
+from ..engine import abx_errors
+from ..feature_store import FeatureStorePool
+from ..parallel import run_sets, threads_per_worker
 
 if TYPE_CHECKING:
     from zerospeech.datasets import Dataset
@@ -30,6 +33,36 @@ default_params = ABX2Parameters()
 extract_return_type = Tuple[str, FileItem, FileListItem, ContextMode]
 
 
+class MountPool:
+    """ Pool of vdataset mounts shared by the evaluations of a task
+
+    Each distinct list of feature files is mounted once & reused by all the evaluations
+    (contexts) using it, all mounts are released when the pool is closed.
+    """
+
+    def __init__(self):
+        self._mounts: Dict[Tuple[Path, ...], Path] = {}
+
+    def get(self, file_list: List[Path]) -> Path:
+        """ Location of the mounted file list (mounted on first use) """
+        key = tuple(file_list)
+        if key not in self._mounts:
+            self._mounts[key] = mount(file_list)
+        return self._mounts[key]
+
+    def close(self):
+        """ Release all the mounted folders """
+        while self._mounts:
+            _, path_data = self._mounts.popitem()
+            unmount(path_data)
+
+    def __enter__(self) -> "MountPool":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
 class SimpleABXPhonemeTask(Task, abc.ABC):
     """ Abstract abx-LS task """
     _name = "abx-LS"
@@ -54,15 +87,56 @@ class SimpleABXPhonemeTask(Task, abc.ABC):
     seed: int = default_params.seed
     # location to output the results
     out: Optional[str] = default_params.out
+    # number of sets evaluated in parallel (each in its own process)
+    n_jobs: int = default_params.n_jobs
+    # pack text features into a memory-mapped store
+    feature_store: bool = default_params.feature_store
+    # implementation computing the scores
+    backend: ABXBackend = default_params.backend
 
     sets: Tuple = ('dev', 'test')
     tasks: Tuple = ('clean', 'other')
     result_filename = default_params.result_filename
 
-    def abx_args(self, file_list: List[Path], file_ext, item_file, context: ContextMode):
+    def abx_backend(self) -> ABXBackend:
+        """ Backend used by the evaluation (auto: zrc_abx2 if installed, numpy otherwise) """
+        if self.backend == ABXBackend.auto:
+            return ABXBackend.zrc_abx2 if zrc_abx2 is not None else ABXBackend.numpy
+        return self.backend
+
+    def numpy_abx(self, sub_files: FileListItem, item_file: FileItem, context: ContextMode,
+                  stores: Optional[FeatureStorePool] = None) -> List[Dict[str, Any]]:
+        """ Run abx evaluations using the built-in numpy engine (features are read from their store) """
+        store = (stores or FeatureStorePool()).get(sub_files)
+        abx2_context = context.as_abx2_value()
+        errors = abx_errors(
+            item_file.file, store.features,
+            feature_size=self.feature_size,
+            distance=self.distance_mode.value,
+            speaker_modes=[m.value for m in self.speaker_mode.as_set()],
+            context=abx2_context,
+            max_size_group=self.max_size_group,
+            max_x_across=self.max_x_across,
+            seed=self.seed
+        )
+        return [
+            {
+                'item-file': str(item_file.file),
+                'dataset': item_file.file.stem,
+                'pooling': 'none',
+                'seed': self.seed,
+                'abx-s-condition': mode,
+                'abx-c-condition': abx2_context,
+                'score': score
+            }
+            for mode, score in errors.items()
+        ]
+
+    def abx_args(self, file_list: List[Path], file_ext, item_file, context: ContextMode,
+                 mounts: Optional[MountPool] = None):
         """ Build ABX arguments from class attributes """
         if zrc_abx2:
-            path_data = mount(file_list)
+            path_data = mounts.get(file_list) if mounts is not None else mount(file_list)
             abx2_context = context.as_abx2_value()
             abx_args = zrc_abx2.EvalArgs(
                 path_data=str(path_data),
@@ -83,24 +157,34 @@ class SimpleABXPhonemeTask(Task, abc.ABC):
             raise ValueError('No abx backend detected')
 
     def get_abx(
-            self, sub_files: FileListItem, item_file: FileItem, context: ContextMode
+            self, sub_files: FileListItem, item_file: FileItem, context: ContextMode,
+            mounts: Optional[MountPool] = None, stores: Optional[FeatureStorePool] = None
     ) -> List[Dict[str, Any]]:
         """  Run abx evaluations on a fileList using a specific .item file
 
+        The file list is mounted using the given pool (released by its owner), or mounted
+        & released for this evaluation only if no pool is given.
+        With the numpy backend features are read from their store in the given pool.
+
         Returns:
             scores<Dict[str, float]>: where keys represent abx mode (across, within) and float represents the score.
         """
         if None in (sub_files, item_file):
             return [{f'{t.value}': '-' for t in self.speaker_mode.as_set()}]
 
-        arg_obj = self.abx_args(sub_files.files_list, sub_files.file_type.ext, item_file.file, context)
-        if zrc_abx2:
-            res = zrc_abx2.EvalABX().eval_abx(arg_obj)
-        else:
-            raise ValueError('No abx backend detected')
+        if self.abx_backend() == ABXBackend.numpy:
+            return self.numpy_abx(sub_files, item_file, context, stores)
 
-        # release folder location
-        unmount(arg_obj.path_data)
+        arg_obj = self.abx_args(sub_files.files_list, sub_files.file_type.ext, item_file.file, context, mounts)
+        try:
+            if zrc_abx2:
+                res = zrc_abx2.EvalABX().eval_abx(arg_obj)
+            else:
+                raise ValueError('No abx backend detected')
+        finally:
+            if mounts is None:
+                # release folder location
+                unmount(arg_obj.path_data)
         return res
 
     @abc.abstractmethod
@@ -120,16 +204,57 @@ class SimpleABXPhonemeTask(Task, abc.ABC):
         results = {}
         abx_sets = self.extract_sets(submission, dataset, context=submission.params.context)
 
-        if self.cuda:
+        backend = self.abx_backend()
+        self.console.print(f'==> Using the {backend.value} abx backend')
+        if backend == ABXBackend.numpy and self.path_checkpoint is not None:
+            raise ValueError('path_checkpoint is not supported by the numpy abx backend, '
+                             'submit features or use the external backend')
+
+        # each feature list is packed once for all its contexts (packed submissions are always
+        # converted as the backends read one file per utterance)
+        stores = FeatureStorePool()
+        with self.console.status('Packing features', spinner="aesthetic"):
+            if backend == ABXBackend.numpy:
+                # the numpy engine reads the frames from the stores
+                for _, _, file_list, _ in abx_sets:
+                    if file_list is not None:
+                        stores.get(file_list)
+            else:
+                abx_sets = [
+                    (label, item_file, stores.backend_files(file_list, pack_text=self.feature_store), context)
+                    for label, item_file, file_list, context in abx_sets
+                ]
+
+        if self.cuda and backend == ABXBackend.numpy:
+            warning_console.print("WARNING: gpu mode is set but ignored by the numpy backend (cpu only).")
+        elif self.cuda:
             warning_console.print("WARNING: gpu mode is set. You can disable this in the parameters.")
 
-        for label, item_file, file_list, context in abx_sets:
-            self.console.print(f'==> Calculating abx distances for {label}')
-            results[label] = self.get_abx(
-                sub_files=file_list,
-                item_file=item_file,
-                context=context
-            )
+        # each feature list is mounted once for all its contexts
+        with MountPool() as mounts:
+            if self.n_jobs > 1 and len(abx_sets) > 1:
+                # mounted before starting the workers: workers only read the pool
+                for _, _, file_list, _ in abx_sets:
+                    if file_list is not None and backend != ABXBackend.numpy:
+                        mounts.get(file_list.files_list)
+                self.console.print(f'==> Calculating abx distances for {len(abx_sets)} sets '
+                                   f'({self.n_jobs} workers, {threads_per_worker(self.n_jobs)} threads each)')
+                results = run_sets(self.get_abx, [
+                    (label, dict(
+                        sub_files=file_list, item_file=item_file, context=context, mounts=mounts, stores=stores
+                    ))
+                    for label, item_file, file_list, context in abx_sets
+                ], n_jobs=self.n_jobs)
+            else:
+                for label, item_file, file_list, context in abx_sets:
+                    self.console.print(f'==> Calculating abx distances for {label}')
+                    results[label] = self.get_abx(
+                        sub_files=file_list,
+                        item_file=item_file,
+                        context=context,
+                        mounts=mounts,
+                        stores=stores
+                    )
 
         as_df = self.format_results(results)
         filename = output_dir / self.result_filename
@@ -0,0 +1,260 @@
+""" Pure NumPy ABX engine (CPU fallback of the libri-light ABX backends)
+
+Reimplements the ABX evaluation of the libri-light backends (zrc_abx2 & libriabx):
+
+- segments of the .item file are cut from the features (L2 normalized frames),
+- triplets are grouped by context & speaker (within) or by context & speakers of A/B and X (across),
+- segments are compared using the DTW cost of frame-wise distances (cosine, euclidian, kl, kl_symmetric),
+- the error of each group is averaged over contexts, then speakers, then pairs of phones.
+
+Frame-wise distances of two groups are computed with one matrix product and the DTW of all the
+pairs of segments of the groups is computed in a single vectorized pass.
+"""
+import math
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SpeakerMode = Literal['within', 'across']
+ContextMode = Literal['within', 'any']
+DistanceMode = Literal['euclidian', 'cosine', 'kl', 'kl_symmetric']
+
+_KL_EPSILON = 1e-6
+
+
+class ItemSegments(NamedTuple):
+    """ Segments of an .item file with their (padded) features """
+    # (n_segments, max_frames, dim)
+    features: np.ndarray
+    # number of frames of each segment
+    lengths: np.ndarray
+    # context, phone & speaker of each segment
+    table: pd.DataFrame
+
+
+def load_item_file(item_file: Path) -> pd.DataFrame:
+    """ Load an .item file (columns: #file onset offset #phone prev-phone next-phone speaker) """
+    rows = []
+    with item_file.open() as fp:
+        next(fp)
+        for line in fp:
+            data = line.split()
+            if len(data) < 5:
+                continue
+            rows.append((data[0], float(data[1]), float(data[2]), data[3], '+'.join(data[4:-1]), data[-1]))
+    return pd.DataFrame(rows, columns=['file', 'onset', 'offset', 'phone', 'context', 'speaker'])
+
+
+def load_segments(items: pd.DataFrame, features: Callable[[str], np.ndarray], feature_size: float) -> ItemSegments:
+    """ Cut the segments of the items from the features of their files
+
+    Frames [ceil(onset / feature_size - 0.5), floor(offset / feature_size - 0.5)[ of each segment are kept,
+    segments without frames are dropped.
+    """
+    step = 1 / feature_size
+    segments, kept = [], []
+    for file, group in items.groupby('file', sort=False):
+        frames = np.asarray(features(str(file)), dtype=np.float32)
+        norm = np.linalg.norm(frames, axis=1, keepdims=True)
+        frames = frames / np.maximum(norm, 1e-12)
+        for i, onset, offset in zip(group.index, group['onset'], group['offset']):
+            start = max(0, int(math.ceil(step * onset - 0.5)))
+            end = min(frames.shape[0], int(math.floor(step * offset - 0.5)))
+            if start >= frames.shape[0] or end <= start:
+                continue
+            segments.append(frames[start:end])
+            kept.append(i)
+
+    lengths = np.array([s.shape[0] for s in segments], dtype=np.int64)
+    dim = segments[0].shape[1] if segments else 0
+    padded = np.zeros((len(segments), int(lengths.max(initial=0)), dim), dtype=np.float32)
+    for i, s in enumerate(segments):
+        padded[i, :s.shape[0]] = s
+    return ItemSegments(features=padded, lengths=lengths, table=items.loc[kept].reset_index(drop=True))
+
+
+def frame_distances(x: np.ndarray, y: np.ndarray, distance: DistanceMode) -> np.ndarray:
+    """ Distances between the frames of two groups of segments
+
+    x: (n1, s1, dim), y: (n2, s2, dim)
+    Returns:
+        (n1, n2, s1, s2) distances
+    """
+    n1, s1, dim = x.shape
+    n2, s2, _ = y.shape
+    flat_x, flat_y = x.reshape(-1, dim), y.reshape(-1, dim)
+
+    if distance == 'cosine':
+        prod = np.clip(flat_x @ flat_y.T, -1, 1)
+        dist = np.arccos(prod) / math.pi
+    elif distance == 'euclidian':
+        sq = (flat_x ** 2).sum(axis=1)[:, None] + (flat_y ** 2).sum(axis=1)[None, :] - 2 * flat_x @ flat_y.T
+        dist = np.sqrt(np.maximum(sq, 0))
+    elif distance == 'kl':
+        dist = _kl(flat_x, flat_y)
+    elif distance == 'kl_symmetric':
+        dist = 0.5 * _kl(flat_x, flat_y) + 0.5 * _kl(flat_y, flat_x).T
+    else:
+        raise ValueError(f'unknown distance {distance}')
+    return dist.reshape(n1, s1, n2, s2).transpose(0, 2, 1, 3)
+
+
+def _kl(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """ KL divergence of each frame of p to each frame of q: sum p log(p + e) - p log(q + e) """
+    return (p * np.log(p + _KL_EPSILON)).sum(axis=1)[:, None] - p @ np.log(q + _KL_EPSILON).T
+
+
+def dtw_batch(dist: np.ndarray, len1: np.ndarray, len2: np.ndarray) -> np.ndarray:
+    """ DTW cost of a batch of distance matrices, normalized by the length of the warping path
+
+    dist: (batch, s1, s2) padded distance matrices, len1/len2: (batch,) valid sizes
+    The cost of a cell is its distance plus the minimal cost of its upper-left, left & upper cells
+    (preferred in this order on ties, as the backtracking of the libri-light DTW), the length of the
+    path is tracked along the cost. Padded cells never precede valid ones so the cost of each pair
+    is read at (len1 - 1, len2 - 1).
+    """
+    batch, s1, s2 = dist.shape
+    cost = np.empty_like(dist)
+    path_len = np.empty(dist.shape, dtype=np.int64)
+    cost[:, 0, :] = np.cumsum(dist[:, 0, :], axis=1)
+    cost[:, :, 0] = np.cumsum(dist[:, :, 0], axis=1)
+    path_len[:, 0, :] = np.arange(1, s2 + 1)
+    path_len[:, :, 0] = np.arange(1, s1 + 1)
+    for i in range(1, s1):
+        for j in range(1, s2):
+            diag, left, up = cost[:, i - 1, j - 1], cost[:, i, j - 1], cost[:, i - 1, j]
+            take_diag = (diag <= left) & (diag <= up)
+            take_left = ~take_diag & (left <= up)
+            cost[:, i, j] = dist[:, i, j] + np.where(take_diag, diag, np.where(take_left, left, up))
+            path_len[:, i, j] = 1 + np.where(
+                take_diag, path_len[:, i - 1, j - 1],
+                np.where(take_left, path_len[:, i, j - 1], path_len[:, i - 1, j])
+            )
+    last = (np.arange(batch), len1 - 1, len2 - 1)
+    return cost[last] / path_len[last]
+
+
+def group_dtw(segments: ItemSegments, g1: np.ndarray, g2: np.ndarray, distance: DistanceMode) -> np.ndarray:
+    """ DTW cost between all the segments of two groups (n1, n2) """
+    l1, l2 = segments.lengths[g1], segments.lengths[g2]
+    x = segments.features[g1, :l1.max()]
+    y = segments.features[g2, :l2.max()]
+    dist = frame_distances(x, y, distance)
+    n1, n2, s1, s2 = dist.shape
+    costs = dtw_batch(
+        dist.reshape(n1 * n2, s1, s2), np.repeat(l1, n2), np.tile(l2, n1)
+    )
+    return costs.reshape(n1, n2)
+
+
+def triplet_error(d_xa: np.ndarray, d_xb: np.ndarray, exclude_diagonal: bool) -> float:
+    """ Fraction of (x, a, b) triplets where x is closer to b than to a (ties count for 1/2)
+
+    exclude_diagonal: x & a are drawn from the same group (x != a)
+    """
+    cmp = (d_xb[:, None, :] < d_xa[:, :, None]).astype(np.float64)
+    cmp += 0.5 * (d_xb[:, None, :] == d_xa[:, :, None])
+    if exclude_diagonal:
+        n = d_xa.shape[0]
+        cmp[np.arange(n), np.arange(n), :] = 0
+        total = n * (d_xa.shape[1] - 1) * d_xb.shape[1]
+    else:
+        total = cmp.size
+    return float(cmp.sum() / total) if total > 0 else math.nan
+
+
+def _sample(indices: np.ndarray, max_size: int, rng: np.random.Generator) -> np.ndarray:
+    if len(indices) <= max_size:
+        return indices
+    return np.sort(rng.choice(indices, size=max_size, replace=False))
+
+
+def abx_errors(
+        item_file: Path, features: Callable[[str], np.ndarray], *, feature_size: float,
+        distance: DistanceMode = 'cosine', speaker_modes: Sequence[SpeakerMode] = ('within', 'across'),
+        context: ContextMode = 'within', max_size_group: int = 10, max_x_across: int = 5,
+        seed: Optional[int] = None
+) -> Dict[str, float]:
+    """ ABX error rates of features on an .item file
+
+    Arguments:
+        item_file: location of the .item file
+        features: function returning the (n_frames, dim) features of a file (from its name)
+        feature_size: duration of a frame (in seconds)
+        context: 'within' (A, B & X share their context) or 'any' (context is ignored)
+        max_size_group: max number of segments of a group (larger groups are sampled)
+        max_x_across: max number of X speakers per (A, B) groups in across mode
+    Returns:
+        the error rate of each speaker mode
+    """
+    rng = np.random.default_rng(seed)
+    segments = load_segments(load_item_file(item_file), features, feature_size)
+    table = segments.table
+    if context == 'any':
+        table = table.assign(context='')
+    groups: Dict[Tuple[str, str, str], np.ndarray] = {
+        key: idx.to_numpy() for key, idx in table.groupby(['context', 'speaker', 'phone']).groups.items()
+    }
+
+    # phones & speakers of each context
+    by_context: Dict[str, Dict[str, List[str]]] = {}
+    for c, s, p in groups.keys():
+        by_context.setdefault(c, {}).setdefault(s, []).append(p)
+
+    results = {}
+    if 'within' in speaker_modes:
+        rows = []
+        for c, speakers in by_context.items():
+            for s, phones in speakers.items():
+                for p_a in phones:
+                    group_a = _sample(groups[(c, s, p_a)], max_size_group, rng)
+                    if len(group_a) < 2:
+                        continue
+                    d_xa = group_dtw(segments, group_a, group_a, distance)
+                    for p_b in phones:
+                        if p_b == p_a:
+                            continue
+                        group_b = _sample(groups[(c, s, p_b)], max_size_group, rng)
+                        d_xb = group_dtw(segments, group_a, group_b, distance)
+                        rows.append((c, s, p_a, p_b, triplet_error(d_xa, d_xb, exclude_diagonal=True)))
+        results['within'] = _reduce(pd.DataFrame(rows, columns=['context', 'speaker', 'a', 'b', 'error']),
+                                    speaker_columns=['speaker'])
+
+    if 'across' in speaker_modes:
+        rows = []
+        for c, speakers in by_context.items():
+            for s_ab, phones in speakers.items():
+                for p_a in phones:
+                    x_speakers = [s for s, ps in speakers.items() if s != s_ab and p_a in ps]
+                    if len(x_speakers) == 0:
+                        continue
+                    if len(x_speakers) > max_x_across:
+                        x_speakers = list(rng.choice(x_speakers, size=max_x_across, replace=False))
+                    group_a = _sample(groups[(c, s_ab, p_a)], max_size_group, rng)
+                    for p_b in phones:
+                        if p_b == p_a:
+                            continue
+                        group_b = _sample(groups[(c, s_ab, p_b)], max_size_group, rng)
+                        for s_x in x_speakers:
+                            group_x = _sample(groups[(c, s_x, p_a)], max_size_group, rng)
+                            d_xa = group_dtw(segments, group_x, group_a, distance)
+                            d_xb = group_dtw(segments, group_x, group_b, distance)
+                            rows.append((c, s_ab, s_x, p_a, p_b, triplet_error(d_xa, d_xb, exclude_diagonal=False)))
+        results['across'] = _reduce(
+            pd.DataFrame(rows, columns=['context', 'speaker', 'speaker_x', 'a', 'b', 'error']),
+            speaker_columns=['speaker', 'speaker_x']
+        )
+
+    return results
+
+
+def _reduce(errors: pd.DataFrame, speaker_columns: List[str]) -> float:
+    """ Average the errors of the groups over contexts, then speakers, then pairs of phones """
+    errors = errors.dropna(subset=['error'])
+    if len(errors) == 0:
+        return math.nan
+    by_speaker = errors.groupby([*speaker_columns, 'a', 'b'])['error'].mean()
+    by_pair = by_speaker.groupby(['a', 'b']).mean()
+    return float(by_pair.mean())
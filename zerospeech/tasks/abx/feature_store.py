@@ -0,0 +1,212 @@
+""" Features of an ABX submission packed into a single memory-mapped matrix
+
+The per-utterance feature files of a subset are read (& parsed) once and their frames
+are concatenated into one float32 matrix, indexed by the offset & number of frames of
+each utterance. Stores are kept in the evaluation cache & reused by later evaluations
+as long as the fingerprint of the source files is unchanged, the least recently used
+stores are deleted when the cache exceeds settings.abx_cache_max_size.
+"""
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from zerospeech.data_loaders import load_numpy_array, load_packed_features, packed_index_file
+from zerospeech.generics import FileItem, FileListItem, FileTypes
+from zerospeech.generics.cache import evict_lru, file_fingerprint, mark_used
+from zerospeech.settings import get_settings
+
+st = get_settings()
+
+_MATRIX_FILE = "features.f32"
+_INDEX_FILE = "index.npz"
+_VIEW_DIR = "npy"
+
+
+class FeatureStore:
+    """ Memory-mapped float32 matrix of the frames of a list of feature files """
+
+    def __init__(self, location: Path, names: np.ndarray, offsets: np.ndarray, lengths: np.ndarray,
+                 dim: int, fingerprint: str, matrix: Optional[np.ndarray] = None):
+        self.location = location
+        self.names = names
+        self.offsets = offsets
+        self.lengths = lengths
+        self.dim = dim
+        self.fingerprint = fingerprint
+        self._positions: Dict[str, int] = {str(n): i for i, n in enumerate(names)}
+        total = int(lengths.sum())
+        if matrix is not None:
+            self.matrix = matrix
+        elif total > 0:
+            self.matrix = np.memmap(location / _MATRIX_FILE, dtype=np.float32, mode='r', shape=(total, dim))
+        else:
+            self.matrix = np.zeros((0, dim), dtype=np.float32)
+
+    @staticmethod
+    def files_fingerprint(files: List[Path]) -> str:
+        """ Fingerprint of a list of files (location, size & modification time of each file) """
+        h = hashlib.sha1()
+        for f in sorted(files):
+            h.update(file_fingerprint(f).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def default_location(files: List[Path]) -> Path:
+        """ Location of the store of a list of files in the evaluation cache """
+        subset_dir = os.path.commonpath([str(p.absolute().parent) for p in files])
+        key = hashlib.sha1(subset_dir.encode()).hexdigest()
+        return st.cache_path / "abx" / key
+
+    @classmethod
+    def open(cls, location: Path) -> Optional["FeatureStore"]:
+        """ Open an existing store (None if missing or incomplete) """
+        index_file = location / _INDEX_FILE
+        if not index_file.is_file():
+            return None
+        try:
+            with np.load(index_file, allow_pickle=False) as index:
+                return cls(
+                    location=location, names=index['names'], offsets=index['offsets'],
+                    lengths=index['lengths'], dim=int(index['dim']), fingerprint=str(index['fingerprint'])
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def build(cls, files: List[Path], location: Path, fingerprint: str) -> "FeatureStore":
+        """ Pack a list of feature files (frames are appended to the matrix file one file at a time) """
+        if location.is_dir():
+            shutil.rmtree(location)
+        location.mkdir(parents=True)
+
+        names, lengths, dim = [], [], None
+        with (location / _MATRIX_FILE).open('wb') as fp:
+            for f in sorted(files):
+                features = np.asarray(load_numpy_array(f, mmap_mode='r'), dtype=np.float32)
+                if features.ndim == 1:
+                    features = features.reshape(-1, 1)
+                if dim is None:
+                    dim = features.shape[1]
+                elif features.shape[1] != dim:
+                    raise ValueError(f'{f.name}: features of dimension {features.shape[1]}, expected {dim}')
+                fp.write(np.ascontiguousarray(features).tobytes())
+                names.append(f.stem)
+                lengths.append(features.shape[0])
+
+        lengths = np.array(lengths, dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        # the index is written last: a store without index is incomplete
+        tmp_file = location / f"tmp.{_INDEX_FILE}"
+        np.savez(tmp_file, names=np.array(names), offsets=offsets, lengths=lengths,
+                 dim=np.int64(dim or 0), fingerprint=np.array(fingerprint))
+        os.replace(tmp_file, location / _INDEX_FILE)
+        return cls(location=location, names=np.array(names), offsets=offsets, lengths=lengths,
+                   dim=dim or 0, fingerprint=fingerprint)
+
+    @classmethod
+    def load(cls, file_list: FileListItem, location: Optional[Path] = None) -> "FeatureStore":
+        """ Store of a file list: reused if its fingerprint matches the files, (re)built otherwise """
+        files = list(file_list.files_list)
+        location = location or cls.default_location(files)
+        fingerprint = cls.files_fingerprint(files)
+
+        store = cls.open(location)
+        if store is not None and store.fingerprint == fingerprint:
+            mark_used(location)
+            return store
+        return cls.build(files, location, fingerprint)
+
+    @classmethod
+    def from_packed(cls, file_item: FileItem) -> "FeatureStore":
+        """ Store of packed features (the packed matrix is used in place) """
+        index, matrix = load_packed_features(file_item, mmap_mode='r')
+        fingerprint = cls.files_fingerprint([file_item.file, packed_index_file(file_item.file)])
+        key = hashlib.sha1(str(file_item.file.absolute()).encode()).hexdigest()
+        return cls(
+            location=st.cache_path / "abx" / key, names=index['filename'].to_numpy(dtype=str),
+            offsets=index['offset'].to_numpy(dtype=np.int64), lengths=index['n_frames'].to_numpy(dtype=np.int64),
+            dim=matrix.shape[1], fingerprint=fingerprint, matrix=matrix
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def features(self, name: str) -> np.ndarray:
+        """ Frames of an utterance (a view of the memory-mapped matrix) """
+        i = self._positions[name]
+        return self.matrix[self.offsets[i]:self.offsets[i] + self.lengths[i]]
+
+    def npy_view(self) -> FileListItem:
+        """ The features as .npy files (for backends reading one file per utterance)
+
+        Files are written once per store: text features are only parsed when packing.
+        """
+        view_dir = self.location / _VIEW_DIR
+        marker = view_dir / ".fingerprint"
+        files = [view_dir / f"{n}.npy" for n in self.names]
+        if not (marker.is_file() and marker.read_text() == self.fingerprint):
+            if view_dir.is_dir():
+                shutil.rmtree(view_dir)
+            view_dir.mkdir(parents=True)
+            for name, file in zip(self.names, files):
+                np.save(file, self.features(str(name)))
+            marker.write_text(self.fingerprint)
+        return FileListItem(file_type=FileTypes.npy, files_list=files, relative_path=False)
+
+
+class FeatureStorePool:
+    """ Stores of the file lists of an evaluation (each file list is packed once)
+
+    evicting: delete the least recently used stores of the cache when new stores are packed
+    """
+
+    def __init__(self, evicting: bool = True):
+        self._stores: Dict[Tuple[Path, ...], FeatureStore] = {}
+        self.evicting = evicting
+
+    def __reduce__(self):
+        # worker processes receive an empty pool & reopen the stores from the cache
+        # (pickling a store would copy its whole matrix), stores used by the other
+        # workers are unknown to them so they never evict
+        return FeatureStorePool, (False,)
+
+    def get(self, item: Union[FileListItem, FileItem]) -> FeatureStore:
+        """ Store of a file list (packed on first use) or of packed features """
+        key = (item.file,) if isinstance(item, FileItem) else tuple(item.files_list)
+        if key not in self._stores:
+            if isinstance(item, FileItem):
+                self._stores[key] = FeatureStore.from_packed(item)
+            else:
+                self._stores[key] = FeatureStore.load(item)
+            self.evict()
+        return self._stores[key]
+
+    def evict(self):
+        """ Delete the least recently used stores of the cache (stores of the pool are kept) """
+        if not self.evicting:
+            return
+        locations = [store.location for store in self._stores.values()]
+        for location in locations:
+            mark_used(location)
+        evict_lru(st.cache_path / "abx", st.abx_cache_max_size, keep=locations)
+
+    def backend_files(self, item: Union[FileListItem, FileItem, None],
+                      pack_text: bool = True) -> Optional[FileListItem]:
+        """ Files given to the ABX backends reading one file per utterance
+
+        Packed features & (if pack_text) text features are replaced by the .npy view of
+        their store, binary features are read directly by the backends.
+        """
+        if item is None or (isinstance(item, FileListItem) and (
+                len(item.files_list) == 0 or item.file_type != FileTypes.txt or not pack_text)):
+            return item
+        view = self.get(item).npy_view()
+        self.evict()
+        return view
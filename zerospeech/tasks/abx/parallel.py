@@ -0,0 +1,55 @@
+""" Evaluation of ABX sets in a pool of processes with a budget of threads per worker """
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import threadpoolctl
+
+from zerospeech.generics import archives
+
+# environment variables limiting the threads of BLAS & numerical libraries
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS'
+)
+
+
+def threads_per_worker(n_jobs: int) -> int:
+    """ Number of threads of each worker so that all workers stay within the available cores """
+    return max(1, (os.cpu_count() or 1) // max(1, n_jobs))
+
+
+def _init_worker(n_threads: int, archive_locations: List[Path]):
+    """ Prepare a worker: mount the archives of the parent & cap the threads of the worker
+
+    numpy (& its BLAS) is already loaded when the worker imports this module, the threads of
+    the loaded libraries are capped at runtime (threadpoolctl & torch). The environment of the
+    worker is also set for the libraries it imports later, the environment of the parent process
+    is never modified (tasks may run concurrently in its threads).
+    """
+    archives.mount_all(archive_locations)
+    os.environ.update({k: str(n_threads) for k in THREAD_ENV_VARS})
+    threadpoolctl.threadpool_limits(n_threads)
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+
+
+def run_sets(fn: Callable[..., Any], sets: List[Tuple[str, Dict[str, Any]]], n_jobs: int) -> Dict[str, Any]:
+    """ Evaluate each (label, kwargs) set using fn in its own worker process
+
+    Returns:
+        the result of each set (by label, in the order of sets)
+    """
+    n_jobs = max(1, min(n_jobs, len(sets)))
+    n_threads = threads_per_worker(n_jobs)
+
+    # spawn: workers start from a clean process (no threads inherited from this one)
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(n_threads, archives.mounted())) as executor:
+        futures = {label: executor.submit(fn, **kwargs) for label, kwargs in sets}
+        return {label: future.result() for label, future in futures.items()}
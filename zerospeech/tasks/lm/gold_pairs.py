@@ -0,0 +1,207 @@
+""" Precompiled (correct, incorrect) pair structure of the lexical, syntactic & prosodic gold files """
+import os
+from pathlib import Path
+from typing import ClassVar, Dict, Literal, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from zerospeech.data_loaders import load_dataframe
+from zerospeech.generics import FileItem
+
+GoldKind = Literal['lexical', 'sentence']
+
+# (name in gold, name in pairs) of the columns taken from the correct & incorrect items of each kind
+_COLUMNS = {
+    'lexical': dict(
+        correct=[('id', 'id'), ('voice', 'voice'), ('frequency', 'frequency'), ('word', 'word'),
+                 ('length', 'length')],
+        incorrect=[('word', 'non word')],
+        scores=('score word', 'score non word'),
+        order=['id', 'voice', 'frequency', 'word', 'non word', 'length']
+    ),
+    'sentence': dict(
+        correct=[('id', 'id'), ('voice', 'voice'), ('type', 'type'), ('subtype', 'subtype'),
+                 ('transcription', 'sentence')],
+        incorrect=[('transcription', 'non sentence')],
+        scores=('score sentence', 'score non sentence'),
+        order=['id', 'voice', 'type', 'subtype', 'sentence', 'non sentence']
+    )
+}
+
+
+def _encode(series: pd.Series) -> Tuple[np.ndarray, np.ndarray, str]:
+    """ Encode a column as (codes, categories, dtype) """
+    codes, uniques = pd.factorize(series)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        categories = np.asarray(uniques, dtype=np.float64)
+    else:
+        categories = np.asarray(uniques, dtype=str)
+    return codes.astype(np.int64), categories, str(series.dtype)
+
+
+def _decode(codes: np.ndarray, categories: np.ndarray, dtype: str) -> pd.Series:
+    """ Decode a column encoded by _encode (code -1 is a missing value) """
+    if categories.dtype.kind == 'f':
+        values = np.append(categories, np.nan)[codes]
+    else:
+        values = np.append(categories.astype(object), np.nan)[codes]
+    return pd.Series(values).astype(dtype)
+
+
+class GoldPairs:
+    """ Pair structure of a gold file (independent of the submission)
+
+    Stores the filename of each item of the gold file, the row indices of the correct &
+    incorrect item of each pair and the descriptive columns of the pairs (as categorical
+    codes). Evaluating a submission is then a gather of its scores on the pairs.
+
+    Pairs are built as in the original evaluation:
+
+    - lexical: words & non-words sharing the same (voice, id)
+    - sentence (syntactic & prosodic): the n-th correct & n-th incorrect item of the gold file
+    """
+    # artifacts already loaded by this process (location, fingerprint) -> pairs
+    _loaded: ClassVar[Dict[Tuple[str, str], "GoldPairs"]] = {}
+
+    def __init__(self, kind: GoldKind, filenames: np.ndarray, correct: np.ndarray, incorrect: np.ndarray,
+                 columns: Dict[str, pd.Series]):
+        self.kind = kind
+        self.filenames = filenames
+        self.correct = correct
+        self.incorrect = incorrect
+        self.columns = columns
+
+    @staticmethod
+    def artifact_file(gold: FileItem) -> Path:
+        """ Location of the compiled artifact (next to the gold file) """
+        return gold.file.with_name(f"{gold.file.stem}.pairs.npz")
+
+    @staticmethod
+    def fingerprint(gold: FileItem) -> str:
+        stat = gold.file.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    @classmethod
+    def compile(cls, gold: FileItem, kind: GoldKind) -> "GoldPairs":
+        """ Build the pair structure from a gold file """
+        spec = _COLUMNS[kind]
+        gold_df = load_dataframe(gold, header=0)
+
+        if kind == 'lexical':
+            gold_df = gold_df.astype({'frequency': pd.Int64Dtype()})
+            non_words = gold_df[gold_df['correct'] == 0]
+            # if all non-words have their textual version set to NaN, we take their phonemic version instead.
+            if non_words['word'].isnull().sum() == len(non_words):
+                gold_df['word'] = gold_df['phones']
+
+            words = gold_df.loc[gold_df['correct'] == 1].reset_index()
+            non_words = gold_df.loc[gold_df['correct'] == 0].reset_index()
+            pairs = pd.merge(words, non_words, on=['voice', 'id'], suffixes=('_c', '_i'))
+            correct, incorrect = pairs['index_c'].to_numpy(), pairs['index_i'].to_numpy()
+        else:
+            correct = np.flatnonzero((gold_df['correct'] == 1).to_numpy())
+            incorrect = np.flatnonzero((gold_df['correct'] == 0).to_numpy())
+            size = min(len(correct), len(incorrect))
+            correct, incorrect = correct[:size], incorrect[:size]
+
+        columns = {}
+        for rows, names in ((correct, spec['correct']), (incorrect, spec['incorrect'])):
+            for gold_name, name in names:
+                if gold_name in gold_df.columns:
+                    columns[name] = gold_df[gold_name].iloc[rows].reset_index(drop=True)
+
+        return cls(
+            kind=kind,
+            filenames=gold_df['filename'].to_numpy(dtype=str),
+            correct=np.asarray(correct, dtype=np.int64),
+            incorrect=np.asarray(incorrect, dtype=np.int64),
+            columns={name: columns[name] for name in spec['order'] if name in columns}
+        )
+
+    def save(self, location: Path, fingerprint: str):
+        """ Write the artifact """
+        arrays = dict(
+            kind=np.array(self.kind), fingerprint=np.array(fingerprint), filenames=self.filenames,
+            correct=self.correct, incorrect=self.incorrect, columns=np.array(list(self.columns.keys()), dtype=str)
+        )
+        for i, series in enumerate(self.columns.values()):
+            arrays[f'codes_{i}'], arrays[f'categories_{i}'], dtype = _encode(series)
+            arrays[f'dtype_{i}'] = np.array(dtype)
+
+        tmp_file = location.with_suffix('.tmp.npz')
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, location)
+
+    @classmethod
+    def read(cls, location: Path, fingerprint: str) -> Optional["GoldPairs"]:
+        """ Read an artifact (None if missing, unreadable or built from another version of the gold) """
+        if not location.is_file():
+            return None
+
+        try:
+            with np.load(location, allow_pickle=False) as data:
+                if str(data['fingerprint']) != fingerprint:
+                    return None
+                columns = {
+                    str(name): _decode(data[f'codes_{i}'], data[f'categories_{i}'], str(data[f'dtype_{i}']))
+                    for i, name in enumerate(data['columns'])
+                }
+                return cls(
+                    kind=str(data['kind']),  # noqa: kind is part of the fingerprint
+                    filenames=data['filenames'], correct=data['correct'], incorrect=data['incorrect'],
+                    columns=columns
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def load(cls, gold: FileItem, kind: GoldKind) -> "GoldPairs":
+        """ Load the artifact of a gold file (compiled & stored on first use, then kept in memory) """
+        location = cls.artifact_file(gold)
+        fingerprint = f"{kind}:{cls.fingerprint(gold)}"
+        key = (str(location), fingerprint)
+        if key in cls._loaded:
+            return cls._loaded[key]
+
+        pairs = cls.read(location, fingerprint)
+        if pairs is None:
+            pairs = cls.compile(gold, kind)
+            try:
+                pairs.save(location, fingerprint)
+            except OSError:
+                # dataset is read-only, artifact is rebuilt in each process
+                pass
+        cls._loaded[key] = pairs
+        return pairs
+
+    def subset(self, mask: np.ndarray) -> "GoldPairs":
+        """ Keep the selected pairs only """
+        return GoldPairs(
+            kind=self.kind, filenames=self.filenames, correct=self.correct[mask], incorrect=self.incorrect[mask],
+            columns={name: series[mask].reset_index(drop=True) for name, series in self.columns.items()}
+        )
+
+    def gather(self, scores: pd.DataFrame, drop_missing: bool = False) -> pd.DataFrame:
+        """ Build the pairs of a submission by gathering its scores (indexed by filename)
+
+        Each line contains the descriptive columns of a pair and the scores of its
+        correct & incorrect items. Missing scores are NaN, or if drop_missing is set
+        the pairs with a missing score are removed.
+        """
+        score_col, non_score_col = _COLUMNS[self.kind]['scores']
+        scores = scores[~scores.index.duplicated(keep='first')]['score']
+        values = scores.reindex(self.filenames).to_numpy(dtype=np.float64)
+
+        keep = slice(None)
+        if drop_missing:
+            present = np.isin(self.filenames, scores.index.to_numpy(dtype=str))
+            keep = present[self.correct] & present[self.incorrect]
+
+        # series are indexed (keeps extension dtypes, ex: nullable frequency)
+        data = pd.DataFrame({
+            name: series[keep].reset_index(drop=True) for name, series in self.columns.items()
+        })
+        data[score_col] = values[self.correct][keep]
+        data[non_score_col] = values[self.incorrect][keep]
+        return data
@@ -1,9 +1,12 @@
-from typing import Tuple, TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING, Union
 
 import pandas as pd
 
-from .params import LexicalParams
-from zerospeech.data_loaders import load_dataframe
+from .params import LexicalParams, QUICK_FILENAME
+from .gold_pairs import GoldPairs
+from .pair_scoring import score_by_pair
+from .quick import QuickSample, draw_sample, stratified_estimate
+from zerospeech.data_loaders import load_score_file
 from zerospeech.generics import FileItem
 from zerospeech.tasks import Task
 
@@ -22,41 +25,43 @@ class LexicalTask(Task):
     by_frequency: bool = default_params.by_frequency
     result_filenames = default_params.result_filenames
     sets: Tuple = ('dev', 'test')
+    # quick mode: evaluate a stratified sample (by frequency band) of this fraction of the pairs
+    quick: Optional[float] = None
 
     @staticmethod
-    def load_and_format(lexical_item: FileItem, gold_item: FileItem):
-        """ Loads & formats submission data and gold data """
-        gold_values = load_dataframe(gold_item, header=0, index_col='filename').astype(
-            {'frequency': pd.Int64Dtype()})
+    def frequency_bands(frequency: pd.Series) -> pd.Series:
+        """ Frequency band of each word """
+        return pd.cut(
+            frequency,
+            [0, 1, 5, 20, 100, float('inf')],
+            labels=['oov', '1-5', '6-20', '21-100', '>100'],
+            right=False)
 
-        lexical_values = load_dataframe(lexical_item, sep=' ', header=None,
-                                        names=['filename', 'score'], index_col='filename')
+    @classmethod
+    def quick_sample(cls, gold_pairs: GoldPairs, fraction: float) -> QuickSample:
+        """ Sample (word, non word) pairs ids stratified by frequency band """
+        return draw_sample(gold_pairs.columns['id'], cls.frequency_bands(gold_pairs.columns['frequency']), fraction)
 
-        # merge the gold and score using filenames, then remove the columns
-        # 'phones' and 'filename' as we don't use them for evaluation
-        data = pd.merge(gold_values, lexical_values, on='filename', how='inner')
-        data.reset_index(inplace=True)
+    @classmethod
+    def load_and_format(cls, lexical_item: Union[FileItem, pd.DataFrame], gold_item: FileItem,
+                        quick: Optional[float] = None):
+        """ Loads & formats submission data and gold data
 
-        # if all non-words have their textual version set to NaN, we take their phonemic version instead.
-        if data[data.correct == 0]['word'].isnull().sum() == len(data[data.correct == 0]):
-            data['word'] = data['phones']
-        data.drop(columns=['phones', 'filename'], inplace=True)
+        The (word, non word) pairs are built once from the gold and stored in a compiled
+        artifact, the submission scores are then gathered on these pairs.
+        Submission scores are either a 'filename score' file or an already loaded
+        dataframe (indexed by filename). In quick mode only the sampled pairs are kept.
+        """
+        gold_pairs = GoldPairs.load(gold_item, kind='lexical')
+        if quick is not None:
+            gold_pairs = gold_pairs.subset(cls.quick_sample(gold_pairs, quick).mask)
+        lexical_values = lexical_item
+        if isinstance(lexical_item, FileItem):
+            lexical_values = load_score_file(lexical_item)
 
         # going from a word per line to a pair (word, non word) per line
-        words = data.loc[data['correct'] == 1].reset_index().rename(lambda x: 'w_' + x, axis=1)
-        non_words = data.loc[data['correct'] == 0].reset_index().rename(lambda x: 'nw_' + x, axis=1)
-        data = pd.merge(words, non_words, left_on=['w_voice', 'w_id'], right_on=['nw_voice', 'nw_id'])
-
-        data.drop(
-            ['w_index', 'nw_index', 'nw_voice', 'nw_frequency',
-             'w_correct', 'nw_correct', 'nw_id', 'nw_length'],
-            axis=1, inplace=True)
-        data.rename(
-            {'w_id': 'id', 'w_voice': 'voice', 'w_frequency': 'frequency',
-             'w_word': 'word', 'nw_word': 'non word', 'w_length': 'length',
-             'w_score': 'score word', 'nw_score': 'score non word'},
-            axis=1, inplace=True)
-        return data
+        # (pairs with a missing score are removed)
+        return gold_pairs.gather(lexical_values, drop_missing=True)
 
     @staticmethod
     def eval_by_pair(data: pd.DataFrame) -> pd.DataFrame:
@@ -75,23 +80,11 @@ class LexicalTask(Task):
 
             """
         # compute the score for each pair in an additional 'score' column, then
-        # delete the 'score word' and 'score non word' columns that become useless
-        score = data.loc[:, ['score word', 'score non word']].to_numpy()
-        data['score'] = (
-                0.5 * (score[:, 0] == score[:, 1])
-                + (score[:, 0] > score[:, 1]))
-        data.drop(columns=['score word', 'score non word'], inplace=True)
-
-        # finally get the mean score across voices for all pairs
-        score = data.groupby('id').apply(lambda x: (
-            x.iat[0, 3],  # word
-            x.iat[0, 5],  # non word
-            x.iat[0, 2],  # frequency
-            x.iat[0, 4],  # length
-            x['score'].mean()))
-        return pd.DataFrame(
-            score.to_list(),
-            columns=['word', 'non word', 'frequency', 'length', 'score'])
+        # get the mean score across voices for all pairs
+        return score_by_pair(
+            data, score_columns=['score word', 'score non word'], by=['id'],
+            columns=['word', 'non word', 'frequency', 'length']
+        )
 
     @staticmethod
     def eval_by_frequency(data: pd.DataFrame) -> pd.DataFrame:
@@ -113,11 +106,7 @@ class LexicalTask(Task):
                 following columns: 'frequency', 'score'.
 
             """
-        bands = pd.cut(
-            data.frequency,
-            [0, 1, 5, 20, 100, float('inf')],
-            labels=['oov', '1-5', '6-20', '21-100', '>100'],
-            right=False)
+        bands = LexicalTask.frequency_bands(data.frequency)
 
         return data.score.groupby(bands).agg(
             n='count', score='mean', std='std').reset_index()
@@ -141,11 +130,18 @@ class LexicalTask(Task):
         return data.score.groupby(data.length).agg(
             n='count', score='mean', std='std').reset_index()
 
-    def run_lexical_eval(self, lexical_item: FileItem, gold_item: FileItem):
-        data = self.load_and_format(lexical_item, gold_item)
-        by_pair, by_frequency, by_length = None, None, None
+    def run_lexical_eval(self, lexical_item: Union[FileItem, pd.DataFrame], gold_item: FileItem):
+        data = self.load_and_format(lexical_item, gold_item, self.quick)
+        by_pair, by_frequency, by_length, estimate = None, None, None, None
         by_pair = self.eval_by_pair(data)
 
+        if self.quick is not None:
+            # estimate of the score on all the pairs (by_pair has one line per id)
+            sample = self.quick_sample(GoldPairs.load(gold_item, kind='lexical'), self.quick)
+            estimate = stratified_estimate(
+                by_pair['score'], self.frequency_bands(by_pair['frequency']), sample.population
+            )
+
         if self.by_frequency:
             by_frequency = self.eval_by_frequency(by_pair)
 
@@ -157,18 +153,18 @@ class LexicalTask(Task):
         else:
             by_pair = None
 
-        return by_pair, by_frequency, by_length
+        return by_pair, by_frequency, by_length, estimate
 
     def eval(self, submission: "SLM21Submission", dataset: "SLM21Dataset"):
         """ Run the selected lexical evaluations & write results """
         output_dir = submission.score_dir
-        self.sets = submission.sets
+        self.sets = self.selected_sets(submission.sets)
 
         if 'dev' in self.sets:
             sub = submission.items.lexical_dev
             gold = dataset.index.subsets.lexical_dev.items.gold
             with self.console.status('Running lexical_dev evaluation....', spinner="aesthetic"):
-                by_pair, by_frequency, by_length = self.run_lexical_eval(sub, gold)
+                by_pair, by_frequency, by_length, estimate = self.run_lexical_eval(sub, gold)
 
             if by_pair is not None:
                 filename = output_dir / f"{self.result_filenames['dev']['by_pair']}"
@@ -188,11 +184,17 @@ class LexicalTask(Task):
                                    style="underline yellow4")
                 by_length.to_csv(filename, index=False, float_format='%.4f')
 
+            if estimate is not None:
+                filename = output_dir / QUICK_FILENAME.format(self.name, 'dev')
+                self.console.print(f":pencil: writing {filename.name}",
+                                   style="underline yellow4")
+                estimate.to_csv(filename, index=False, float_format='%.4f')
+
         if 'test' in self.sets:
             sub = submission.items.lexical_test
             gold = dataset.index.subsets.lexical_test.items.gold
             with self.console.status('Running lexical_dev evaluation....', spinner="aesthetic"):
-                by_pair, by_frequency, by_length = self.run_lexical_eval(sub, gold)
+                by_pair, by_frequency, by_length, estimate = self.run_lexical_eval(sub, gold)
 
             if by_pair is not None:
                 filename = output_dir / f"{self.result_filenames['test']['by_pair']}"
@@ -211,3 +213,9 @@ class LexicalTask(Task):
                 self.console.print(f":pencil: writing {self.result_filenames['test']['by_length']}",
                                    style="underline yellow4")
                 by_length.to_csv(filename, index=False, float_format='%.4f')
+
+            if estimate is not None:
+                filename = output_dir / QUICK_FILENAME.format(self.name, 'test')
+                self.console.print(f":pencil: writing {filename.name}",
+                                   style="underline yellow4")
+                estimate.to_csv(filename, index=False, float_format='%.4f')
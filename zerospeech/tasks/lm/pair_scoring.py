@@ -0,0 +1,51 @@
+""" Vectorized pair scoring shared by the lexical, syntactic & prosodic tasks """
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def pair_outcome(score_1: np.ndarray, score_2: np.ndarray) -> np.ndarray:
+    """ Outcome of each pair: 1 if the correct item has the highest score, 0.5 on ties & 0 otherwise """
+    return 0.5 * (score_1 == score_2) + (score_1 > score_2)
+
+
+def score_by_pair(data: pd.DataFrame, score_columns: Sequence[str], by: List[str],
+                  columns: List[str]) -> pd.DataFrame:
+    """ Compute the outcome of each pair & its mean across voices for each group of pairs
+
+    The 'score' column (pair outcome) is added to data and the score_columns are dropped.
+    Groups are numbered using integer codes, means are computed using bincount.
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        one (correct, incorrect) pair per line, the scores of the correct & incorrect items are
+        the two score_columns
+    by: list of str
+        columns identifying a group of pairs (groups are sorted by these columns)
+    columns: list of str
+        columns copied to the output from the first pair of each group
+
+    Returns
+    -------
+    by_pair: pandas.DataFrame
+        one line per group with the given columns & 'score'
+    """
+    score = data.loc[:, list(score_columns)].to_numpy()
+    data['score'] = pair_outcome(score[:, 0], score[:, 1])
+    data.drop(columns=list(score_columns), inplace=True)
+
+    grouping = data.groupby(by, sort=True)
+    codes = grouping.ngroup().to_numpy()
+    # rows with a missing key do not belong to any group
+    rows = np.flatnonzero(codes >= 0)
+    codes = codes[rows]
+
+    counts = np.bincount(codes, minlength=grouping.ngroups)
+    sums = np.bincount(codes, weights=data['score'].to_numpy()[rows], minlength=grouping.ngroups)
+    _, first = np.unique(codes, return_index=True)
+
+    by_pair = pd.DataFrame({c: data[c].iloc[rows[first]].to_list() for c in columns})
+    by_pair['score'] = sums / counts
+    return by_pair
@@ -2,7 +2,7 @@ import enum
 import functools
 import json
 from pathlib import Path
-from typing import Any, Dict, Literal
+from typing import Any, Dict, List, Literal, Optional
 
 import numpy as np
 import yaml
@@ -18,6 +18,15 @@ _SciPyMetrics = ['braycurtis', 'canberra', 'chebyshev', 'cityblock', 'correlatio
                  'matching', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean',
                  'sokalmichener', 'sokalsneath', 'sqeuclidean', 'yule']
 
+# number of frames read at a time by streaming pooling functions
+POOLING_CHUNK_SIZE = 4096
+
+# state of the last semantic evaluation of a subset (stored in the scores directory)
+SEMANTIC_MANIFEST_FILENAME = "semantic_{0}_manifest.npz"
+
+# estimate (with standard error) of a quick evaluation of a task on a set
+QUICK_FILENAME = "score_{0}_{1}_quick.csv"
+
 # Enumeration of metrics used for semantics benchmark
 SemanticMetrics = enum.Enum('SemanticMetrics', {f"{k}": k for k in _SciPyMetrics})
 
@@ -52,6 +61,40 @@ class SemanticPooling(str, enum.Enum):
                 f'pooling method must be {",".join([f.value for f in self])}' # noqa: enum typing is bad
             )
 
+    def streaming_fn(self, chunk_size: int = POOLING_CHUNK_SIZE):
+        """ Pooling function that reduces the frames by chunks of fixed size
+
+        Only chunk_size frames are read into memory at a time, which allows pooling
+        memory-mapped arrays without loading them entirely.
+        """
+        def _reduce(ufunc, x):
+            acc = None
+            for start in range(0, x.shape[0], chunk_size):
+                part = ufunc.reduce(np.asarray(x[start:start + chunk_size]), axis=0)
+                acc = part if acc is None else ufunc(acc, part)
+            return acc
+
+        def _pool(x):
+            if x.shape[0] == 0:
+                # let the default function handle empty arrays
+                return self.fn(x)
+            if self == self.max:
+                return _reduce(np.maximum, x)
+            elif self == self.min:
+                return _reduce(np.minimum, x)
+            elif self == self.sum:
+                return _reduce(np.add, x)
+            elif self == self.mean:
+                return _reduce(np.add, x) / x.shape[0]
+            elif self in (self.last, self.lastlast, self.off):
+                # only reads required frames
+                return np.asarray(self.fn(x))
+            raise ValueError(
+                f'pooling method must be {",".join([f.value for f in self])}'  # noqa: enum typing is bad
+            )
+
+        return _pool
+
 
 class SemanticParams(BaseModel):
     metric: SemanticMetrics = SemanticMetrics('euclidean')
@@ -59,7 +102,23 @@ class SemanticParams(BaseModel):
     synthetic: bool = True
     librispeech: bool = True
     correlations: bool = True
+    # number of bootstrap resamples used to compute confidence intervals of correlations (0: disabled)
+    bootstrap: int = 0
+    confidence_level: float = 0.95
     n_jobs: int = 1
+    # width of the DTW band (as a fraction of the lengths) used when pooling is off
+    dtw_band: float = 0.1
+    # cache pooled embeddings between runs (in $APP_DIR/cache/semantic, up to settings.semantic_cache_max_size)
+    cache: bool = False
+    memory_map: bool = False
+    # pool embeddings while they are loaded during submission validation (each file is only read once)
+    fused_validation: bool = False
+    # only recompute pairs affected by embedding files changed since the last evaluation
+    # (state is written in the score directory)
+    incremental: bool = False
+    # sweep mode: score all the combinations of these metrics & poolings in one pass
+    sweep_metrics: List[SemanticMetrics] = []
+    sweep_poolings: List[SemanticPooling] = []
     result_filenames: FileNameType = dict(
         dev=dict(
             pairs='score_semantic_dev_pairs.csv',
@@ -116,22 +175,29 @@ class SLM21BenchmarkParameters(BenchmarkParameters):
     lexical: LexicalParams = LexicalParams()
     syntactic: SyntacticParams = SyntacticParams()
     semantic: SemanticParams = SemanticParams()
+    # number of (task, set) evaluations run concurrently (1: sequential)
+    max_workers: int = 1
+    # quick mode: evaluate a stratified sample of this fraction of the pairs (None: all pairs)
+    quick: Optional[float] = None
 
     def get_lexical(self) -> Dict[str, Any]:
         return {
             "quiet": self.quiet,
+            "quick": self.quick,
             **self.lexical.dict()
         }
 
     def get_semantic(self) -> Dict[str, Any]:
         return {
             "quiet": self.quiet,
+            "quick": self.quick,
             **self.semantic.dict()
         }
 
     def get_syntactic(self) -> Dict[str, Any]:
         return {
             "quiet": self.quiet,
+            "quick": self.quick,
             **self.syntactic.dict()
         }
 
@@ -139,10 +205,16 @@ class SLM21BenchmarkParameters(BenchmarkParameters):
         """ Convert into leaderboard meta entry """
         # filtering non-interfaced param values
         excluded = {
+            'max_workers': True,
+            'quick': True,
             'lexical': True,
             'syntactic': True,
-            'semantic': {'result_filenames', 'correlations'}
+            'semantic': {'result_filenames', 'correlations', 'bootstrap', 'confidence_level', 'cache',
+                         'memory_map', 'fused_validation', 'incremental', 'sweep_metrics', 'sweep_poolings'}
         }
+        if self.semantic.pooling != SemanticPooling.off:
+            # the DTW band is only used to compare unpooled embeddings
+            excluded['semantic'].add('dtw_band')
 
         return dict(self._iter(to_dict=True, exclude=excluded))
 
@@ -166,12 +238,15 @@ class SLM21BenchmarkParameters(BenchmarkParameters):
 class ProsodyLMParameters(BenchmarkParameters):
     """ Parameters for the prosodic benchmark """
     results_filename: str = "score_prosodic_{0}_{1}_{2}.csv"
-
+    # number of (set, language) evaluations run concurrently (1: sequential)
+    max_workers: int = 1
+    # quick mode: evaluate a stratified sample of this fraction of the pairs (None: all pairs)
+    quick: Optional[float] = None
 
     def to_meta(self) -> Dict[str, Any]:
         """ Convert into leaderboard meta entry """
         # filtering non-interfaced param values
-        excluded = {'results_filename'}
+        excluded = {'results_filename', 'max_workers', 'quick'}
         return dict(self._iter(to_dict=True, exclude=excluded))
 
     def export(self, file: Path):
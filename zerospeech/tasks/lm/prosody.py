@@ -1,10 +1,13 @@
-from typing import TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING, Union
 
 import pandas as pd
 
-from zerospeech.data_loaders import load_dataframe
+from zerospeech.data_loaders import load_score_file
 from zerospeech.generics import FileItem
 from zerospeech.tasks import Task
+from .gold_pairs import GoldPairs
+from .pair_scoring import score_by_pair
+from .quick import QuickSample, draw_sample, stratified_estimate, unit_key
 from .params import ProsodyLMParameters
 
 if TYPE_CHECKING:
@@ -20,32 +23,20 @@ class ProsodicTask(Task):
     sets = ('dev', 'test')
     tasks = ('english',)
     result_filename: str = default_params.results_filename
+    # restrict evaluation to these languages (None: all the languages of the submission)
+    only_languages: Optional[Tuple[str, ...]] = None
+    # quick mode: evaluate a stratified sample (by type) of this fraction of the pairs
+    quick: Optional[float] = None
 
     @staticmethod
     def prosodic_by_pair(data: pd.DataFrame) -> pd.DataFrame:
         """ Returns a dataframe with the scores by (something non something) pair"""
         # compute the score for each pair in an additional 'score' column, then
-        # delete the 'score word' and 'score non word' columns that become useless
-
-        score = data.loc[:, ['score sentence', 'score non sentence']].to_numpy()
-        data['score'] = (
-                0.5 * (score[:, 0] == score[:, 1])
-                + (score[:, 0] > score[:, 1]))
-        data.drop(columns=['score sentence', 'score non sentence'], inplace=True)
-
-        # finally get the mean score across voices for all pairs
-
-        score = data.groupby(['type', 'id']).apply(lambda x: (
-            x.iat[0, 0],  # id
-            # x.iat[0, 1],  # voice
-            x.iat[0, 2],  # type
-            # x.iat[0, 3],  # subtype
-            # x.iat[0, 4],  # sentence
-            # x.iat[0, 5],  # non sentence
-            x['score'].mean()))
-        return pd.DataFrame(
-            score.to_list(),
-            columns=['id', 'type', 'score'])
+        # get the mean score across voices for all pairs
+        return score_by_pair(
+            data, score_columns=['score sentence', 'score non sentence'], by=['type', 'id'],
+            columns=['id', 'type']
+        )
 
     @staticmethod
     def prosodic_by_type(data: pd.DataFrame) -> pd.DataFrame:
@@ -53,57 +44,52 @@ class ProsodicTask(Task):
         return data.score.groupby([data['type']]).agg(
             n='count', score='mean', std='std').reset_index()
 
-    def run_prosodic_comparison(self, gold: FileItem, sub_file: FileItem):
+    @staticmethod
+    def quick_sample(gold_pairs: GoldPairs, fraction: float) -> QuickSample:
+        """ Sample (type, id) pairs stratified by type """
+        units = unit_key(gold_pairs.columns['type'], gold_pairs.columns['id'])
+        return draw_sample(units, gold_pairs.columns['type'], fraction)
+
+    def run_prosodic_comparison(self, gold: FileItem, sub_file: Union[FileItem, pd.DataFrame]):
         """ This function create a prosodic comparison based on inputs
 
         data_formatting:
             Each line of the data frame contains a pair of (correct, incorrect) sentences
             and has the following column: 'id', 'filename', 'type', 'correct'
         """
-        gold_df = load_dataframe(gold, header=0, index_col='filename')
-        sub_df = load_dataframe(sub_file, sep=' ', header=None,
-                                names=['filename', 'score'], index_col='filename')
-
-        # merge the gold and score using filenames, then remove the columns
-        # 'phones' and 'filename' as we don't use them for evaluation
-        data = pd.concat([gold_df, sub_df], axis=1)
-        data.reset_index(drop=True, inplace=True)
-
-        # going from a word per line to a pair (word, non word) per line
-        data = pd.concat([
-            data.loc[data['correct'] == 1].reset_index().rename(
-                lambda x: 's_' + x, axis=1),
-            data.loc[data['correct'] == 0].reset_index().rename(
-                lambda x: 'ns_' + x, axis=1)], axis=1)
-        data.drop(
-            ['s_index', 'ns_index', 'ns_voice', 'ns_type', 'ns_subtype',
-             's_correct', 'ns_correct', 'ns_id'],
-            axis=1, inplace=True)
-
-        data.rename(
-            {'s_id': 'id',
-             's_voice': 'voice',
-             's_type': 'type',
-             's_subtype': 'subtype',
-             's_transcription': 'sentence',
-             'ns_transcription': 'non sentence',
-             's_score': 'score sentence',
-             'ns_score': 'score non sentence'},
-            axis=1, inplace=True)
+        # (sentence, non sentence) pairs are built once from the gold & stored in a compiled
+        # artifact, the submission scores are then gathered on these pairs
+        gold_pairs = GoldPairs.load(gold, kind='sentence')
+        sample = None
+        if self.quick is not None:
+            sample = self.quick_sample(gold_pairs, self.quick)
+            gold_pairs = gold_pairs.subset(sample.mask)
+        sub_df = sub_file
+        if isinstance(sub_file, FileItem):
+            sub_df = load_score_file(sub_file)
+        data = gold_pairs.gather(sub_df)
 
         by_pair = self.prosodic_by_pair(data)
+
+        estimate = None
+        if sample is not None:
+            # estimate of the score on all the pairs (by_pair has one line per pair)
+            estimate = stratified_estimate(by_pair['score'], by_pair['type'], sample.population)
+
         by_type = self.prosodic_by_type(by_pair)
 
         # remove (type, subtype) from by_pair data since by_type is complete
         # by_pair.drop(['type', 'subtype'], axis=1, inplace=True)
 
-        return by_pair, by_type
+        return by_pair, by_type, estimate
 
     def eval(self, submission: "ProsodySubmission", dataset: "ProsAuditLMDataset"):
         """ Evaluate prosody for the given submission """
         output_dir = submission.score_dir
-        self.sets = submission.sets
-        self.tasks = submission.tasks
+        self.sets = self.selected_sets(submission.sets)
+        self.tasks = tuple(
+            t for t in submission.tasks if self.only_languages is None or t in self.only_languages
+        )
 
         if 'dev' in self.sets:
             if 'english' in self.tasks:
@@ -111,7 +97,7 @@ class ProsodicTask(Task):
                 sub_file = submission.items.english_dev
 
                 with self.console.status('Running prosodic english_dev evaluation', spinner="aesthetic"):
-                    by_pair, by_type = self.run_prosodic_comparison(gold_file, sub_file)
+                    by_pair, by_type, estimate = self.run_prosodic_comparison(gold_file, sub_file)
 
                 filename = output_dir / f"{self.result_filename.format('english', 'dev', 'by_pair')}"
                 self.console.print(f":pencil: writing {filename.name}",
@@ -123,13 +109,19 @@ class ProsodicTask(Task):
                                    style="underline yellow4")
                 by_type.to_csv(filename, index=False, float_format='%.4f')
 
+                if estimate is not None:
+                    filename = output_dir / f"{self.result_filename.format('english', 'dev', 'quick')}"
+                    self.console.print(f":pencil: writing {filename.name}",
+                                       style="underline yellow4")
+                    estimate.to_csv(filename, index=False, float_format='%.4f')
+
         if 'test' in self.sets:
             if 'english' in self.tasks:
                 gold_file = dataset.index.subsets.english_test.items.gold
                 sub_file = submission.items.english_test
 
                 with self.console.status('Running prosodic english_test evaluation', spinner="aesthetic"):
-                    by_pair, by_type = self.run_prosodic_comparison(gold_file, sub_file)
+                    by_pair, by_type, estimate = self.run_prosodic_comparison(gold_file, sub_file)
 
                 filename = output_dir / f"{self.result_filename.format('english', 'test', 'by_pair')}"
                 self.console.print(f":pencil: writing {filename.name}",
@@ -141,4 +133,10 @@ class ProsodicTask(Task):
                                    style="underline yellow4")
                 by_type.to_csv(filename, index=False, float_format='%.4f')
 
+                if estimate is not None:
+                    filename = output_dir / f"{self.result_filename.format('english', 'test', 'quick')}"
+                    self.console.print(f":pencil: writing {filename.name}",
+                                       style="underline yellow4")
+                    estimate.to_csv(filename, index=False, float_format='%.4f')
+
 
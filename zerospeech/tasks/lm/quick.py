@@ -0,0 +1,90 @@
+""" Stratified subsampling of the spoken LM tasks (quick evaluation mode) """
+import math
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# seed of the sample (changing it changes the sampled units)
+QUICK_SEED = 0
+
+
+class QuickSample(NamedTuple):
+    """ Units sampled from a gold """
+    # selected rows of the gold (all the rows of a sampled unit are selected)
+    mask: np.ndarray
+    # number of units of each stratum in the full gold
+    population: pd.Series
+
+
+def unit_key(*columns: pd.Series) -> pd.Series:
+    """ Identify units using the values of one or more columns """
+    key = columns[0].astype(str)
+    for c in columns[1:]:
+        key = key + '/' + c.astype(str)
+    return key.reset_index(drop=True)
+
+
+def draw_sample(units: pd.Series, strata: pd.Series, fraction: float, seed: int = QUICK_SEED) -> QuickSample:
+    """ Draw a deterministic stratified sample of units
+
+    Units of each stratum are ordered by a hash of their key and the first ceil(fraction * size)
+    are kept: the sample only depends on the gold (not on the submission or the order of the rows).
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f'quick fraction must be in ]0, 1], got {fraction}')
+
+    units = units.astype(str).reset_index(drop=True)
+    strata = strata.astype(str).reset_index(drop=True)
+    table = pd.DataFrame({'unit': units, 'stratum': strata}).drop_duplicates('unit')
+    table['hash'] = [zlib.crc32(f"{seed}:{u}".encode()) for u in table['unit']]
+    table = table.sort_values(['stratum', 'hash', 'unit'])
+
+    population = table.groupby('stratum').size()
+    rank = table.groupby('stratum').cumcount().to_numpy()
+    sizes = np.ceil(fraction * population.loc[table['stratum']].to_numpy())
+    selected = set(table['unit'][rank < sizes])
+
+    return QuickSample(mask=units.isin(selected).to_numpy(), population=population)
+
+
+def stratified_estimate(scores: pd.Series, strata: pd.Series, population: pd.Series) -> pd.DataFrame:
+    """ Estimate the mean score of the full gold from the scores of the sampled units
+
+    Each stratum is weighted by its share of the units of the gold, the standard error
+    includes the finite population correction.
+
+    Returns:
+        one line per stratum & a final 'all' line with the columns: stratum, n, N, score, std_err
+    """
+    data = pd.DataFrame({
+        'stratum': strata.astype(str).to_numpy(), 'score': scores.to_numpy(dtype=np.float64)
+    }).dropna()
+    stats = data.groupby('stratum')['score'].agg(n='count', score='mean', var='var')
+    stats = stats.reindex(population.index)
+    stats['N'] = population
+    n, big_n = stats['n'].fillna(0), stats['N']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats['std_err'] = np.sqrt(stats['var'].fillna(0) / n * (1 - n / big_n))
+
+    # strata without any scored unit do not contribute to the estimate
+    sampled = stats[n > 0]
+    weights = sampled['N'] / sampled['N'].sum()
+    overall = pd.DataFrame([dict(
+        n=int(sampled['n'].sum()), N=int(big_n.sum()),
+        score=float((weights * sampled['score']).sum()) if len(sampled) > 0 else math.nan,
+        std_err=float(np.sqrt((weights ** 2 * sampled['std_err'] ** 2).sum())) if len(sampled) > 0 else math.nan
+    )], index=pd.Index(['all'], name='stratum'))
+
+    stats = stats.drop(columns='var').astype({'n': 'Int64', 'N': 'Int64'})
+    return pd.concat([stats, overall])[['n', 'N', 'score', 'std_err']].reset_index()
+
+
+def correlation_std_err(correlation: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """ Standard error of Spearman correlations (Bonett & Wright approximation) """
+    correlation, n = np.asarray(correlation, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se_z = np.sqrt((1 + correlation ** 2 / 2) / (n - 3))
+        return np.where(n > 3, (1 - correlation ** 2) * se_z, np.nan)
@@ -1,16 +1,22 @@
 from pathlib import Path
-from typing import Dict, Optional, TYPE_CHECKING
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING, Union
 
 import joblib
 import numpy as np
 import pandas as pd
-import scipy.spatial
-import scipy.stats
 
-from zerospeech.data_loaders import load_dataframe, load_numpy_array
+from zerospeech.data_loaders import load_dataframe
 from zerospeech.generics import FileItem, FileListItem
+from zerospeech.generics.cache import file_fingerprint
 from zerospeech.tasks import Task
-from .params import SemanticParams, SemanticMetrics, SemanticPooling
+from .params import SemanticParams, SemanticMetrics, SemanticPooling, SEMANTIC_MANIFEST_FILENAME
+from .semantic_cache import PooledEmbeddingCache, SemanticManifest
+from .quick import correlation_std_err, draw_sample, unit_key
+from .semantic_correlation import bootstrap_spearman, confidence_interval, grouped_spearman
+from .semantic_dtw import FrameDistanceEngine, FrameEmbeddings
+from .semantic_engine import (
+    BatchedPooling, ChunkTiming, PooledEmbeddings, SemanticDistanceEngine, load_chunk, split_chunks
+)
 
 if TYPE_CHECKING:
     from zerospeech.submissions.sLM21 import SLM21Submission
@@ -18,6 +24,9 @@ if TYPE_CHECKING:
 
 default_params = SemanticParams()
 
+# embedding files of a type (filename -> path or in-memory frames) or its pre-pooled embeddings
+FileIndex = Union[Dict[str, Union[Path, np.ndarray]], PooledEmbeddings]
+
 
 class SemanticTask(Task):
     _name = "semantic"
@@ -26,81 +35,198 @@ class SemanticTask(Task):
     synthetic: bool = default_params.synthetic
     librispeech: bool = default_params.librispeech
     correlations: bool = default_params.correlations
+    bootstrap: int = default_params.bootstrap
+    confidence_level: float = default_params.confidence_level
     n_jobs: int = default_params.n_jobs
+    dtw_band: float = default_params.dtw_band
+    cache: bool = default_params.cache
+    memory_map: bool = default_params.memory_map
+    fused_validation: bool = default_params.fused_validation
+    incremental: bool = default_params.incremental
+    sweep_metrics: List[SemanticMetrics] = default_params.sweep_metrics
+    sweep_poolings: List[SemanticPooling] = default_params.sweep_poolings
+    # quick mode: evaluate a stratified sample (by type & dataset) of this fraction of the pairs
+    quick: Optional[float] = None
     result_filenames = default_params.result_filenames
     sets = ('dev', 'test')
+    # execution time of each chunk of the last pooling
+    pooling_timings: List[ChunkTiming] = []
 
     def compute_correlation(self, pairs: pd.DataFrame) -> Optional[pd.DataFrame]:
-        """"Returns the Spearman's correlation between human and machine scores"""
+        """"Returns the Spearman's correlation between human and machine scores
+
+        Correlations of all the (type, dataset) groups are computed in one vectorized pass,
+        if bootstrap is set, confidence intervals are added in the ci_low & ci_high columns.
+        """
         if not self.correlations:
             return None
 
-        def _correlation(df):
-            # choose 'similarity' or 'relatedness' column (the one with no NaN)
-            human = df.similarity if df.relatedness.hasnans else df.relatedness
-            # return spearman correlation. Humans score are similarity (high when
-            # close) so we take the opposite to have a quantity close to a distance
-            # (low when close)
-            return 100 * scipy.stats.spearmanr(  # noqa: bad __init__ in scipy ?
-                - human.to_numpy(), df.score.to_numpy())[0]
-
-        # for each (type/dataset) combination, compute spearman correlation
-        series = pairs.groupby([pairs['type'], pairs['dataset']]).apply(_correlation)
+        grouping = pairs.groupby([pairs['type'], pairs['dataset']])
+        codes = grouping.ngroup().to_numpy()
+        n_groups = grouping.ngroups
+
+        # choose 'similarity' or 'relatedness' column (the one with no NaN) for each group
+        relatedness = pairs['relatedness'].to_numpy(dtype=np.float64)
+        similarity = pairs['similarity'].to_numpy(dtype=np.float64)
+        use_similarity = np.bincount(codes, weights=np.isnan(relatedness), minlength=n_groups) > 0
+        human = np.where(use_similarity[codes], similarity, relatedness)
+        # Humans score are similarity (high when close) so we take the opposite to
+        # have a quantity close to a distance (low when close)
+        human, machine = -human, pairs['score'].to_numpy(dtype=np.float64)
+
         # transform raw result in a usable dataframe
-        return series.to_frame().rename(columns={0: 'correlation'}).reset_index()
-
-    def compute_distance(self, pairs_row: pd.Series, gold_df: pd.DataFrame, pool: pd.DataFrame):
-        # keep only current type in gold
-        gold_df = gold_df[gold_df['type'] == pairs_row['type']]
-
-        if pairs_row['type'] == 'librispeech':
-            # get the list of tokens corresponding to the given pair of words
-            tokens_1 = gold_df['filename'][gold_df['word'] == pairs_row['word_1']]
-            tokens_2 = gold_df['filename'][gold_df['word'] == pairs_row['word_2']]
-            assert 0 < len(tokens_1) <= 10 and 0 < len(tokens_2) <= 10
-
-            x = np.asarray(pool[pool['filename'].isin(tokens_1)]['pooling'].tolist())
-            y = np.asarray(pool[pool['filename'].isin(tokens_2)]['pooling'].tolist())
-
-            # compute the mean distance across all pairs of tokens after pooling
-            return scipy.spatial.distance.cdist(  # noqa: bad __init__ for scipy.spatial ??
-                x, y, metric=str(self.metric.value)).mean()
-        elif pairs_row['type'] == 'synthetic':
-            # get the list of tokens corresponding to the given pair of words
-            tokens_1 = gold_df[['filename', 'voice']][gold_df['word'] == pairs_row['word_1']]
-            tokens_2 = gold_df[['filename', 'voice']][gold_df['word'] == pairs_row['word_2']]
-            tokens = tokens_1.merge(tokens_2, on='voice').drop(['voice'], axis=1)
-
-            # compute the mean of distances within a given voice
-            dist = 0
-            for _, (filename_x, filename_y) in tokens.iterrows():
-                x = pool[pool['filename'] == filename_x]['pooling'].item()
-                y = pool[pool['filename'] == filename_y]['pooling'].item()
-                dist += scipy.spatial.distance.cdist(  # noqa: bad __init__ for scipy.spatial ??
-                    np.atleast_2d(x), np.atleast_2d(y), metric=str(self.metric.value))[0][0]
-
-            return dist / len(tokens)
+        correlation = grouping.size().index.to_frame(index=False)
+        correlation['correlation'] = 100 * grouped_spearman(human, machine, codes, n_groups)
+
+        if self.quick is not None:
+            # correlations are estimated on a sample of the pairs
+            correlation['n'] = np.bincount(codes, minlength=n_groups)
+            correlation['std_err'] = 100 * correlation_std_err(correlation['correlation'] / 100, correlation['n'])
+
+        if self.bootstrap > 0:
+            samples = 100 * bootstrap_spearman(human, machine, codes, n_groups, n_resamples=self.bootstrap)
+            correlation['ci_low'], correlation['ci_high'] = confidence_interval(samples, self.confidence_level)
+        return correlation
 
     def build_file_index(
-            self, synthetic: FileListItem, librispeech: FileListItem
-    ) -> Dict[str, Dict[str, Path]]:
+            self, synthetic: Union[FileListItem, FileItem, PooledEmbeddings],
+            librispeech: Union[FileListItem, FileItem, PooledEmbeddings]
+    ) -> Dict[str, FileIndex]:
+        """ Index the embedding files of each type (pre-pooled matrices are loaded directly) """
+        mmap_mode = 'r' if self.memory_map else None
+
+        def _index(item: Union[FileListItem, FileItem, PooledEmbeddings]) -> FileIndex:
+            if isinstance(item, PooledEmbeddings):
+                # already pooled (during validation)
+                return item
+            if isinstance(item, FileItem):
+                return PooledEmbeddings.load(item, mmap_mode=mmap_mode)
+            return {f"{p.stem}": p for p in item}
+
         file_index = {}
         if self.librispeech:
-            file_index['librispeech'] = {
-                f"{p.stem}": p
-                for p in librispeech
-            }
+            file_index['librispeech'] = _index(librispeech)
         if self.synthetic:
-            file_index['synthetic'] = {
-                f"{p.stem}": p
-                for p in synthetic
-            }
+            file_index['synthetic'] = _index(synthetic)
 
         return file_index
 
-    def semantic_eval(self, file_index: Dict[str, Dict[str, Path]],
-                      gold: FileItem, pairs: FileItem):
-        """ Semantically evaluate a subset """
+    def array_index(self, embeddings: Mapping[str, Mapping[str, np.ndarray]]) -> Dict[str, FileIndex]:
+        """ Index in-memory embeddings (type -> filename -> frames)
+
+        Frames are pooled directly, when pooling is 'off' they are kept as is for DTW.
+        """
+        types = [t for t, selected in (('librispeech', self.librispeech), ('synthetic', self.synthetic)) if selected]
+        if self.pooling == SemanticPooling.off:
+            return {t: dict(embeddings.get(t, {})) for t in types}
+        return {
+            t: PooledEmbeddings.from_vectors(
+                (f, self.pooling.fn(np.asarray(data))) for f, data in embeddings.get(t, {}).items()
+            )
+            for t in types
+        }
+
+    def fused_embeddings(self, submission: "SLM21Submission") -> Dict[str, PooledEmbeddings]:
+        """ Embeddings pooled during validation of the submission (if they match the current pooling) """
+        if not self.fused_validation or self.sweep or submission.fused_pooling != self.pooling:
+            return {}
+        return submission.fused_embeddings
+
+    def pool_frames(
+            self, file_index: Dict[str, FileIndex], gold_df: pd.DataFrame
+    ) -> List[Tuple[str, str, Optional[np.ndarray]]]:
+        """ Load the (unpooled) frames of each file in gold
+
+        Files are loaded by chunks (one task per chunk) as in the pooling of embeddings.
+
+        Returns:
+            a list of (filename, type, frames) tuples, frames is None if file is missing
+        """
+        keys = list(zip(gold_df['type'], gold_df['filename']))
+        sources = {key: file_index.get(key[0], {}).get(key[1], None) for key in keys}
+        # in-memory frames are used as is
+        frames = {key: data for key, data in sources.items() if isinstance(data, np.ndarray)}
+
+        to_load = [key for key, data in sources.items() if data is not None and key not in frames]
+        chunks = split_chunks(to_load, joblib.effective_n_jobs(self.n_jobs))
+        res = joblib.Parallel(n_jobs=self.n_jobs)(
+            joblib.delayed(load_chunk)([sources[key] for key in chunk], self.memory_map)
+            for chunk in chunks
+        )
+        for chunk, arrays in zip(chunks, res):
+            frames.update(zip(chunk, arrays))
+
+        return [(filename, _type, frames.get((_type, filename), None)) for _type, filename in keys]
+
+    def frame_engine(self, file_index: Dict[str, FileIndex], gold_df: pd.DataFrame) -> FrameDistanceEngine:
+        """ Load the unpooled frames of each file in gold into a DTW distance engine """
+        if any(isinstance(v, PooledEmbeddings) for v in file_index.values()):
+            raise ValueError('pooling cannot be off when submitting pre-pooled embeddings')
+        frames = FrameEmbeddings.from_arrays(
+            (filename, data) for filename, _, data in self.pool_frames(file_index, gold_df)
+        )
+        return FrameDistanceEngine(
+            frames, metric=str(self.metric.value), band=self.dtw_band, n_jobs=self.n_jobs
+        )
+
+    def pool_embeddings(
+            self, file_index: Dict[str, FileIndex], gold_df: pd.DataFrame,
+            poolings: Optional[Sequence[SemanticPooling]] = None
+    ) -> Dict[SemanticPooling, PooledEmbeddings]:
+        """ Compute the pooled embeddings of each file in gold (files missing from the submission are skipped)
+
+        Each file is loaded once and pooled using all the given pooling methods (default: self.pooling)
+        """
+        poolings = poolings or (self.pooling,)
+        # pre-pooled embeddings are used as is (for all pooling methods)
+        prepooled = [v for v in file_index.values() if isinstance(v, PooledEmbeddings)]
+        files = {
+            _type: {
+                f: type_files[f] for f in gold_df['filename'][gold_df['type'] == _type] if f in type_files
+            }
+            for _type, type_files in file_index.items()
+            if not isinstance(type_files, PooledEmbeddings)
+        }
+
+        cache, cached = None, {p: {} for p in poolings}
+        if self.cache:
+            cache = PooledEmbeddingCache.load()
+            cached = {
+                p: {
+                    _type: cache.lookup(type_files, p.value, streaming=self.memory_map)
+                    for _type, type_files in files.items()
+                }
+                for p in poolings
+            }
+
+        # compute pooling of files not found in cache (for at least one pooling method)
+        missing = {
+            f: path
+            for _type, type_files in files.items()
+            for f, path in type_files.items()
+            if any(f not in cached[p].get(_type, {}) for p in poolings)
+        }
+        executor = BatchedPooling(*poolings, n_jobs=self.n_jobs, memory_map=self.memory_map)
+        computed = executor.run(missing)
+        self.pooling_timings = executor.timings
+
+        results = {}
+        for p in poolings:
+            if cache is not None and len(computed[p]) > 0:
+                for _type, type_files in files.items():
+                    vectors = dict(cached[p].get(_type, {}))
+                    vectors.update({f: v for f, v in computed[p].items() if f in type_files})
+                    cache.store(type_files, p.value, vectors, streaming=self.memory_map)
+
+            results[p] = PooledEmbeddings.from_vectors([
+                *computed[p].items(),
+                *[(f, v) for vectors in cached[p].values() for f, v in vectors.items()],
+                *[item for embeddings in prepooled for item in embeddings.items()]
+            ], dtype=executor.dtype)
+        return results
+
+    def load_gold(self, gold: FileItem, pairs: FileItem) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """ Load the gold & pairs of a subset (filtered by the selected types) """
         pairs_df = load_dataframe(pairs, header=0)
         gold_df = load_dataframe(gold, header=0)
 
@@ -112,42 +238,173 @@ class SemanticTask(Task):
             gold_df = gold_df.drop(gold_df[gold_df['type'] == 'librispeech'].index)
             pairs_df = pairs_df.drop(pairs_df[pairs_df['type'] == 'librispeech'].index)
 
-        def compute(_row: pd.Series):
-            """ Compute pooling from submission array """
-            fname = file_index.get(_row[0], {}).get(_row[1], None)
-            if fname is None:
-                return _row[1], _row[0], None
-            data = load_numpy_array(fname)
-            # values
-            return _row[1], _row[0], self.pooling.fn(data)
-
-        # compute pooling from g
-        res = joblib.Parallel(n_jobs=self.n_jobs)(joblib.delayed(compute)(x) for _, x in gold_df.iterrows())
-        pool = pd.DataFrame(res, columns=['filename', 'type', 'pooling'])
+        if self.quick is not None:
+            # keep sampled pairs & the tokens of their words
+            sample = draw_sample(
+                unit_key(pairs_df['type'], pairs_df['word_1'], pairs_df['word_2']),
+                unit_key(pairs_df['type'], pairs_df['dataset']), self.quick
+            )
+            pairs_df = pairs_df[sample.mask].reset_index(drop=True)
+            words = set(zip(pairs_df['type'], pairs_df['word_1'])) | set(zip(pairs_df['type'], pairs_df['word_2']))
+            gold_df = gold_df[[(t, w) in words for t, w in zip(gold_df['type'], gold_df['word'])]]
+
+        return gold_df, pairs_df
+
+    def compute_scores(self, file_index: Dict[str, FileIndex], gold_df: pd.DataFrame,
+                       pairs_df: pd.DataFrame) -> np.ndarray:
+        """ Compute the score (mean token distance) of each pair """
+        if self.pooling == SemanticPooling.off:
+            # unpooled frames are compared using DTW
+            return self.frame_engine(file_index, gold_df).compute(pairs_df, gold_df)
+
+        embeddings = self.pool_embeddings(file_index, gold_df)[self.pooling]
+        engine = SemanticDistanceEngine(embeddings, metric=str(self.metric.value))
+        return engine.compute(pairs_df, gold_df)
+
+    def manifest_key(self, gold: FileItem, pairs: FileItem) -> str:
+        """ Key identifying the parameters & gold files of an evaluation """
+        return ";".join([
+            str(self.metric.value), self.pooling.value, f"{self.dtw_band}",
+            f"{self.synthetic}", f"{self.librispeech}",
+            file_fingerprint(gold.file), file_fingerprint(pairs.file)
+        ])
+
+    def incremental_scores(self, file_index: Dict[str, FileIndex], gold: FileItem, pairs: FileItem,
+                           gold_df: pd.DataFrame, pairs_df: pd.DataFrame, manifest_file: Path) -> np.ndarray:
+        """ Compute the scores of each pair, reusing the scores of the last evaluation
+
+        Only the pairs with a word having at least one changed embedding file are recomputed,
+        the manifest is then updated with the new fingerprints & scores.
+        """
+        fingerprints = {
+            f"{_type}/{f}": file_fingerprint(path)
+            for _type, type_files in file_index.items()
+            for f, path in type_files.items()
+        }
+        key = self.manifest_key(gold, pairs)
+        manifest = SemanticManifest.load(manifest_file)
+
+        if manifest is None or manifest.key != key or len(manifest.scores) != len(pairs_df):
+            scores = self.compute_scores(file_index, gold_df, pairs_df)
+        else:
+            changed = manifest.changed_files(fingerprints)
+            # words with at least one changed token
+            gold_changed = (gold_df['type'] + '/' + gold_df['filename']).isin(changed)
+            changed_words = set(zip(gold_df['type'][gold_changed], gold_df['word'][gold_changed]))
+            affected = np.fromiter(
+                ((t, w1) in changed_words or (t, w2) in changed_words
+                 for t, w1, w2 in zip(pairs_df['type'], pairs_df['word_1'], pairs_df['word_2'])),
+                dtype=bool, count=len(pairs_df)
+            )
 
-        pairs_df['score'] = [
-            self.compute_distance(pairs_row, gold_df, pool)
-            for _, pairs_row in pairs_df.iterrows()
-        ]
+            scores = manifest.scores.copy()
+            if affected.any():
+                affected_pairs = pairs_df[affected]
+                affected_words = set(zip(affected_pairs['type'], affected_pairs['word_1'])) \
+                    | set(zip(affected_pairs['type'], affected_pairs['word_2']))
+                # only the tokens of affected pairs are pooled
+                affected_gold = gold_df[[
+                    (t, w) in affected_words for t, w in zip(gold_df['type'], gold_df['word'])
+                ]]
+                scores[affected] = self.compute_scores(file_index, affected_gold, affected_pairs)
+
+        SemanticManifest(key=key, fingerprints=fingerprints, scores=scores).save(manifest_file)
+        return scores
+
+    def semantic_eval(self, file_index: Dict[str, FileIndex],
+                      gold: FileItem, pairs: FileItem, manifest_file: Optional[Path] = None):
+        """ Semantically evaluate a subset
+
+        If a manifest file is given, only the pairs affected by changed embedding files are recomputed
+        (not available for pre-pooled embeddings & in quick mode).
+        """
+        gold_df, pairs_df = self.load_gold(gold, pairs)
+
+        prepooled = any(isinstance(v, PooledEmbeddings) for v in file_index.values())
+        if manifest_file is not None and self.quick is None and not prepooled:
+            pairs_df['score'] = self.incremental_scores(file_index, gold, pairs, gold_df, pairs_df, manifest_file)
+        else:
+            pairs_df['score'] = self.compute_scores(file_index, gold_df, pairs_df)
 
         correlation = self.compute_correlation(pairs_df)
 
         return pairs_df, correlation
 
+    @property
+    def sweep(self) -> bool:
+        """ True if sweep mode is enabled """
+        return len(self.sweep_metrics) > 0 or len(self.sweep_poolings) > 0
+
+    def sweep_combinations(self) -> List[Tuple[SemanticMetrics, SemanticPooling]]:
+        """ List all (metric, pooling) combinations of the sweep (always includes current metric & pooling) """
+        metrics = list(dict.fromkeys([self.metric, *self.sweep_metrics]))
+        poolings = list(dict.fromkeys([self.pooling, *self.sweep_poolings]))
+        return [(m, p) for p in poolings for m in metrics]
+
+    def semantic_sweep(
+            self, file_index: Dict[str, FileIndex], gold: FileItem, pairs: FileItem
+    ) -> Dict[Tuple[SemanticMetrics, SemanticPooling], Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+        """ Semantically evaluate a subset using all combinations of the sweep
+
+        Embeddings are loaded once & pooled with all the pooling methods, the scores
+        of all the metrics are then computed on the pooled data.
+        """
+        gold_df, pairs_df = self.load_gold(gold, pairs)
+        combinations = self.sweep_combinations()
+        poolings = list(dict.fromkeys(p for _, p in combinations if p != SemanticPooling.off))
+        pooled = self.pool_embeddings(file_index, gold_df, poolings=poolings) if poolings else {}
+
+        results = {}
+        for pooling in dict.fromkeys(p for _, p in combinations):
+            metrics = [m for m, p in combinations if p == pooling]
+            if pooling == SemanticPooling.off:
+                # unpooled frames are compared using DTW
+                engine = self.frame_engine(file_index, gold_df)
+            else:
+                engine = SemanticDistanceEngine(pooled[pooling], metric=str(self.metric.value))
+            scores = engine.compute_many(pairs_df, gold_df, metrics=[str(m.value) for m in metrics])
+            for metric in metrics:
+                res_pairs = pairs_df.copy()
+                res_pairs['score'] = scores[str(metric.value)]
+                results[(metric, pooling)] = res_pairs, self.compute_correlation(res_pairs)
+        return results
+
+    def write_sweep(self, outputs_dir: Path, subset: str, results: Dict):
+        """ Write one correlation table per (metric, pooling) combination of the sweep """
+        if not self.correlations:
+            return
+
+        stem = Path(self.result_filenames[subset]['correlations']).stem
+        for (metric, pooling), (_, correlation) in results.items():
+            if correlation is None:
+                continue
+            filename = outputs_dir / f"{stem}_{metric.value}_{pooling.value}.csv"
+            self.console.print(f":pencil: writing {filename.name}", style="underline yellow4")
+            correlation.to_csv(filename, index=False, float_format='%.4f')
+
     def eval(self, submission: "SLM21Submission", dataset: "SLM21Dataset"):
         """ Run the selected semantic evaluations & write results """
         outputs_dir = submission.score_dir
-        self.sets = submission.sets
+        self.sets = self.selected_sets(submission.sets)
 
         if 'dev' in self.sets:
             gold = dataset.index.subsets.semantic_dev.items.gold
             pairs = dataset.index.subsets.semantic_dev.items.pairs
+            fused = self.fused_embeddings(submission)
             file_index = self.build_file_index(
-                synthetic=submission.items.semantic_dev_synthetic,
-                librispeech=submission.items.semantic_dev_librispeech
+                synthetic=fused.get('semantic_dev_synthetic', submission.items.semantic_dev_synthetic),
+                librispeech=fused.get('semantic_dev_librispeech', submission.items.semantic_dev_librispeech)
             )
             with self.console.status('Running semantic_dev evaluation....', spinner="aesthetic"):
-                res_pairs, correlation = self.semantic_eval(file_index, gold, pairs)
+                if self.sweep:
+                    sweep_results = self.semantic_sweep(file_index, gold, pairs)
+                    res_pairs, correlation = sweep_results[(self.metric, self.pooling)]
+                    self.write_sweep(outputs_dir, 'dev', sweep_results)
+                else:
+                    manifest_file = None
+                    if self.incremental:
+                        manifest_file = outputs_dir / SEMANTIC_MANIFEST_FILENAME.format('dev')
+                    res_pairs, correlation = self.semantic_eval(file_index, gold, pairs, manifest_file)
 
             filename = outputs_dir / self.result_filenames['dev']['pairs']
             self.console.print(f":pencil: writing {self.result_filenames['dev']['pairs']}",
@@ -163,12 +420,21 @@ class SemanticTask(Task):
         if 'test' in self.sets:
             gold = dataset.index.subsets.semantic_test.items.gold
             pairs = dataset.index.subsets.semantic_test.items.pairs
+            fused = self.fused_embeddings(submission)
             file_index = self.build_file_index(
-                synthetic=submission.items.semantic_test_synthetic,
-                librispeech=submission.items.semantic_test_librispeech
+                synthetic=fused.get('semantic_test_synthetic', submission.items.semantic_test_synthetic),
+                librispeech=fused.get('semantic_test_librispeech', submission.items.semantic_test_librispeech)
             )
             with self.console.status('Running semantic_test evaluation....', spinner="aesthetic"):
-                res_pairs, correlation = self.semantic_eval(file_index, gold, pairs)
+                if self.sweep:
+                    sweep_results = self.semantic_sweep(file_index, gold, pairs)
+                    res_pairs, correlation = sweep_results[(self.metric, self.pooling)]
+                    self.write_sweep(outputs_dir, 'test', sweep_results)
+                else:
+                    manifest_file = None
+                    if self.incremental:
+                        manifest_file = outputs_dir / SEMANTIC_MANIFEST_FILENAME.format('test')
+                    res_pairs, correlation = self.semantic_eval(file_index, gold, pairs, manifest_file)
 
             filename = outputs_dir / self.result_filenames['test']['pairs']
             self.console.print(f":pencil: writing {self.result_filenames['test']['pairs']}",
@@ -0,0 +1,187 @@
+""" Persistent cache of pooled embeddings & evaluation manifests for the semantic task """
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from zerospeech.generics import archives
+from zerospeech.generics.cache import evict_lru, file_fingerprint, mark_used
+from zerospeech.settings import get_settings
+
+st = get_settings()
+
+
+class PooledEmbeddingCache:
+    """ On-disk cache of pooled embeddings
+
+    Each subset (a directory of embedding files) evaluated with a specific pooling
+    method (& pooling mode: in memory or streamed from memory mapped files) is stored
+    as one .npz archive containing the pooled matrix, the filenames and the fingerprints
+    of the source files. A cached vector is only used if the
+    fingerprint of its source file is unchanged.
+
+    When the total size of the cache exceeds max_size, the least recently used
+    entries are deleted.
+    """
+
+    def __init__(self, location: Path, max_size: int):
+        self.location = location
+        self.max_size = max_size
+
+    @classmethod
+    def load(cls) -> "PooledEmbeddingCache":
+        """ Load cache from the application directory """
+        location = st.cache_path / "semantic"
+        location.mkdir(exist_ok=True, parents=True)
+        return cls(location=location, max_size=st.semantic_cache_max_size)
+
+    def entry_file(self, files: Dict[str, Path], pooling: str, streaming: bool = False) -> Optional[Path]:
+        """ Location of the entry of a subset (None if file list is empty)
+
+        streaming: vectors are pooled from memory mapped files (streaming pooling functions)
+        """
+        if len(files) == 0:
+            return None
+        subset_dir = os.path.commonpath([str(p.resolve().parent) for p in files.values()])
+        key = f"{subset_dir}:{pooling}"
+        if streaming:
+            key = f"{key}:streaming"
+        key = hashlib.sha1(key.encode()).hexdigest()
+        return self.location / f"{key}.npz"
+
+    @staticmethod
+    def _read(entry: Optional[Path]) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """ Filenames, fingerprints & matrix of an entry (None if missing, corrupted entries are deleted) """
+        if entry is None or not entry.is_file():
+            return None
+        try:
+            with np.load(entry, allow_pickle=False) as data:
+                return data['filenames'], data['fingerprints'], data['matrix']
+        except (OSError, ValueError, KeyError):
+            # corrupted entry
+            entry.unlink(missing_ok=True)
+            return None
+
+    def lookup(self, files: Dict[str, Path], pooling: str, streaming: bool = False) -> Dict[str, np.ndarray]:
+        """ Return the cached vectors of the files that have not changed since caching """
+        entry = self.entry_file(files, pooling, streaming)
+        content = self._read(entry)
+        if content is None:
+            return {}
+        filenames, fingerprints, matrix = content
+
+        mark_used(entry)
+
+        vectors = {}
+        for i, (filename, fingerprint) in enumerate(zip(filenames, fingerprints)):
+            path = files.get(str(filename), None)
+            if path is not None and archives.is_file(path) and file_fingerprint(path) == fingerprint:
+                vectors[str(filename)] = matrix[i]
+        return vectors
+
+    def store(self, files: Dict[str, Path], pooling: str, vectors: Dict[str, np.ndarray],
+              streaming: bool = False):
+        """ Store the pooled vectors of a subset
+
+        Vectors are merged into the existing entry: cached files that are not given (ex: files
+        outside the evaluated types or the quick sample) are kept.
+        """
+        entry = self.entry_file(files, pooling, streaming)
+        filenames = [f for f in vectors.keys() if f in files]
+        if entry is None or len(filenames) == 0:
+            return
+
+        rows = {}
+        content = self._read(entry)
+        if content is not None:
+            for filename, fingerprint, vector in zip(*content):
+                rows[str(filename)] = (str(fingerprint), vector)
+        rows.update({f: (file_fingerprint(files[f]), np.ravel(vectors[f])) for f in filenames})
+
+        try:
+            matrix = np.stack([v for _, v in rows.values()])
+        except ValueError:
+            # vectors do not have the same dimensions (ex: stale entry), only the new ones are kept
+            rows = {f: rows[f] for f in filenames}
+            try:
+                matrix = np.stack([v for _, v in rows.values()])
+            except ValueError:
+                # not cacheable
+                return
+
+        # temporary file must not match the entries (*.npz) to be safe from a concurrent eviction
+        tmp_file = entry.with_name(f"{entry.name}.tmp")
+        with tmp_file.open('wb') as fp:
+            np.savez(
+                fp,
+                filenames=np.array(list(rows.keys())),
+                fingerprints=np.array([fingerprint for fingerprint, _ in rows.values()]),
+                matrix=matrix
+            )
+        os.replace(tmp_file, entry)
+        self.evict()
+
+    @property
+    def size(self) -> int:
+        """ Total size of the cache (in bytes) """
+        return sum(f.stat().st_size for f in self.location.glob('*.npz'))
+
+    def evict(self):
+        """ Delete least recently used entries until cache fits in max_size """
+        evict_lru(self.location, self.max_size, pattern='*.npz')
+
+    def clear(self):
+        """ Delete all entries """
+        for entry in self.location.glob('*.npz'):
+            entry.unlink(missing_ok=True)
+
+
+class SemanticManifest:
+    """ State of the last evaluation of a semantic subset
+
+    The manifest stores the fingerprint of each embedding file and the score of each
+    pair, along with a key describing the evaluation (parameters & gold files). It allows
+    a new evaluation to only recompute the pairs affected by files that have changed.
+    """
+
+    def __init__(self, key: str, fingerprints: Dict[str, str], scores: np.ndarray):
+        self.key = key
+        self.fingerprints = fingerprints
+        self.scores = scores
+
+    @classmethod
+    def load(cls, location: Path) -> Optional["SemanticManifest"]:
+        """ Load a manifest file (None if missing or unreadable) """
+        if not location.is_file():
+            return None
+
+        try:
+            with np.load(location, allow_pickle=False) as data:
+                return cls(
+                    key=str(data['key']),
+                    fingerprints=dict(zip(data['filenames'].tolist(), data['fingerprints'].tolist())),
+                    scores=data['scores']
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, location: Path):
+        """ Write manifest to a file """
+        tmp_file = location.with_suffix('.tmp.npz')
+        np.savez(
+            tmp_file,
+            key=np.array(self.key),
+            filenames=np.array(list(self.fingerprints.keys()), dtype=str),
+            fingerprints=np.array(list(self.fingerprints.values()), dtype=str),
+            scores=self.scores
+        )
+        os.replace(tmp_file, location)
+
+    def changed_files(self, fingerprints: Dict[str, str]) -> Set[str]:
+        """ List files that were added, removed or modified since the manifest was written """
+        return {
+            f for f in set(fingerprints.keys()) | set(self.fingerprints.keys())
+            if fingerprints.get(f, None) != self.fingerprints.get(f, None)
+        }
@@ -0,0 +1,97 @@
+""" Vectorized grouped Spearman correlation (with bootstrap confidence intervals) """
+from typing import Optional, Tuple
+
+import numpy as np
+
+# max number of resampled values ranked at once during bootstrap
+BOOTSTRAP_CHUNK_SIZE = 4 * 1024 * 1024
+# seed of the bootstrap resampling (makes score files reproducible)
+BOOTSTRAP_SEED = 0
+
+
+def grouped_rank(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """ Rank values inside each group (1-based, ties get the average of their ranks)
+
+    All groups are ranked at once using a single sort on (group, value).
+    """
+    n = len(values)
+    order = np.lexsort((values, groups))
+    v, g = values[order], groups[order]
+
+    # position of each value inside its group
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+    positions = np.arange(n) - group_start + 1
+
+    # average position of each run of tied values
+    new_run = new_group | np.r_[True, v[1:] != v[:-1]]
+    run_id = np.cumsum(new_run) - 1
+    run_rank = np.bincount(run_id, weights=positions) / np.bincount(run_id)
+
+    ranks = np.empty(n, dtype=np.float64)
+    ranks[order] = run_rank[run_id]
+    return ranks
+
+
+def grouped_pearson(x: np.ndarray, y: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """ Pearson correlation of x & y inside each group (nan if a group contains nan or is constant) """
+    counts = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dx = x - (np.bincount(groups, weights=x, minlength=n_groups) / counts)[groups]
+        dy = y - (np.bincount(groups, weights=y, minlength=n_groups) / counts)[groups]
+        sxy = np.bincount(groups, weights=dx * dy, minlength=n_groups)
+        sxx = np.bincount(groups, weights=dx * dx, minlength=n_groups)
+        syy = np.bincount(groups, weights=dy * dy, minlength=n_groups)
+        return sxy / np.sqrt(sxx * syy)
+
+
+def grouped_spearman(x: np.ndarray, y: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """ Spearman correlation of x & y inside each group """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    res = grouped_pearson(grouped_rank(x, groups), grouped_rank(y, groups), groups, n_groups)
+
+    # nan values propagate to the correlation of their group
+    has_nan = np.bincount(groups, weights=np.isnan(x) | np.isnan(y), minlength=n_groups) > 0
+    res[has_nan] = np.nan
+    return res
+
+
+def bootstrap_spearman(x: np.ndarray, y: np.ndarray, groups: np.ndarray, n_groups: int,
+                       n_resamples: int, seed: Optional[int] = BOOTSTRAP_SEED) -> np.ndarray:
+    """ Spearman correlations of bootstrap resamples of each group
+
+    Each resample draws (with replacement) as many pairs as the group contains. Resamples
+    are processed as one array of (resample, group) sub-groups, by chunks of limited size.
+
+    Returns:
+        a (n_resamples, n_groups) array of correlations
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    # sort by group so that each group is a contiguous block
+    order = np.argsort(groups, kind='stable')
+    x, y, groups = x[order], y[order], groups[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    n = len(x)
+
+    out = np.empty((n_resamples, n_groups), dtype=np.float64)
+    chunk = max(1, BOOTSTRAP_CHUNK_SIZE // max(1, n))
+    for b_start in range(0, n_resamples, chunk):
+        b = min(chunk, n_resamples - b_start)
+        # draw an index inside the group of each element, for each resample
+        indices = starts[groups] + np.floor(rng.random((b, n)) * counts[groups]).astype(np.int64)
+        sub_groups = (np.arange(b)[:, None] * n_groups + groups[None, :]).ravel()
+        out[b_start:b_start + b] = grouped_spearman(
+            x[indices].ravel(), y[indices].ravel(), sub_groups, b * n_groups
+        ).reshape(b, n_groups)
+    return out
+
+
+def confidence_interval(samples: np.ndarray, confidence: float) -> Tuple[np.ndarray, np.ndarray]:
+    """ Percentile confidence interval of bootstrap samples (computed on axis 0) """
+    alpha = (1 - confidence) / 2
+    with np.errstate(invalid='ignore'):
+        low, high = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return low, high
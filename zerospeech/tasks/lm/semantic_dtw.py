@@ -0,0 +1,207 @@
+""" Frame-level (DTW) distance engine used by the semantic task when pooling is off """
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import scipy.spatial
+
+from .semantic_engine import SemanticDistanceEngine
+
+# max number of cells of the (batch, n, m) cost tensors of a single DTW batch
+DTW_BATCH_CELLS = 4 * 1024 * 1024
+
+
+class FrameEmbeddings:
+    """ Frames of unpooled embeddings concatenated into a single matrix
+
+    The frames of each file are found using a filename -> row index, and the
+    offset & length (in frames) of each row.
+    """
+
+    def __init__(self, filenames: Sequence[str], frames: np.ndarray, lengths: Sequence[int]):
+        if len(filenames) != len(lengths) or frames.shape[0] != int(np.sum(lengths)):
+            raise ValueError('frames matrix does not match the given lengths')
+        self.filenames: List[str] = list(filenames)
+        self.frames: np.ndarray = frames
+        self.lengths: np.ndarray = np.asarray(lengths, dtype=np.int64)
+        self.offsets: np.ndarray = np.concatenate([[0], np.cumsum(self.lengths)[:-1]]).astype(np.int64)
+        self.index: Dict[str, int] = {f: i for i, f in enumerate(self.filenames)}
+
+    @classmethod
+    def from_arrays(cls, items: Iterable[Tuple[str, Optional[np.ndarray]]]) -> "FrameEmbeddings":
+        """ Build from (filename, frames) tuples, None arrays are skipped """
+        filenames, arrays, seen = [], [], set()
+        for filename, array in items:
+            if array is None or filename in seen:
+                continue
+            seen.add(filename)
+            filenames.append(filename)
+            arrays.append(np.atleast_2d(array))
+
+        if len(arrays) == 0:
+            return cls([], np.empty((0, 0)), [])
+        return cls(filenames, np.concatenate(arrays), [a.shape[0] for a in arrays])
+
+    @property
+    def dim(self) -> int:
+        return self.frames.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.index
+
+    def get(self, row: int) -> np.ndarray:
+        """ Get the frames of a row """
+        return self.frames[self.offsets[row]:self.offsets[row] + self.lengths[row]]
+
+    def rows(self, filenames: Iterable[str]) -> np.ndarray:
+        """ Get the row indices of the given filenames """
+        try:
+            return np.fromiter((self.index[f] for f in filenames), dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f'no embedding found for file {e}') from None
+
+
+def _pad(arrays: List[np.ndarray]) -> np.ndarray:
+    """ Stack arrays of different lengths into a zero padded (batch, max_len, dim) tensor """
+    out = np.zeros((len(arrays), max(a.shape[0] for a in arrays), arrays[0].shape[1]), dtype=np.float64)
+    for i, a in enumerate(arrays):
+        out[i, :a.shape[0]] = a
+    return out
+
+
+def batch_frame_distances(xs: List[np.ndarray], ys: List[np.ndarray], metric: str) -> np.ndarray:
+    """ Compute the (batch, n, m) frame distance tensor of each (xs[b], ys[b]) pair
+
+    Cosine & euclidean distances are computed using batched matrix products, other
+    metrics use one scipy cdist per pair. Padded cells are left to inf.
+    """
+    n_max, m_max = max(x.shape[0] for x in xs), max(y.shape[0] for y in ys)
+
+    if metric in ('cosine', 'euclidean', 'sqeuclidean'):
+        x, y = _pad(xs), _pad(ys)
+        if metric == 'cosine':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = x / np.linalg.norm(x, axis=2, keepdims=True)
+                y = y / np.linalg.norm(y, axis=2, keepdims=True)
+            cost = 1.0 - np.matmul(x, y.transpose(0, 2, 1))
+        else:
+            cost = (
+                np.einsum('bnd,bnd->bn', x, x)[:, :, None]
+                + np.einsum('bmd,bmd->bm', y, y)[:, None, :]
+                - 2.0 * np.matmul(x, y.transpose(0, 2, 1))
+            )
+            np.maximum(cost, 0.0, out=cost)
+            if metric == 'euclidean':
+                np.sqrt(cost, out=cost)
+    else:
+        cost = np.full((len(xs), n_max, m_max), np.inf, dtype=np.float64)
+        for b, (x, y) in enumerate(zip(xs, ys)):
+            cost[b, :x.shape[0], :y.shape[0]] = scipy.spatial.distance.cdist(  # noqa: bad __init__ for scipy.spatial ??
+                x, y, metric=metric)
+
+    # mask padded cells
+    n = np.array([x.shape[0] for x in xs])[:, None, None]
+    m = np.array([y.shape[0] for y in ys])[:, None, None]
+    cost[(np.arange(n_max)[None, :, None] >= n) | (np.arange(m_max)[None, None, :] >= m)] = np.inf
+    return cost
+
+
+def batch_dtw(cost: np.ndarray, n: np.ndarray, m: np.ndarray, band: float = 1.0) -> np.ndarray:
+    """ Band limited DTW of a batch of cost matrices
+
+    The dynamic programming is vectorized over the batch and over the cells of
+    each anti-diagonal. Cell (i, j) of a (n, m) matrix is in the band if
+    |i/n - j/m| <= band (the band is widened to always contain a path).
+
+    Returns:
+        the cost of the best path of each matrix normalized by its length
+    """
+    batch, n_max, m_max = cost.shape
+    cost = cost.copy()
+
+    if band < 1.0:
+        i = np.arange(n_max)[None, :, None]
+        j = np.arange(m_max)[None, None, :]
+        nb, mb = n[:, None, None], m[:, None, None]
+        radius = np.maximum(band * nb * mb, np.maximum(nb, mb))
+        cost[np.abs(i * mb - j * nb) > radius] = np.inf
+
+    acc = np.full((batch, n_max + 1, m_max + 1), np.inf, dtype=np.float64)
+    acc[:, 0, 0] = 0
+    length = np.zeros((batch, n_max + 1, m_max + 1), dtype=np.int64)
+
+    for k in range(2, n_max + m_max + 1):
+        i = np.arange(max(1, k - m_max), min(n_max, k - 1) + 1)
+        j = k - i
+        candidates = np.stack([acc[:, i - 1, j - 1], acc[:, i - 1, j], acc[:, i, j - 1]])
+        best = np.argmin(candidates, axis=0)[None]
+        acc[:, i, j] = cost[:, i - 1, j - 1] + np.take_along_axis(candidates, best, axis=0)[0]
+
+        lengths = np.stack([length[:, i - 1, j - 1], length[:, i - 1, j], length[:, i, j - 1]])
+        length[:, i, j] = np.take_along_axis(lengths, best, axis=0)[0] + 1
+
+    rows = np.arange(batch)
+    return acc[rows, n, m] / length[rows, n, m]
+
+
+def dtw_distances(xs: List[np.ndarray], ys: List[np.ndarray], metric: str, band: float) -> np.ndarray:
+    """ Compute the DTW distance of each (xs[b], ys[b]) pair """
+    n = np.array([x.shape[0] for x in xs])
+    m = np.array([y.shape[0] for y in ys])
+    return batch_dtw(batch_frame_distances(xs, ys, metric), n, m, band=band)
+
+
+class FrameDistanceEngine(SemanticDistanceEngine):
+    """ Computes the DTW distances of all the pairs of a semantic subset
+
+    Token pairs are sorted by length & split in batches of similar sizes, each batch
+    is computed as a single vectorized DTW in a pool of worker processes.
+    """
+
+    def __init__(self, embeddings: FrameEmbeddings, metric: str, *, band: float = 1.0, n_jobs: int = 1):
+        super().__init__(embeddings, metric)  # noqa: same row index interface as PooledEmbeddings
+        self.band = band
+        self.n_jobs = n_jobs
+
+    def batches(self, rows_1: np.ndarray, rows_2: np.ndarray) -> List[np.ndarray]:
+        """ Split token pairs (sorted by length) into batches of limited size """
+        lengths_1 = self.embeddings.lengths[rows_1]
+        lengths_2 = self.embeddings.lengths[rows_2]
+        order = np.lexsort((lengths_2, lengths_1))
+
+        batches, start = [], 0
+        while start < len(order):
+            end = start + 1
+            # order is sorted by lengths_1, max of lengths_2 is tracked while growing the batch
+            max_2 = lengths_2[order[start]]
+            while end < len(order):
+                max_2 = max(max_2, lengths_2[order[end]])
+                if (end - start + 1) * lengths_1[order[end]] * max_2 > DTW_BATCH_CELLS:
+                    break
+                end += 1
+            batches.append(order[start:end])
+            start = end
+        return batches
+
+    def distances(self, rows_1: np.ndarray, rows_2: np.ndarray, metric: Optional[str] = None) -> np.ndarray:
+        """ Compute the DTW distance of each (rows_1[i], rows_2[i]) token pair """
+        metric = metric or self.metric
+        embeddings: FrameEmbeddings = self.embeddings  # noqa: type is set in constructor
+        batches = self.batches(rows_1, rows_2)
+
+        res = joblib.Parallel(n_jobs=self.n_jobs)(
+            joblib.delayed(dtw_distances)(
+                [embeddings.get(r) for r in rows_1[batch]],
+                [embeddings.get(r) for r in rows_2[batch]],
+                metric, self.band
+            )
+            for batch in batches
+        )
+
+        out = np.empty(len(rows_1), dtype=np.float64)
+        for batch, dist in zip(batches, res):
+            out[batch] = dist
+        return out
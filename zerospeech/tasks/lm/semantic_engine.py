@@ -0,0 +1,347 @@
+""" Vectorized distance engine used by the semantic task """
+import math
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.spatial
+
+from zerospeech.data_loaders import load_numpy_array, load_pooled_matrix
+from zerospeech.generics import FileItem
+from .params import SemanticPooling
+
+# memory budget (in bytes) of the gathered token arrays of a single chunk
+CHUNK_BYTES = 64 * 1024 * 1024
+# max number of token pairs per chunk when falling back to scipy cdist
+FALLBACK_CHUNK_SIZE = 2048
+
+TokenPairs = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _sqeuclidean(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    diff = x - y
+    return np.einsum('ij,ij->i', diff, diff)
+
+
+def _euclidean(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.sqrt(_sqeuclidean(x, y))
+
+
+def _cosine(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    dot = np.einsum('ij,ij->i', x, y)
+    norms = np.sqrt(np.einsum('ij,ij->i', x, x)) * np.sqrt(np.einsum('ij,ij->i', y, y))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1.0 - dot / norms
+
+
+def _correlation(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return _cosine(x - x.mean(axis=1, keepdims=True), y - y.mean(axis=1, keepdims=True))
+
+
+def _cityblock(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.abs(x - y).sum(axis=1)
+
+
+def _chebyshev(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.abs(x - y).max(axis=1)
+
+
+def _braycurtis(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(x - y).sum(axis=1) / np.abs(x + y).sum(axis=1)
+
+
+def _canberra(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    num = np.abs(x - y)
+    den = np.abs(x) + np.abs(y)
+    # scipy ignores the 0/0 terms
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / den, 0.0).sum(axis=1)
+
+
+# row-wise implementations of the scipy.spatial.distance.cdist metrics (with default arguments)
+PAIRED_METRICS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    'euclidean': _euclidean,
+    'minkowski': _euclidean,  # cdist uses p=2 by default
+    'sqeuclidean': _sqeuclidean,
+    'cosine': _cosine,
+    'correlation': _correlation,
+    'cityblock': _cityblock,
+    'chebyshev': _chebyshev,
+    'braycurtis': _braycurtis,
+    'canberra': _canberra,
+}
+
+
+def paired_distances(x: np.ndarray, y: np.ndarray, metric: str) -> np.ndarray:
+    """ Compute the distance between each row of x and the corresponding row of y """
+    fn = PAIRED_METRICS.get(metric, None)
+    if fn is not None:
+        return fn(x, y)
+    # no vectorized implementation: use scipy on each row pair
+    return np.fromiter(
+        (scipy.spatial.distance.cdist(a[None, :], b[None, :], metric=metric)[0, 0]  # noqa: scipy __init__
+         for a, b in zip(x, y)),
+        dtype=np.float64, count=len(x)
+    )
+
+
+class PooledEmbeddings:
+    """ Contiguous matrix of pooled embeddings with a filename -> row index """
+
+    def __init__(self, filenames: Sequence[str], matrix: np.ndarray):
+        if matrix.ndim != 2 or matrix.shape[0] != len(filenames):
+            raise ValueError(f'embedding matrix of shape {matrix.shape} does not match '
+                             f'the {len(filenames)} given filenames')
+        self.filenames: List[str] = list(filenames)
+        self.matrix: np.ndarray = np.ascontiguousarray(matrix)
+        self.index: Dict[str, int] = {f: i for i, f in enumerate(self.filenames)}
+
+    @classmethod
+    def from_vectors(cls, items: Iterable[Tuple[str, Optional[np.ndarray]]],
+                     dtype: Optional[np.dtype] = None) -> "PooledEmbeddings":
+        """ Build from (filename, pooled_vector) tuples, None vectors are skipped
+
+        dtype: dtype of the matrix (default: the common dtype of the vectors)
+        """
+        filenames, vectors, seen = [], [], set()
+        for filename, vector in items:
+            if vector is None or filename in seen:
+                continue
+            seen.add(filename)
+            filenames.append(filename)
+            vectors.append(np.ravel(vector))
+
+        if len(vectors) == 0:
+            return cls([], np.empty((0, 0), dtype=dtype or np.float64))
+        matrix = np.stack(vectors)
+        return cls(filenames, matrix if dtype is None else matrix.astype(dtype, copy=False))
+
+    @classmethod
+    def load(cls, file_item: Union[FileItem, Path], mmap_mode: Optional[str] = None) -> "PooledEmbeddings":
+        """ Load from a pre-pooled matrix file & its filename index """
+        filenames, matrix = load_pooled_matrix(file_item, mmap_mode=mmap_mode)
+        return cls(filenames, matrix)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.index
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """ Iterate over (filename, pooled_vector) """
+        return zip(self.filenames, self.matrix)
+
+    def rows(self, filenames: Iterable[str]) -> np.ndarray:
+        """ Get the row indices of the given filenames """
+        try:
+            return np.fromiter((self.index[f] for f in filenames), dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f'no pooled embedding found for file {e}') from None
+
+
+class ChunkTiming(NamedTuple):
+    """ Execution time of a chunk of pooled files """
+    chunk: int
+    n_files: int
+    seconds: float
+
+
+def split_chunks(files: List[Any], n_workers: int, chunks_per_worker: int = 4) -> List[List[Any]]:
+    """ Split a file list into chunks_per_worker chunks per worker (a single chunk if there is one worker) """
+    if len(files) == 0:
+        return []
+    n_chunks = 1 if n_workers == 1 else n_workers * chunks_per_worker
+    size = math.ceil(len(files) / n_chunks)
+    return [files[i:i + size] for i in range(0, len(files), size)]
+
+
+def load_chunk(files: List[Path], memory_map: bool = False) -> List[np.ndarray]:
+    """ Load the (unpooled) frames of a list of embedding files """
+    mmap_mode = 'r' if memory_map else None
+    return [SemanticPooling.off.fn(load_numpy_array(f, mmap_mode=mmap_mode)) for f in files]
+
+
+def pool_chunk(files: List[Path], poolings: Sequence[SemanticPooling], memory_map: bool = False,
+               dtype: Optional[np.dtype] = None) -> Tuple[List[np.ndarray], float]:
+    """ Load & pool a list of embedding files into one (n_files, dim) block per pooling method
+
+    Each file is only loaded once whatever the number of pooling methods, pooled vectors keep
+    the dtype of the embeddings unless a dtype is given.
+
+    Returns:
+        the pooled blocks (in the order of poolings) and the time it took to compute them (in seconds)
+    """
+    start = time.perf_counter()
+    mmap_mode, pooling_fns = None, [p.fn for p in poolings]
+    if memory_map:
+        mmap_mode, pooling_fns = 'r', [p.streaming_fn() for p in poolings]
+
+    rows = [[] for _ in poolings]
+    for f in files:
+        data = load_numpy_array(f, mmap_mode=mmap_mode)
+        for i, pooling_fn in enumerate(pooling_fns):
+            vector = np.ravel(pooling_fn(data))
+            rows[i].append(vector if dtype is None else vector.astype(dtype, copy=False))
+
+    return [np.stack(r) for r in rows], time.perf_counter() - start
+
+
+class BatchedPooling:
+    """ Pools embedding files by chunks using a pool of worker processes
+
+    The file list is split into chunks_per_worker chunks per worker, each worker
+    loads & pools a chunk and returns a single block per pooling method, blocks are
+    then assembled into the pooled matrices. The execution time of each chunk is
+    kept in timings.
+
+    Pooled matrices keep the dtype of the embeddings, a dtype (ex: float32) can be given
+    to reduce their memory (scores of float64 embeddings may then change slightly).
+    """
+
+    def __init__(self, *poolings: SemanticPooling, n_jobs: int = 1, memory_map: bool = False,
+                 dtype: Optional[np.dtype] = None, chunks_per_worker: int = 4):
+        if SemanticPooling.off in poolings:
+            raise ValueError('unpooled embeddings cannot be assembled into a matrix')
+        self.poolings = poolings
+        self.n_jobs = n_jobs
+        self.memory_map = memory_map
+        self.dtype = dtype
+        self.chunks_per_worker = chunks_per_worker
+        self.timings: List[ChunkTiming] = []
+
+    @property
+    def n_workers(self) -> int:
+        return joblib.effective_n_jobs(self.n_jobs)
+
+    def chunks(self, files: List[Path]) -> List[List[Path]]:
+        """ Split the file list into chunks sized to the number of workers """
+        return split_chunks(files, self.n_workers, self.chunks_per_worker)
+
+    def run(self, files: Dict[str, Path]) -> Dict[SemanticPooling, PooledEmbeddings]:
+        """ Pool the given files (filename -> path) with each pooling method """
+        filenames = list(files.keys())
+        chunks = self.chunks([files[f] for f in filenames])
+
+        res = joblib.Parallel(n_jobs=self.n_jobs)(
+            joblib.delayed(pool_chunk)(chunk, self.poolings, self.memory_map, self.dtype)
+            for chunk in chunks
+        )
+        self.timings = [
+            ChunkTiming(chunk=i, n_files=len(chunk), seconds=seconds)
+            for i, (chunk, (_, seconds)) in enumerate(zip(chunks, res))
+        ]
+
+        if len(res) == 0:
+            return {
+                pooling: PooledEmbeddings([], np.empty((0, 0), dtype=self.dtype or np.float64))
+                for pooling in self.poolings
+            }
+        return {
+            pooling: PooledEmbeddings(filenames, np.concatenate([blocks[i] for blocks, _ in res]))
+            for i, pooling in enumerate(self.poolings)
+        }
+
+
+class SemanticDistanceEngine:
+    """ Computes the distances of all the pairs of a semantic subset in batches
+
+    Each pair of words is expanded into the list of its (token_1, token_2) pairs:
+
+    - librispeech: all the combinations of the tokens of the two words
+    - synthetic: all the combinations of tokens sharing the same voice
+
+    The distances of all the token pairs of a type are computed in a few vectorized
+    calls and are then averaged per word pair (in a canonical order, so the score of a
+    pair does not depend on the order of its words).
+    """
+
+    def __init__(self, embeddings: PooledEmbeddings, metric: str):
+        self.embeddings = embeddings
+        self.metric = metric
+
+    def token_pairs(self, pairs_df: pd.DataFrame, gold_df: pd.DataFrame, _type: str) -> TokenPairs:
+        """ Build the (pair_position, row_1, row_2) arrays of a given type """
+        gold = gold_df[gold_df['type'] == _type]
+        on = ['word', 'voice'] if _type == 'synthetic' else ['word']
+        tokens = gold[[*on, 'filename']].assign(row=self.embeddings.rows(gold['filename']))
+
+        pairs = pairs_df[['type', 'word_1', 'word_2']].reset_index(drop=True)
+        pairs = pairs[pairs['type'] == _type].rename_axis('position').reset_index()
+
+        tokens_1 = pairs[['position', 'word_1']].merge(
+            tokens, left_on='word_1', right_on='word')[['position', *on[1:], 'row']]
+        tokens_2 = pairs[['position', 'word_2']].merge(
+            tokens, left_on='word_2', right_on='word')[['position', *on[1:], 'row']]
+        # cross product of tokens inside each pair (within voice for synthetic)
+        merged = tokens_1.merge(tokens_2, on=['position', *on[1:]], suffixes=('_1', '_2'))
+
+        if not np.isin(pairs['position'], merged['position']).all():
+            raise ValueError(f'some {_type} pairs have no tokens in gold')
+
+        # canonical order (lowest row first, sorted by rows inside each pair): the score of a pair
+        # does not depend on the order of its words (w1/w2 & w2/w1 get the exact same score)
+        positions = merged['position'].to_numpy(dtype=np.int64)
+        rows_1 = merged['row_1'].to_numpy(dtype=np.int64)
+        rows_2 = merged['row_2'].to_numpy(dtype=np.int64)
+        rows_1, rows_2 = np.minimum(rows_1, rows_2), np.maximum(rows_1, rows_2)
+        order = np.lexsort((rows_2, rows_1, positions))
+        return positions[order], rows_1[order], rows_2[order]
+
+    def distances(self, rows_1: np.ndarray, rows_2: np.ndarray, metric: Optional[str] = None) -> np.ndarray:
+        """ Compute the distance of each (rows_1[i], rows_2[i]) embedding pair """
+        metric = metric or self.metric
+        matrix = self.embeddings.matrix
+        out = np.empty(len(rows_1), dtype=np.float64)
+
+        if metric not in PAIRED_METRICS:
+            # compute a cdist on the unique tokens of each chunk & gather the needed cells
+            for start in range(0, len(rows_1), FALLBACK_CHUNK_SIZE):
+                end = start + FALLBACK_CHUNK_SIZE
+                u1, i1 = np.unique(rows_1[start:end], return_inverse=True)
+                u2, i2 = np.unique(rows_2[start:end], return_inverse=True)
+                out[start:end] = scipy.spatial.distance.cdist(  # noqa: bad __init__ for scipy.spatial ??
+                    matrix[u1], matrix[u2], metric=metric)[i1, i2]
+            return out
+
+        chunk_size = max(1, CHUNK_BYTES // max(1, 2 * self.embeddings.dim * 8))
+        for start in range(0, len(rows_1), chunk_size):
+            end = start + chunk_size
+            out[start:end] = paired_distances(
+                matrix[rows_1[start:end]].astype(np.float64, copy=False),
+                matrix[rows_2[start:end]].astype(np.float64, copy=False),
+                metric=metric
+            )
+        return out
+
+    def compute_many(self, pairs_df: pd.DataFrame, gold_df: pd.DataFrame,
+                     metrics: Sequence[str]) -> Dict[str, np.ndarray]:
+        """ Compute the scores of each row of pairs_df for several metrics
+
+        The token pairs are only built once for all the metrics.
+        """
+        scores = {m: np.full(len(pairs_df), np.nan, dtype=np.float64) for m in metrics}
+        for _type in ('librispeech', 'synthetic'):
+            if not (pairs_df['type'] == _type).any():
+                continue
+            positions, rows_1, rows_2 = self.token_pairs(pairs_df, gold_df, _type)
+            counts = np.bincount(positions, minlength=len(pairs_df))
+            mask = counts > 0
+
+            for metric in metrics:
+                dist = self.distances(rows_1, rows_2, metric=metric)
+                sums = np.bincount(positions, weights=dist, minlength=len(pairs_df))
+                scores[metric][mask] = sums[mask] / counts[mask]
+        return scores
+
+    def compute(self, pairs_df: pd.DataFrame, gold_df: pd.DataFrame) -> np.ndarray:
+        """ Compute the score (mean token distance) of each row of pairs_df """
+        return self.compute_many(pairs_df, gold_df, [self.metric])[self.metric]
@@ -1,11 +1,14 @@
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING, Union
 
 import pandas as pd
 
-from zerospeech.data_loaders import load_dataframe
+from zerospeech.data_loaders import load_score_file
 from zerospeech.generics import FileItem
 from zerospeech.tasks import Task
-from .params import SyntacticParams
+from .gold_pairs import GoldPairs
+from .pair_scoring import score_by_pair
+from .quick import QuickSample, draw_sample, stratified_estimate, unit_key
+from .params import SyntacticParams, QUICK_FILENAME
 
 if TYPE_CHECKING:
     from zerospeech.submissions.sLM21 import SLM21Submission
@@ -19,28 +22,18 @@ class SyntacticTask(Task):
     _name = "syntactic"
     sets = ('dev', 'test')
     result_filenames = default_params.result_filenames
+    # quick mode: evaluate a stratified sample (by type) of this fraction of the pairs
+    quick: Optional[float] = None
 
     @staticmethod
     def syntactic_by_pair(data: pd.DataFrame) -> pd.DataFrame:
         """Returns a data frame with the scores by (sentence, non sentence) pair"""
         # compute the score for each pair in an additional 'score' column, then
-        # delete the 'score word' and 'score non word' columns that become useless
-        score = data.loc[:, ['score sentence', 'score non sentence']].to_numpy()
-        data['score'] = (
-                0.5 * (score[:, 0] == score[:, 1])
-                + (score[:, 0] > score[:, 1]))
-        data.drop(columns=['score sentence', 'score non sentence'], inplace=True)
-
-        # finally get the mean score across voices for all pairs
-        score = data.groupby(['type', 'subtype', 'id']).apply(lambda x: (
-            x.iat[0, 2],  # type
-            x.iat[0, 3],  # subtype
-            x.iat[0, 4],  # sentence
-            x.iat[0, 5],  # non sentence
-            x['score'].mean()))
-        return pd.DataFrame(
-            score.to_list(),
-            columns=['type', 'subtype', 'sentence', 'non sentence', 'score'])
+        # get the mean score across voices for all pairs
+        return score_by_pair(
+            data, score_columns=['score sentence', 'score non sentence'], by=['type', 'subtype', 'id'],
+            columns=['type', 'subtype', 'sentence', 'non sentence']
+        )
 
     @staticmethod
     def syntactic_by_type(data: pd.DataFrame) -> pd.DataFrame:
@@ -48,7 +41,13 @@ class SyntacticTask(Task):
         return data.score.groupby([data['type']]).agg(
             n='count', score='mean', std='std').reset_index()
 
-    def run_syntactic_comparison(self, gold: FileItem, sub_file: FileItem):
+    @staticmethod
+    def quick_sample(gold_pairs: GoldPairs, fraction: float) -> QuickSample:
+        """ Sample (type, subtype, id) pairs stratified by type """
+        units = unit_key(gold_pairs.columns['type'], gold_pairs.columns['subtype'], gold_pairs.columns['id'])
+        return draw_sample(units, gold_pairs.columns['type'], fraction)
+
+    def run_syntactic_comparison(self, gold: FileItem, sub_file: Union[FileItem, pd.DataFrame]):
         """ This function creates a syntactic comparison based on inputs
 
         data_formatting:
@@ -57,56 +56,43 @@ class SyntacticTask(Task):
         'sentence', 'score sentence', 'non sentence', 'score non sentence'.
 
         """
-        gold_df = load_dataframe(gold, header=0, index_col='filename')
-        sub_df = load_dataframe(sub_file, sep=' ', header=None,
-                                names=['filename', 'score'], index_col='filename')
-
-        # merge the gold and score using filenames, then remove the columns
-        # 'phones' and 'filename' as we don't use them for evaluation
-        data = pd.concat([gold_df, sub_df], axis=1)
-        data.reset_index(drop=True, inplace=True)
-
-        # going from a word per line to a pair (word, non word) per line
-        data = pd.concat([
-            data.loc[data['correct'] == 1].reset_index().rename(
-                lambda x: 's_' + x, axis=1),
-            data.loc[data['correct'] == 0].reset_index().rename(
-                lambda x: 'ns_' + x, axis=1)], axis=1)
-        data.drop(
-            ['s_index', 'ns_index', 'ns_voice', 'ns_type', 'ns_subtype',
-             's_correct', 'ns_correct', 'ns_id'],
-            axis=1, inplace=True)
-
-        data.rename(
-            {'s_id': 'id',
-             's_voice': 'voice',
-             's_type': 'type',
-             's_subtype': 'subtype',
-             's_transcription': 'sentence',
-             'ns_transcription': 'non sentence',
-             's_score': 'score sentence',
-             'ns_score': 'score non sentence'},
-            axis=1, inplace=True)
+        # (sentence, non sentence) pairs are built once from the gold & stored in a compiled
+        # artifact, the submission scores are then gathered on these pairs
+        gold_pairs = GoldPairs.load(gold, kind='sentence')
+        sample = None
+        if self.quick is not None:
+            sample = self.quick_sample(gold_pairs, self.quick)
+            gold_pairs = gold_pairs.subset(sample.mask)
+        sub_df = sub_file
+        if isinstance(sub_file, FileItem):
+            sub_df = load_score_file(sub_file)
+        data = gold_pairs.gather(sub_df)
 
         by_pair = self.syntactic_by_pair(data)
+
+        estimate = None
+        if sample is not None:
+            # estimate of the score on all the pairs (by_pair has one line per pair)
+            estimate = stratified_estimate(by_pair['score'], by_pair['type'], sample.population)
+
         by_type = self.syntactic_by_type(by_pair)
 
         # remove (type, subtype) from by_pair data since by_type is complete
         by_pair.drop(['type', 'subtype'], axis=1, inplace=True)
 
-        return by_pair, by_type
+        return by_pair, by_type, estimate
 
     def eval(self, submission: "SLM21Submission", dataset: "SLM21Dataset"):
         """ Executes syntactic comparison on required sets and writes results to score_dir """
         output_dir = submission.score_dir
-        self.sets = submission.sets
+        self.sets = self.selected_sets(submission.sets)
 
         if 'dev' in self.sets:
             gold_file = dataset.index.subsets.syntactic_dev.items.gold
             sub_file = submission.items.syntactic_dev
 
             with self.console.status('Running syntactic_dev evaluation....', spinner="aesthetic"):
-                by_pair, by_type = self.run_syntactic_comparison(gold_file, sub_file)
+                by_pair, by_type, estimate = self.run_syntactic_comparison(gold_file, sub_file)
 
             filename = output_dir / f"{self.result_filenames['dev']['by_pair']}"
             self.console.print(f":pencil: writing {self.result_filenames['dev']['by_pair']}",
@@ -118,12 +104,18 @@ class SyntacticTask(Task):
                                style="underline yellow4")
             by_type.to_csv(filename, index=False, float_format='%.4f')
 
+            if estimate is not None:
+                filename = output_dir / QUICK_FILENAME.format(self.name, 'dev')
+                self.console.print(f":pencil: writing {filename.name}",
+                                   style="underline yellow4")
+                estimate.to_csv(filename, index=False, float_format='%.4f')
+
         if 'test' in self.sets:
             gold_file = dataset.index.subsets.syntactic_test.items.gold
             sub_file = submission.items.syntactic_test
 
             with self.console.status('Running syntactic_test evaluation....', spinner="aesthetic"):
-                by_pair, by_type = self.run_syntactic_comparison(gold_file, sub_file)
+                by_pair, by_type, estimate = self.run_syntactic_comparison(gold_file, sub_file)
 
             filename = output_dir / f"{self.result_filenames['test']['by_pair']}"
             self.console.print(f":pencil: writing {self.result_filenames['test']['by_pair']}",
@@ -134,3 +126,9 @@ class SyntacticTask(Task):
             self.console.print(f":pencil: writing {self.result_filenames['test']['by_type']}",
                                style="underline yellow4")
             by_type.to_csv(filename, index=False, float_format='%.4f')
+
+            if estimate is not None:
+                filename = output_dir / QUICK_FILENAME.format(self.name, 'test')
+                self.console.print(f":pencil: writing {filename.name}",
+                                   style="underline yellow4")
+                estimate.to_csv(filename, index=False, float_format='%.4f')
@@ -1,14 +1,18 @@
 import warnings
 from pathlib import Path
-from typing import List, Union, Callable, Any
+from typing import List, Union, Callable, Any, Optional
 
-from zerospeech.data_loaders import load_dataframe, load_numpy_array, FileError
+from zerospeech.data_loaders import (
+    load_dataframe, load_numpy_array, load_packed_features, load_pooled_matrix, load_score_file,
+    load_score_table, score_table_schema, pyarrow, FileError
+)
 from zerospeech.generics import FileItem, FileListItem, FileTypes
 from .base_validators import ValidationError, ValidationOK, ValidationResponse
-from .base_validators import BASE_VALIDATOR_FN_TYPE
+from .base_validators import BASE_VALIDATOR_FN_TYPE, list_checker
 
 return_type = List[ValidationResponse]
 COMPLEX_VALIDATION_FN = Callable[[Any, List[BASE_VALIDATOR_FN_TYPE]], return_type]
+ARRAY_VISITOR_FN_TYPE = Callable[[Path, Any], None]
 
 
 def dataframe_check(
@@ -35,12 +39,71 @@ def dataframe_check(
     return results
 
 
+def score_file_check(
+        item: FileItem,
+        additional_checks: List[BASE_VALIDATOR_FN_TYPE]
+) -> return_type:
+    """ Check validity & apply additional checks to a 'filename score' fileItem """
+    if item.file_type not in FileTypes.dataframe_types():
+        return [ValidationError(f'file type {item.file_type} cannot be converted into a dataframe',
+                                data=item.file)]
+
+    try:
+        df = load_score_file(item)
+    except Exception as e:  # noqa: broad exception is on purpose
+        return [ValidationError(f'{e}', data=item.file)]
+
+    results = [ValidationOK(f"File {item.file} is a valid dataframe !")]
+
+    for fn in additional_checks:
+        results.extend(fn(df))
+
+    return results
+
+
+def score_table_check(item: FileItem, expected: List[str]) -> return_type:
+    """ Check a parquet or arrow IPC 'filename score' fileItem
+
+    Column names & types are checked on the schema, filenames are checked by reading
+    the filename column only (scores are not loaded).
+    """
+    try:
+        schema = score_table_schema(item)
+    except Exception as e:  # noqa: broad exception is on purpose
+        return [ValidationError(f'{e}', data=item.file)]
+
+    if 'filename' not in schema.names or 'score' not in schema.names:
+        return [ValidationError(f"columns are not expected expected: ['filename', 'score'], found: {schema.names}",
+                                data=item.file)]
+
+    results = [ValidationOK(f"File {item.file} is a valid table !")]
+    score_type = schema.field('score').type
+    # integer scores are accepted (cast to float64 when loaded)
+    if not (pyarrow.types.is_floating(score_type) or pyarrow.types.is_integer(score_type)):
+        results.append(ValidationError(f'Column score must be numeric (float or integer), found {score_type}',
+                                       data=item.file))
+
+    try:
+        filenames = load_score_table(item, columns=('filename',)).column('filename').to_pylist()
+    except FileError as e:
+        return [*results, ValidationError(f'{e}', data=item.file)]
+
+    results.extend(list_checker(filenames, expected))
+    return results
+
+
 def numpy_array_check(file_item: Union[FileItem, Path],
-                      additional_checks: List[BASE_VALIDATOR_FN_TYPE]) -> return_type:
-    """ Check validity & apply additional checks to a Numpy fileItem """
+                      additional_checks: List[BASE_VALIDATOR_FN_TYPE],
+                      mmap_mode: Optional[str] = None,
+                      on_load: Optional[ARRAY_VISITOR_FN_TYPE] = None) -> return_type:
+    """ Check validity & apply additional checks to a Numpy fileItem
+
+    mmap_mode: memory-map the array (checks on dtype & shape then only read the file header)
+    on_load: function called with (file, array) once the array is loaded (allows reusing it)
+    """
     warnings.filterwarnings("error")
     try:
-        array = load_numpy_array(file_item)
+        array = load_numpy_array(file_item, mmap_mode=mmap_mode)
     except (FileError, ValueError, UserWarning):
         return [ValidationError('File does not contain a numpy array', data=file_item)]
 
@@ -49,12 +112,16 @@ def numpy_array_check(file_item: Union[FileItem, Path],
     for fn in additional_checks:
         results.extend(fn(array))
 
+    if on_load is not None:
+        on_load(file_item.file if isinstance(file_item, FileItem) else file_item, array)
+
     return results
 
 
 def numpy_array_list_check(
     item: FileListItem, f_list_checks: List[BASE_VALIDATOR_FN_TYPE],
-    additional_checks: List[BASE_VALIDATOR_FN_TYPE]
+    additional_checks: List[BASE_VALIDATOR_FN_TYPE], mmap_mode: Optional[str] = None,
+    on_load: Optional[ARRAY_VISITOR_FN_TYPE] = None
 ) -> return_type:
     """ Check validity & apply additional checks to a list of Numpy fileItems """
     results = []
@@ -64,6 +131,58 @@ def numpy_array_list_check(
         results.extend(r)
 
     for i in item.files_list:
-        results.extend(numpy_array_check(i, additional_checks))
+        results.extend(numpy_array_check(i, additional_checks, mmap_mode=mmap_mode, on_load=on_load))
+
+    return results
+
+
+def pooled_matrix_check(
+    item: FileItem, expected: List[Path], additional_checks: List[BASE_VALIDATOR_FN_TYPE]
+) -> return_type:
+    """ Check validity & apply additional checks to a pooled embedding matrix (and its filename index) """
+    try:
+        filenames, matrix = load_pooled_matrix(item, mmap_mode='r')
+    except (FileError, ValueError, OSError) as e:
+        return [ValidationError(f'{e}', data=item.file)]
+
+    results = [ValidationOK('File contains a pooled embedding matrix !', data=item.file)]
+
+    if len(set(filenames)) != len(filenames):
+        results.append(ValidationError('index of pooled matrix contains duplicate filenames', data=item.file))
+
+    # Verify that all necessary files are indexed
+    results.extend(list_checker(given=filenames, expected=[f.stem for f in expected]))
+
+    for fn in additional_checks:
+        results.extend(fn(matrix))
+
+    return results
+
+
+def packed_features_check(
+    item: FileItem, expected: List[str], additional_checks: List[BASE_VALIDATOR_FN_TYPE]
+) -> return_type:
+    """ Check validity & apply additional checks to packed features (matrix of frames & its index)
+
+    Only the index & the header of the matrix are read (the matrix is memory-mapped).
+    """
+    try:
+        index, matrix = load_packed_features(item, mmap_mode='r')
+    except (FileError, ValueError, OSError, KeyError) as e:
+        return [ValidationError(f'{e}', data=item.file)]
+
+    results = [ValidationOK('File contains packed features !', data=item.file)]
+
+    filenames = index['filename'].tolist()
+    if len(set(filenames)) != len(filenames):
+        results.append(ValidationError('index of packed features contains duplicate filenames', data=item.file))
+    if (index['n_frames'] < 1).any():
+        results.append(ValidationError('index of packed features contains files without frames', data=item.file))
+
+    # Verify that all necessary files are indexed
+    results.extend(list_checker(given=filenames, expected=expected))
+
+    for fn in additional_checks:
+        results.extend(fn(matrix))
 
     return results